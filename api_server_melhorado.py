@@ -1,11 +1,23 @@
-from flask import Flask, request, jsonify
+from flask import Flask, Response, request, jsonify
 from flask_cors import CORS
-from data_extractor_melhorado import extract_data_from_url
-from response_generator_melhorado import ResponseGenerator
+from data_extractor_melhorado import parse_pool, schema_stats
+from batch_extractor import batch_extractor
+from page_pipeline import extract_and_cache
+from response_generator_melhorado import ResponseGenerator, HISTORY_MESSAGES
 from cache_manager_melhorado import page_cache, conversation_cache, get_cache_stats
+from http_session import get_pool_stats
+from single_flight import page_flight
+from fetch_planner import fetch_planner
+from circuit_breaker import circuit_breaker
+from stage_timing import span, stage_histograms
+from url_utils import normalize_url
+import json
 import logging
 import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
+from typing import Dict, Any, Optional
 
 # Configuração da aplicação Flask
 app = Flask(__name__)
@@ -45,7 +57,8 @@ def extract_data():
     
     Body JSON:
     {
-        "url": "https://exemplo.com/produto"
+        "url": "https://exemplo.com/produto",
+        "timings": false  // opcional: inclui "timings_ms" com a duração de cada etapa
     }
     """
     try:
@@ -53,43 +66,157 @@ def extract_data():
         if not data or not data.get("url"):
             return jsonify({"error": "URL é obrigatória"}), 400
 
-        url = data["url"]
+        # Uma única chave para o cache, o cache negativo e a coalescência
+        url = normalize_url(data["url"])
+        timings = {} if data.get("timings") else None
         logging.info(f"Solicitação de extração de dados para: {url}")
 
-        # Verifica cache primeiro
-        cached_data = page_cache.get_cached_data(url)
+        # Verifica cache primeiro (dados vencidos há pouco são servidos e atualizados em segundo plano)
+        with span(timings, "cache"):
+            cached_data = page_cache.get_cached_data(url, allow_stale=True)
         if cached_data:
-            logging.info(f"Dados encontrados no cache para: {url}")
-            return jsonify({
+            stale = cached_data.get("stale", False)
+            if stale:
+                _schedule_refresh(url)
+            else:
+                logging.info(f"Dados encontrados no cache para: {url}")
+            page_cache.record_outcome("stale" if stale else "cached")
+            return jsonify(_with_timings({
                 "data": cached_data.get("data", cached_data),
                 "cached": True,
+                "stale": stale,
+                "outcome": "stale" if stale else "cached",
                 "timestamp": cached_data.get("cached_at")
-            })
+            }, timings))
 
-        # Extrai dados da página
-        logging.info(f"Extraindo dados de: {url}")
-        structured_data = extract_data_from_url(url)
+        # Falha recente de download: responde com o fallback sem esperar os timeouts de novo
+        with span(timings, "cache"):
+            negative_entry = page_cache.get_negative(url)
+        if negative_entry:
+            logging.info(f"URL no cache negativo, respondendo com fallback: {url}")
+            page_cache.record_outcome("negative_cached")
+            return jsonify(_with_timings({
+                "data": negative_entry["data"],
+                "cached": True,
+                "outcome": "negative_cached",
+                "timestamp": negative_entry.get("failed_at")
+            }, timings))
 
-        if structured_data:
-            # Armazena no cache
-            page_cache.set_cached_data(url, structured_data)
-            
-            logging.info(f"Dados extraídos com sucesso para: {url}")
-            return jsonify({
-                "data": structured_data,
-                "cached": False,
-                "timestamp": datetime.now().isoformat()
-            })
-        else:
-            logging.error(f"Falha na extração de dados para: {url}")
-            return jsonify({
-                "error": "Não foi possível extrair dados da URL fornecida."
-            }), 500
+        # Extrai dados da página; requisições simultâneas para a mesma URL (neste ou em outros
+        # workers) aguardam a extração em andamento em vez de iniciar outra
+        with span(timings, "extracao"):
+            payload, coalesced = page_flight.do(url, lambda: extract_and_cache(url))
+        # Cópia: o mesmo payload é entregue a todas as requisições coalescidas no processo
+        payload = dict(payload)
+        extraction_timings = payload.pop("timings_ms", {})
+        if coalesced:
+            logging.info(f"Extração coalescida com outra requisição para: {url}")
+            page_cache.record_outcome("coalesced")
+            # Um fallback continua identificado como tal (os dados são os genéricos)
+            if payload.get("outcome") != "fallback":
+                payload["outcome"] = "coalesced"
+        elif timings is not None:
+            # Etapas da extração feita por esta requisição (em uma coalescida, só a espera conta)
+            timings.update(extraction_timings)
+        payload = _with_timings(payload, timings)
+
+        if "error" in payload:
+            return jsonify(payload), 500
+        return jsonify(payload)
 
     except Exception as e:
         logging.error(f"Erro no endpoint extract_data: {e}")
         return jsonify({"error": "Erro interno do servidor"}), 500
 
+def _with_timings(payload: Dict[str, Any], timings: Optional[Dict[str, float]]) -> Dict[str, Any]:
+    """Inclui no corpo da resposta a duração (ms) de cada etapa, quando solicitada."""
+    if timings is not None:
+        payload["timings_ms"] = {stage: round(ms, 2) for stage, ms in timings.items()}
+    return payload
+
+# Atualizações em segundo plano de entradas stale
+_refresh_pool = ThreadPoolExecutor(max_workers=int(os.getenv("PAGE_REFRESH_WORKERS", 2)),
+                                   thread_name_prefix="page-refresh")
+_refreshing = set()
+_refreshing_lock = threading.Lock()
+
+def _schedule_refresh(url: str):
+    """Agenda a atualização de uma entrada stale, no máximo uma por URL entre todos os workers."""
+    key = normalize_url(url)
+    with _refreshing_lock:
+        if key in _refreshing:
+            return
+        _refreshing.add(key)
+
+    if not page_cache.claim_refresh(key, lease=page_flight.lease):
+        with _refreshing_lock:
+            _refreshing.discard(key)
+        return
+
+    def refresh():
+        try:
+            page_flight.do(key, lambda: extract_and_cache(url, refresh=True))
+            logging.info(f"Entrada stale atualizada em segundo plano: {url}")
+        except Exception as e:
+            logging.error(f"Erro na atualização em segundo plano de {url}: {e}")
+        finally:
+            page_cache.release_refresh(key)
+            with _refreshing_lock:
+                _refreshing.discard(key)
+
+    logging.info(f"Servindo dados stale e agendando atualização para: {url}")
+    _refresh_pool.submit(refresh)
+
+# Limite de URLs por lote
+BATCH_MAX_URLS = int(os.getenv("BATCH_MAX_URLS", 500))
+
+@app.route("/extract_batch", methods=["POST"])
+def extract_batch():
+    """
+    Extrai dados estruturados de várias páginas de vendas em paralelo.
+
+    A resposta é transmitida em NDJSON: uma linha por URL, na ordem em que cada extração
+    termina, seguida de uma linha final com o resumo do lote.
+    
+    Body JSON:
+    {
+        "urls": ["https://exemplo.com/produto-1", "https://exemplo.com/produto-2"],
+        "use_cache": true (opcional)
+    }
+    """
+    data = request.json
+    if not data or not isinstance(data.get("urls"), list) or not data["urls"]:
+        return jsonify({"error": "urls deve ser uma lista não vazia"}), 400
+
+    urls = data["urls"]
+    if not all(isinstance(url, str) and url.strip() for url in urls):
+        return jsonify({"error": "Todas as URLs devem ser strings não vazias"}), 400
+    if len(urls) > BATCH_MAX_URLS:
+        return jsonify({"error": f"Máximo de {BATCH_MAX_URLS} URLs por lote"}), 400
+
+    urls = [url.strip() for url in urls]
+    use_cache = data.get("use_cache", True)
+    logging.info(f"Solicitação de extração em lote para {len(urls)} URLs")
+
+    def generate():
+        summary = {"total": 0, "ok": 0, "erros": 0, "cached": 0}
+        try:
+            for result in batch_extractor.extract(urls, use_cache=use_cache):
+                summary["total"] += 1
+                if result["status"] == "ok":
+                    summary["ok"] += 1
+                    summary["cached"] += 1 if result["cached"] else 0
+                else:
+                    summary["erros"] += 1
+                yield json.dumps(result, ensure_ascii=False) + "\n"
+        except Exception as e:
+            logging.error(f"Erro no endpoint extract_batch: {e}")
+            yield json.dumps({"error": "Erro interno do servidor"}, ensure_ascii=False) + "\n"
+        logging.info(f"Extração em lote concluída: {summary}")
+        yield json.dumps({"summary": summary, "timestamp": datetime.now().isoformat()}, ensure_ascii=False) + "\n"
+
+    return Response(generate(), mimetype="application/x-ndjson")
+
 @app.route("/generate_response", methods=["POST"])
 def generate_response():
     """
@@ -121,8 +248,8 @@ def generate_response():
         logging.info(f"Gerando resposta para sessão: {session_id}")
         logging.info(f"Pergunta: {user_question}")
 
-        # Recupera histórico da conversa
-        conversation_history = conversation_cache.get_conversation_history(session_id)
+        # Recupera só a parte do histórico que vai para o prompt
+        conversation_history = conversation_cache.get_conversation_history(session_id, limit=HISTORY_MESSAGES)
 
         # Gera resposta usando o ResponseGenerator
         response_text = response_generator.generate_response(
@@ -135,9 +262,8 @@ def generate_response():
         if not response_text:
             response_text = "Desculpe, não consegui gerar uma resposta no momento. Pode reformular sua pergunta?"
 
-        # Adiciona mensagens ao histórico
-        conversation_cache.add_message(session_id, "user", user_question)
-        conversation_cache.add_message(session_id, "assistant", response_text)
+        # Adiciona pergunta e resposta ao histórico (uma única ida ao Redis)
+        conversation_length = conversation_cache.append_turn(session_id, user_question, response_text)
 
         logging.info(f"Resposta gerada com sucesso para sessão: {session_id}")
         
@@ -145,13 +271,38 @@ def generate_response():
             "response": response_text,
             "session_id": session_id,
             "timestamp": datetime.now().isoformat(),
-            "conversation_length": len(conversation_history) + 2
+            "conversation_length": conversation_length or len(conversation_history) + 2
         })
 
     except Exception as e:
         logging.error(f"Erro no endpoint generate_response: {e}")
         return jsonify({"error": "Erro interno do servidor"}), 500
 
+@app.route("/conversations", methods=["GET"])
+def list_conversations():
+    """
+    Lista as sessões ativas em páginas, sem bloquear o Redis.
+    
+    Parâmetros (query string):
+    - cursor: 0 (padrão) na primeira página; depois, o "next_cursor" da resposta anterior
+    - count: tamanho aproximado da página (padrão 100, máximo 1000)
+    
+    "next_cursor" 0 indica a última página.
+    """
+    try:
+        cursor = request.args.get("cursor", 0, type=int)
+        count = min(max(request.args.get("count", 100, type=int), 1), 1000)
+        next_cursor, sessions = conversation_cache.scan_indexed(cursor, count)
+        return jsonify({
+            "sessions": sessions,
+            "next_cursor": next_cursor,
+            "total": conversation_cache.count_active_sessions(),
+            "timestamp": datetime.now().isoformat()
+        })
+    except Exception as e:
+        logging.error(f"Erro ao listar conversas: {e}")
+        return jsonify({"error": "Erro interno do servidor"}), 500
+
 @app.route("/conversation/<session_id>", methods=["GET"])
 def get_conversation(session_id):
     """
@@ -196,6 +347,7 @@ def cache_stats():
     """Retorna estatísticas do cache."""
     try:
         stats = get_cache_stats()
+        stats["circuits"] = circuit_breaker.get_states()
         return jsonify({
             "cache_stats": stats,
             "timestamp": datetime.now().isoformat()
@@ -204,6 +356,36 @@ def cache_stats():
         logging.error(f"Erro ao obter estatísticas do cache: {e}")
         return jsonify({"error": "Erro interno do servidor"}), 500
 
+@app.route("/http/stats", methods=["GET"])
+def http_stats():
+    """Retorna o reaproveitamento de conexões dos pools HTTP e as decisões de estratégia de download."""
+    try:
+        return jsonify({
+            "http_pools": get_pool_stats(),
+            "fetch_planner": fetch_planner.get_stats(),
+            "timestamp": datetime.now().isoformat()
+        })
+    except Exception as e:
+        logging.error(f"Erro ao obter estatísticas HTTP: {e}")
+        return jsonify({"error": "Erro interno do servidor"}), 500
+
+@app.route("/timing/stats", methods=["GET"])
+def timing_stats():
+    """
+    Retorna os histogramas de duração de cada etapa da extração, o estado do pool de parsing
+    e a taxa de acerto dos dados estruturados schema.org.
+    """
+    try:
+        return jsonify({
+            "stages": stage_histograms.get_stats(),
+            "parse_pool": parse_pool.get_stats(),
+            "schema_fast_path": schema_stats.get_stats(),
+            "timestamp": datetime.now().isoformat()
+        })
+    except Exception as e:
+        logging.error(f"Erro ao obter histogramas de tempo: {e}")
+        return jsonify({"error": "Erro interno do servidor"}), 500
+
 @app.route("/cache/invalidate", methods=["POST"])
 def invalidate_cache():
     """
@@ -219,7 +401,8 @@ def invalidate_cache():
         if not data or not data.get("url"):
             return jsonify({"error": "URL é obrigatória"}), 400
 
-        url = data["url"]
+        # Mesma chave usada por /extract_data e pelo BatchExtractor
+        url = normalize_url(data["url"])
         success = page_cache.invalidate_cache(url)
         
         return jsonify({
@@ -239,11 +422,15 @@ def not_found(error):
         "available_endpoints": [
             "GET /",
             "POST /extract_data",
+            "POST /extract_batch",
             "POST /generate_response",
+            "GET /conversations",
             "GET /conversation/<session_id>",
             "DELETE /conversation/<session_id>",
             "GET /cache/stats",
-            "POST /cache/invalidate"
+            "POST /cache/invalidate",
+            "GET /http/stats",
+            "GET /timing/stats"
         ]
     }), 404
 
@@ -0,0 +1,162 @@
+import logging
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from typing import Dict, Any, Iterator, List, Optional
+from urllib.parse import urlsplit
+
+from cache_manager_melhorado import page_cache
+from page_pipeline import extract_and_cache
+from single_flight import page_flight
+from url_utils import normalize_url
+
+# Configuração de logs
+logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+
+class BatchExtractor:
+    """
+    Extrai várias URLs em paralelo, devolvendo cada resultado assim que fica pronto.
+
+    Cada URL passa pelo mesmo pipeline do /extract_data (extract_and_cache, coalescido por
+    page_flight): revalidação com ETag/Last-Modified, reaproveitamento de HTML inalterado,
+    validadores guardados no cache e entrada negativa em falhas. As extrações rodam em um
+    pool de threads com limite global e limite por host (o parsing em si vai para o
+    parse_pool de processos); os limites valem para o processo inteiro, mesmo com vários
+    lotes simultâneos.
+    """
+
+    def __init__(self, max_concurrency: int = 8, per_host_limit: int = 2):
+        """
+        Args:
+            max_concurrency: Máximo de extrações simultâneas no processo
+            per_host_limit: Máximo de extrações simultâneas para um mesmo host
+        """
+        self.max_concurrency = max_concurrency
+        self.per_host_limit = per_host_limit
+        self._pool = ThreadPoolExecutor(max_workers=max_concurrency, thread_name_prefix="batch-extract")
+        self._lock = threading.Lock()
+        self._in_flight = 0
+        self._host_in_flight: Dict[str, int] = {}
+
+    def _try_acquire(self, host: str) -> bool:
+        with self._lock:
+            if self._in_flight >= self.max_concurrency:
+                return False
+            if self._host_in_flight.get(host, 0) >= self.per_host_limit:
+                return False
+            self._in_flight += 1
+            self._host_in_flight[host] = self._host_in_flight.get(host, 0) + 1
+            return True
+
+    def _release(self, host: str):
+        with self._lock:
+            self._in_flight -= 1
+            self._host_in_flight[host] -= 1
+            if not self._host_in_flight[host]:
+                del self._host_in_flight[host]
+
+    def _extract(self, key: str, host: str) -> Dict[str, Any]:
+        # O cache é preenchido aqui, e não no gerador, para não se perder se o cliente desconectar
+        try:
+            payload, _ = page_flight.do(key, lambda: extract_and_cache(key))
+            return payload
+        finally:
+            self._release(host)
+
+    def extract(self, urls: List[str], use_cache: bool = True,
+                max_rate: Optional[float] = None) -> Iterator[Dict[str, Any]]:
+        """
+        Extrai as URLs e gera um resultado por URL, na ordem em que terminam.
+
+        Args:
+            urls: URLs a extrair (duplicadas são processadas uma vez)
+            use_cache: Se True, URLs já presentes no page_cache são devolvidas sem nova extração
+                (URLs no cache negativo nunca são baixadas de novo antes de a entrada expirar)
+            max_rate: Máximo de extrações iniciadas por segundo neste lote (None: sem limite)
+
+        Yields:
+            {"url", "status" ("ok" ou "erro"), "data", "cached", "outcome", "timestamp"} ou
+            {"url", "status", "error"}
+        """
+        # Fila de URLs ainda não iniciadas, em ordem; URLs do mesmo host aguardam vaga sem
+        # bloquear as dos outros hosts
+        waiting = deque()
+        for url in dict.fromkeys(urls):
+            # Mesma chave do /extract_data no cache e na coalescência
+            key = normalize_url(url)
+            if use_cache:
+                cached_data = page_cache.get_cached_data(key)
+                if cached_data:
+                    yield {
+                        "url": url,
+                        "status": "ok",
+                        "data": cached_data.get("data", cached_data),
+                        "cached": True,
+                        "outcome": "cached",
+                        "timestamp": cached_data.get("cached_at")
+                    }
+                    continue
+            # Falha recente de download: não tenta de novo enquanto a entrada negativa valer
+            if page_cache.get_negative(key):
+                yield {"url": url, "status": "erro", "error": "Download falhou recentemente (cache negativo)."}
+                continue
+            waiting.append((url, key))
+
+        futures = {}
+        interval = 1 / max_rate if max_rate else 0.0
+        next_start = time.monotonic()
+        while waiting or futures:
+            # Inicia todas as extrações que cabem nos limites global e por host (e na taxa máxima)
+            for _ in range(len(waiting)):
+                if interval and time.monotonic() < next_start:
+                    break
+                url, key = waiting.popleft()
+                host = urlsplit(key).netloc
+                if self._try_acquire(host):
+                    futures[self._pool.submit(self._extract, key, host)] = url
+                    next_start = max(next_start, time.monotonic()) + interval
+                else:
+                    waiting.append((url, key))
+
+            timeout = 0.5
+            if interval and waiting:
+                # Acorda a tempo da próxima extração liberada pela taxa máxima
+                timeout = min(timeout, max(next_start - time.monotonic(), 0.01))
+            if not futures:
+                # Todas as vagas estão ocupadas por outros lotes ou a taxa máxima foi atingida
+                time.sleep(min(timeout, 0.05))
+                continue
+
+            done, _ = wait(futures, timeout=timeout, return_when=FIRST_COMPLETED)
+            for future in done:
+                url = futures.pop(future)
+                try:
+                    payload = future.result()
+                except Exception as e:
+                    logging.error(f"Erro na extração em lote para {url}: {e}")
+                    yield {"url": url, "status": "erro", "error": str(e)}
+                    continue
+
+                if "error" in payload:
+                    yield {"url": url, "status": "erro", "error": payload["error"]}
+                    continue
+                if payload["outcome"] == "fallback":
+                    yield {"url": url, "status": "erro", "error": "Não foi possível obter o conteúdo HTML da página."}
+                    continue
+
+                yield {
+                    "url": url,
+                    "status": "ok",
+                    "data": payload["data"],
+                    "cached": payload["cached"],
+                    "outcome": payload["outcome"],
+                    "timestamp": payload["timestamp"]
+                }
+
+# Instância global para uso na aplicação
+batch_extractor = BatchExtractor(
+    max_concurrency=int(os.getenv("BATCH_MAX_CONCURRENCY", 8)),
+    per_host_limit=int(os.getenv("BATCH_PER_HOST_LIMIT", 2))
+)
@@ -0,0 +1,117 @@
+"""
+Benchmark dos codecs de valores do cache (cache_codec.ValueCodec).
+
+Serializa entradas de página (os dados de referência de benchmarks/golden, com os
+metadados que o PageCache grava) e mensagens de conversa com cada codec, com e sem
+compressão, e relata o tamanho médio do valor e o tempo de encode/decode por valor.
+A linha "anterior" é o codec "legacy": o json.dumps(..., ensure_ascii=False) sem
+cabeçalho gravado antes dos codecs (e ainda o padrão de CACHE_CODEC).
+
+Com --redis, grava os valores no Redis de REDIS_URL (chaves bench_codec:*, apagadas no
+fim) e relata também a memória ocupada segundo MEMORY USAGE.
+
+Uso:
+    python benchmarks/benchmark_codecs.py [--iteracoes N] [--limite-compressao BYTES] [--redis]
+"""
+import argparse
+import glob
+import json
+import os
+import sys
+import time
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from cache_codec import ValueCodec
+
+GOLDEN_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "golden")
+
+def _page_entries():
+    entries = []
+    for path in sorted(glob.glob(os.path.join(GOLDEN_DIR, "*.json"))):
+        with open(path, encoding="utf-8") as f:
+            data = json.load(f)
+        entries.append({
+            "data": data,
+            "cached_at": datetime.now().isoformat(),
+            "url": data.get("url"),
+            "validators": {"etag": "\"5f1c-61a8b2\"", "last_modified": "Tue, 14 Oct 2025 12:00:00 GMT"},
+            "content_hash": "9f86d081884c7d659a2feaa0c55ad015a3bf4f1b2b0b822cd15d6c15b0f00a08",
+            "extractor_version": "2",
+            "expires_at": time.time() + 7200
+        })
+    return entries
+
+def _conversation_messages():
+    return [
+        {"role": "user", "content": "Qual o preço do curso e quais as formas de pagamento?",
+         "timestamp": datetime.now().isoformat()},
+        {"role": "assistant", "content": "O curso custa R$ 1.997,00 à vista ou em até 12x no cartão. "
+         "Você também tem garantia incondicional de 7 dias: se não gostar, devolvemos todo o valor. "
+         "Posso te ajudar com mais alguma dúvida sobre o conteúdo ou o acesso?",
+         "timestamp": datetime.now().isoformat()}
+    ]
+
+def _codecs(threshold):
+    codecs = {"anterior": ValueCodec("legacy")}
+    for name in ("json", "orjson", "msgpack"):
+        codecs[name] = ValueCodec(name, compress_min_bytes=0)
+        codecs[f"{name}+zlib"] = ValueCodec(name, compress_min_bytes=threshold)
+    return codecs
+
+def _measure(codec, values, iterations):
+    encoded = [codec.encode(value) for value in values]
+    start = time.perf_counter()
+    for _ in range(iterations):
+        for value in values:
+            codec.encode(value)
+    encode_us = (time.perf_counter() - start) * 1e6 / (iterations * len(values))
+    start = time.perf_counter()
+    for _ in range(iterations):
+        for raw in encoded:
+            codec.decode(raw)
+    decode_us = (time.perf_counter() - start) * 1e6 / (iterations * len(values))
+    assert [codec.decode(raw) for raw in encoded] == values
+    return encoded, sum(map(len, encoded)) / len(encoded), encode_us, decode_us
+
+def _redis_memory(client, name, encoded):
+    keys = [f"bench_codec:{name}:{i}" for i in range(len(encoded))]
+    with client.pipeline(transaction=False) as pipe:
+        for key, raw in zip(keys, encoded):
+            pipe.set(key, raw)
+        for key in keys:
+            pipe.memory_usage(key)
+        pipe.delete(*keys)
+        results = pipe.execute()
+    usages = results[len(keys):2 * len(keys)]
+    return sum(usages) / len(usages)
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark dos codecs de valores do cache")
+    parser.add_argument("--iteracoes", type=int, default=2000, help="Repetições por valor")
+    parser.add_argument("--limite-compressao", type=int, default=512,
+                        help="Tamanho mínimo do corpo para os codecs +zlib comprimirem")
+    parser.add_argument("--redis", action="store_true", help="Mede a memória no Redis de REDIS_URL")
+    args = parser.parse_args()
+
+    client = None
+    if args.redis:
+        import redis
+        client = redis.from_url(os.getenv("REDIS_URL", "redis://localhost:6379"))
+
+    datasets = {"páginas": _page_entries(), "mensagens": _conversation_messages()}
+    for dataset, values in datasets.items():
+        print(f"\n{dataset} ({len(values)} valores, {args.iteracoes} iterações)")
+        header = f"{'codec':14} {'bytes/valor':>11} {'encode µs':>10} {'decode µs':>10}"
+        print(header + (f" {'Redis bytes':>11}" if client else ""))
+        for name, codec in _codecs(args.limite_compressao).items():
+            encoded, size, encode_us, decode_us = _measure(codec, values, args.iteracoes)
+            line = f"{name:14} {size:11.0f} {encode_us:10.1f} {decode_us:10.1f}"
+            if client:
+                line += f" {_redis_memory(client, name, encoded):11.0f}"
+            print(line)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
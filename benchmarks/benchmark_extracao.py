@@ -0,0 +1,80 @@
+"""
+Benchmark da etapa de parsing do data_extractor_melhorado.
+
+Compara o motor legado (trafilatura + BeautifulSoup/html.parser) com o motor de passada
+única (lxml) sobre páginas de vendas salvas, verificando que a saída é idêntica.
+
+Uso:
+    python benchmarks/benchmark_extracao.py [diretorio_ou_arquivos.html ...] [--iteracoes N]
+"""
+import argparse
+import glob
+import logging
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from data_extractor_melhorado import _extract_with_legacy_engine, _extract_with_single_pass_engine
+
+CORPUS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "corpus")
+
+def _collect_pages(paths):
+    files = []
+    for path in paths or [CORPUS_DIR]:
+        if os.path.isdir(path):
+            files.extend(sorted(glob.glob(os.path.join(path, "*.html"))))
+        else:
+            files.append(path)
+    return files
+
+def _time_engine(engine, url, html, iterations):
+    start = time.perf_counter()
+    for _ in range(iterations):
+        result = engine(url, html)
+    return (time.perf_counter() - start) * 1000 / iterations, result
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark dos motores de extração")
+    parser.add_argument("paths", nargs="*", help="Arquivos .html ou diretórios (padrão: benchmarks/corpus)")
+    parser.add_argument("--iteracoes", type=int, default=20, help="Repetições por página")
+    args = parser.parse_args()
+
+    # Os motores registram logs a cada página; no benchmark eles só distorcem o tempo
+    logging.disable(logging.WARNING)
+
+    files = _collect_pages(args.paths)
+    if not files:
+        print("Nenhuma página encontrada.")
+        return 1
+
+    total_legacy = total_single = 0.0
+    divergences = 0
+    print(f"{'página':<40} {'KB':>7} {'legado ms':>10} {'único ms':>10} {'ganho':>7}  saída")
+    for path in files:
+        with open(path, encoding="utf-8") as f:
+            html = f.read()
+        url = f"file://{os.path.abspath(path)}"
+
+        legacy_ms, legacy_data = _time_engine(_extract_with_legacy_engine, url, html, args.iteracoes)
+        single_ms, single_data = _time_engine(_extract_with_single_pass_engine, url, html, args.iteracoes)
+        total_legacy += legacy_ms
+        total_single += single_ms
+
+        identical = legacy_data == single_data
+        if not identical:
+            divergences += 1
+        print(f"{os.path.basename(path)[:40]:<40} {len(html) / 1024:>7.1f} {legacy_ms:>10.2f} "
+              f"{single_ms:>10.2f} {legacy_ms / single_ms:>6.2f}x  {'idêntica' if identical else 'DIVERGENTE'}")
+        if not identical:
+            for field in legacy_data:
+                if legacy_data[field] != single_data.get(field):
+                    print(f"    {field}: legado={legacy_data[field]!r} único={single_data.get(field)!r}")
+
+    print(f"\nTotal: legado {total_legacy:.2f} ms, passada única {total_single:.2f} ms "
+          f"({total_legacy / total_single:.2f}x), {divergences} página(s) divergente(s)")
+    return 1 if divergences else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
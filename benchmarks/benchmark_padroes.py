@@ -0,0 +1,76 @@
+"""
+Micro-benchmark dos padrões de texto (preço, benefícios, CTA, garantia e público-alvo).
+
+Compara os helpers do motor legado, que executam re.findall padrão por padrão, com o
+PatternScanner pré-compilado, que coleta os candidatos de todos os campos em uma passada.
+O texto de cada tamanho é montado repetindo o texto principal das páginas do corpus.
+
+Uso:
+    python benchmarks/benchmark_padroes.py [--tamanhos 10,100,1000] [--repeticoes 5]
+"""
+import argparse
+import glob
+import logging
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from trafilatura import extract
+from data_extractor_melhorado import (
+    SALES_SCANNER, _findall_each, _price_from_matches, _benefits_from_list_items,
+    _cta_from_matches, _guarantee_from_matches, _target_audience_from_matches
+)
+
+CORPUS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "corpus")
+
+def _legacy_fields(text):
+    return (
+        _price_from_matches(_findall_each("preco", text)),
+        _benefits_from_list_items([], _findall_each("beneficios", text), text),
+        _cta_from_matches(_findall_each("cta", text)),
+        _guarantee_from_matches(_findall_each("garantia", text)),
+        _target_audience_from_matches(_findall_each("publico_alvo", text))
+    )
+
+def _scanner_fields(text):
+    scan = SALES_SCANNER.scan(text)
+    return (
+        _price_from_matches(scan.findall("preco")),
+        _benefits_from_list_items([], scan.findall("beneficios"), text),
+        _cta_from_matches(scan.findall("cta")),
+        _guarantee_from_matches(scan.findall("garantia")),
+        _target_audience_from_matches(scan.findall("publico_alvo"))
+    )
+
+def _base_text():
+    texts = []
+    for path in sorted(glob.glob(os.path.join(CORPUS_DIR, "*.html"))):
+        with open(path, encoding="utf-8") as f:
+            texts.append(extract(f.read(), include_comments=False, include_tables=False) or "")
+    return "\n".join(text for text in texts if text)
+
+def main():
+    parser = argparse.ArgumentParser(description="Micro-benchmark dos padrões de texto")
+    parser.add_argument("--tamanhos", default="10,100,1000", help="Tamanhos do texto em KB, separados por vírgula")
+    parser.add_argument("--repeticoes", type=int, default=5, help="Melhor de N execuções")
+    args = parser.parse_args()
+
+    logging.disable(logging.WARNING)
+    base = _base_text()
+    # Texto longo sem nenhum padrão: pior caso do motor legado, que varre o texto inteiro por padrão
+    filler = "Conteúdo institucional da página sem nenhuma oferta, apenas texto corrido de apresentação. " * 20 + "\n"
+
+    print(f"{'texto':<20} {'KB':>7} {'legado ms':>10} {'scanner ms':>11} {'ganho':>7}  saída")
+    for size_kb in (int(size) for size in args.tamanhos.split(",")):
+        for label, chunk in (("corpus repetido", base + "\n"), ("sem ofertas", filler)):
+            text = (chunk * (size_kb * 1024 // len(chunk) + 1))[:size_kb * 1024]
+            legacy_ms = min(timeit.repeat(lambda: _legacy_fields(text), number=1, repeat=args.repeticoes)) * 1000
+            scanner_ms = min(timeit.repeat(lambda: _scanner_fields(text), number=1, repeat=args.repeticoes)) * 1000
+            identical = _legacy_fields(text) == _scanner_fields(text)
+            print(f"{label:<20} {size_kb:>7} {legacy_ms:>10.2f} {scanner_ms:>11.2f} "
+                  f"{legacy_ms / scanner_ms:>6.2f}x  {'idêntica' if identical else 'DIVERGENTE'}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+"""
+Benchmark da persistência de um turno de conversa no /generate_response.
+
+Compara, no Redis, a sequência anterior (leitura do histórico + duas chamadas a
+add_message + leitura do tamanho do histórico) com a atual (leitura do histórico +
+append_turn), contando as idas ao Redis (comandos ou pipelines enviados) e o tempo por
+turno. --latencia-ms soma um atraso a cada ida, para simular a rede entre a API e o Redis.
+
+Usa o Redis de REDIS_URL (um banco de teste: as sessões do benchmark são apagadas no fim).
+Com CACHE_BACKEND=memory roda contra o backend em memória, sem Redis (referência sem rede).
+
+Uso:
+    python benchmarks/benchmark_turnos.py [--turnos N] [--latencia-ms MS]
+"""
+import argparse
+import logging
+import os
+import statistics
+import sys
+import time
+import uuid
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from redis.connection import Connection
+
+from cache_manager_melhorado import conversation_cache
+from response_generator_melhorado import HISTORY_MESSAGES
+
+class RoundTripCounter:
+    """Conta (e opcionalmente atrasa) os envios ao Redis: um por comando ou por pipeline."""
+
+    def __init__(self, latency_ms: float):
+        self.latency = latency_ms / 1000
+        self.count = 0
+        self._original = Connection.send_packed_command
+
+    def install(self):
+        counter = self
+
+        def send_packed_command(connection, command, check_health=True):
+            counter.count += 1
+            if counter.latency:
+                time.sleep(counter.latency)
+            return counter._original(connection, command, check_health)
+
+        Connection.send_packed_command = send_packed_command
+
+    def uninstall(self):
+        Connection.send_packed_command = self._original
+
+def _turn_separate(session_id, question, answer):
+    history = conversation_cache.get_conversation_history(session_id, limit=HISTORY_MESSAGES)
+    conversation_cache.add_message(session_id, "user", question)
+    conversation_cache.add_message(session_id, "assistant", answer)
+    return len(history), conversation_cache.get_conversation_length(session_id)
+
+def _turn_pipelined(session_id, question, answer):
+    history = conversation_cache.get_conversation_history(session_id, limit=HISTORY_MESSAGES)
+    return len(history), conversation_cache.append_turn(session_id, question, answer)
+
+def _run(strategy, turns, counter):
+    session_id = f"bench-{uuid.uuid4().hex}"
+    durations = []
+    start_count = counter.count
+    for turn in range(turns):
+        start = time.perf_counter()
+        strategy(session_id, f"Pergunta {turn}: qual o preço?", f"Resposta {turn}: R$ 197,00 à vista.")
+        durations.append((time.perf_counter() - start) * 1000)
+    round_trips = (counter.count - start_count) / turns
+    conversation_cache.clear_conversation(session_id)
+    return round_trips, statistics.median(durations), sorted(durations)[int(len(durations) * 0.95) - 1]
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark da persistência de turnos de conversa")
+    parser.add_argument("--turnos", type=int, default=200, help="Turnos por estratégia")
+    parser.add_argument("--latencia-ms", type=float, default=0.0,
+                        help="Atraso somado a cada ida ao Redis (simula a rede)")
+    args = parser.parse_args()
+
+    # O cache registra logs a cada mensagem; no benchmark eles só distorcem o tempo
+    logging.disable(logging.WARNING)
+
+    if not conversation_cache._is_available():
+        print("Redis indisponível (REDIS_URL). Use CACHE_BACKEND=memory para rodar sem Redis.")
+        return 1
+
+    counter = RoundTripCounter(args.latencia_ms)
+    counter.install()
+    try:
+        results = {
+            "separado (add_message x2)": _run(_turn_separate, args.turnos, counter),
+            "append_turn": _run(_turn_pipelined, args.turnos, counter)
+        }
+    finally:
+        counter.uninstall()
+
+    print(f"{args.turnos} turnos por estratégia, latência simulada {args.latencia_ms} ms por ida\n")
+    print(f"{'estratégia':28} {'idas/turno':>10} {'p50 ms':>8} {'p95 ms':>8}")
+    for name, (round_trips, p50, p95) in results.items():
+        print(f"{name:28} {round_trips:10.1f} {p50:8.2f} {p95:8.2f}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
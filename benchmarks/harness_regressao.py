@@ -0,0 +1,160 @@
+"""
+Harness de regressão offline da etapa de parsing.
+
+Roda extract_data_from_html sobre as páginas de benchmarks/corpus, sem rede nem Redis, e
+compara cada campo com a saída de referência em benchmarks/golden/<página>.json. Relata,
+por página, o tempo (p50/p95) e o pico de memória, o tempo por etapa e por campo (p50/p95)
+e a taxa de acerto por campo.
+
+Uso:
+    python benchmarks/harness_regressao.py [--iteracoes N] [--motor single_pass|legacy]
+                                           [--atualizar-golden] [paginas.html ...]
+
+Sai com código 1 se algum campo divergir da referência.
+"""
+import argparse
+import glob
+import json
+import logging
+import os
+import statistics
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from data_extractor_melhorado import _extract_with_legacy_engine, _extract_with_single_pass_engine
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+CORPUS_DIR = os.path.join(BENCH_DIR, "corpus")
+GOLDEN_DIR = os.path.join(BENCH_DIR, "golden")
+
+ENGINES = {
+    "single_pass": _extract_with_single_pass_engine,
+    "legacy": _extract_with_legacy_engine
+}
+
+def _page_url(path):
+    # URL fixa: a saída de referência não pode depender de onde o repositório está
+    return f"https://corpus.local/{os.path.splitext(os.path.basename(path))[0]}"
+
+def _golden_path(path):
+    return os.path.join(GOLDEN_DIR, os.path.splitext(os.path.basename(path))[0] + ".json")
+
+def _percentile(values, pct):
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+def _p50_p95(values):
+    return statistics.median(values), _percentile(values, 95)
+
+def _run_page(engine, url, html, iterations):
+    """Executa o parsing da página; devolve (saída, tempos totais, tempos por etapa, pico KB)."""
+    # Uma execução de aquecimento: a primeira chamada compila regexes e carrega o trafilatura
+    engine(url, html)
+    totals = []
+    stages = {}
+    data = None
+    for _ in range(iterations):
+        timings = {}
+        start = time.perf_counter()
+        data = engine(url, html, timings)
+        totals.append((time.perf_counter() - start) * 1000)
+        for stage, ms in timings.items():
+            stages.setdefault(stage, []).append(ms)
+
+    # Memória medida em uma execução à parte: o tracemalloc distorce os tempos
+    tracemalloc.start()
+    engine(url, html)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return data, totals, stages, peak / 1024
+
+def main():
+    parser = argparse.ArgumentParser(description="Regressão offline da extração contra as saídas de referência")
+    parser.add_argument("paths", nargs="*", help="Arquivos .html (padrão: todas as páginas de benchmarks/corpus)")
+    parser.add_argument("--iteracoes", type=int, default=20, help="Repetições por página")
+    parser.add_argument("--motor", choices=sorted(ENGINES), default="single_pass", help="Motor de extração")
+    parser.add_argument("--atualizar-golden", action="store_true",
+                        help="Grava a saída atual como referência em vez de comparar")
+    args = parser.parse_args()
+
+    # Os motores registram logs a cada página; no benchmark eles só distorcem o tempo
+    logging.disable(logging.WARNING)
+
+    files = args.paths or sorted(glob.glob(os.path.join(CORPUS_DIR, "*.html")))
+    if not files:
+        print("Nenhuma página encontrada.")
+        return 1
+
+    engine = ENGINES[args.motor]
+    all_stages = {}
+    field_hits = {}
+    field_total = {}
+    failures = []
+
+    print(f"Motor: {args.motor}, {args.iteracoes} iteração(ões) por página\n")
+    print(f"{'página':<36} {'KB':>6} {'p50 ms':>8} {'p95 ms':>8} {'pico KB':>8}  campos")
+    for path in files:
+        with open(path, encoding="utf-8") as f:
+            html = f.read()
+        url = _page_url(path)
+        data, totals, stages, peak_kb = _run_page(engine, url, html, args.iteracoes)
+        for stage, values in stages.items():
+            all_stages.setdefault(stage, []).extend(values)
+
+        golden_path = _golden_path(path)
+        if args.atualizar_golden:
+            os.makedirs(GOLDEN_DIR, exist_ok=True)
+            with open(golden_path, "w", encoding="utf-8") as f:
+                json.dump(data, f, ensure_ascii=False, indent=2)
+                f.write("\n")
+            summary = "referência gravada"
+        elif not os.path.exists(golden_path):
+            failures.append((path, None, None, None))
+            summary = "SEM REFERÊNCIA"
+        else:
+            with open(golden_path, encoding="utf-8") as f:
+                golden = json.load(f)
+            hits = 0
+            for field, expected in golden.items():
+                field_total[field] = field_total.get(field, 0) + 1
+                if data.get(field) == expected:
+                    hits += 1
+                    field_hits[field] = field_hits.get(field, 0) + 1
+                else:
+                    failures.append((path, field, expected, data.get(field)))
+            summary = f"{hits}/{len(golden)}"
+
+        p50, p95 = _p50_p95(totals)
+        print(f"{os.path.basename(path)[:36]:<36} {len(html) / 1024:>6.1f} {p50:>8.2f} {p95:>8.2f} "
+              f"{peak_kb:>8.0f}  {summary}")
+
+    print(f"\n{'etapa':<24} {'p50 ms':>8} {'p95 ms':>8}")
+    for stage, values in sorted(all_stages.items(), key=lambda item: -statistics.median(item[1])):
+        p50, p95 = _p50_p95(values)
+        print(f"{stage:<24} {p50:>8.3f} {p95:>8.3f}")
+
+    if args.atualizar_golden:
+        return 0
+
+    if field_total:
+        print(f"\n{'campo':<24} {'acerto':>8}")
+        for field, total in field_total.items():
+            print(f"{field:<24} {field_hits.get(field, 0) / total:>8.0%}")
+
+    if failures:
+        print(f"\n{len(failures)} divergência(s):")
+        for path, field, expected, got in failures:
+            if field is None:
+                print(f"  {os.path.basename(path)}: sem saída de referência (rode com --atualizar-golden)")
+            else:
+                print(f"  {os.path.basename(path)} / {field}:\n    esperado={expected!r}\n    obtido=  {got!r}")
+        return 1
+    print("\nTodas as páginas conferem com a referência.")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
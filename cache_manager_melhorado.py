@@ -1,9 +1,16 @@
 import redis
-import json
 import logging
 import os
-from typing import Dict, Any, List, Optional
+import threading
+import time
+import uuid
+from typing import Dict, Any, Iterator, List, Optional, Tuple
 from datetime import datetime, timedelta
+from cache_codec import ValueCodec
+from local_cache import LocalLRUCache
+from memory_backend import MemoryBackend
+from redis_health import RedisHealth, TrackedRedis
+from url_utils import normalize_url
 
 # Configuração de logs
 logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
@@ -20,67 +27,418 @@ class CacheManager:
         self.redis_url = redis_url or os.getenv("REDIS_URL", "redis://localhost:6379")
         self.default_ttl = default_ttl
         self.redis_client = None
-        self._connect()
+        # Cliente sem decodificação das respostas, para os valores serializados por self.codec
+        # (que podem ser binários); os demais comandos usam redis_client
+        self.value_client = None
+        self.codec = ValueCodec.from_env()
+        # Índice das chaves do cache (sorted set: membro -> expiração em epoch), definido
+        # pelas subclasses junto com self.prefix. Um membro expirado continua no índice por
+        # index_retention segundos (o tempo que a chave ainda pode existir depois de expirar)
+        self.prefix = ""
+        self.index_key = None
+        self.index_retention = 0
+        self.health = RedisHealth(
+            self.__class__.__name__,
+            probe=self._reconnect,
+            max_backoff=float(os.getenv("REDIS_RECONNECT_MAX_BACKOFF", 30)),
+            on_recover=self._on_recover
+        )
+        # Backend em memória que assume enquanto o Redis está fora (CACHE_FALLBACK_MAX_BYTES=0
+        # desabilita); com CACHE_BACKEND=memory é o único backend e o Redis não é usado
+        self.backend_name = os.getenv("CACHE_BACKEND", "redis")
+        fallback_bytes = int(os.getenv("CACHE_FALLBACK_MAX_BYTES", 64 * 1024 * 1024))
+        self.fallback = MemoryBackend(
+            max_bytes=fallback_bytes,
+            max_entries=int(os.getenv("CACHE_FALLBACK_MAX_ENTRIES", 10000))
+        ) if fallback_bytes > 0 or self.backend_name == "memory" else None
+        if self.backend_name == "memory":
+            logging.info(f"{self.__class__.__name__}: usando backend em memória (CACHE_BACKEND=memory).")
+        else:
+            self._connect()
+
+    def _new_client(self, decode_responses: bool = True) -> TrackedRedis:
+        client = TrackedRedis.from_url(
+            self.redis_url,
+            decode_responses=decode_responses,
+            socket_connect_timeout=5,
+            socket_timeout=5,
+            retry_on_timeout=True
+        )
+        # Falhas de conexão nos comandos reais marcam a conexão como indisponível
+        client.on_connection_error = self.health.mark_down
+        return client
 
     def _connect(self):
-        """Conecta ao Redis com tratamento de erro."""
+        """Conecta ao Redis com tratamento de erro; se falhar, reconecta em segundo plano."""
         try:
-            self.redis_client = redis.from_url(
-                self.redis_url,
-                decode_responses=True,
-                socket_connect_timeout=5,
-                socket_timeout=5,
-                retry_on_timeout=True
-            )
+            self.redis_client = self._new_client()
+            self.value_client = self._new_client(decode_responses=False)
             # Testa a conexão
             self.redis_client.ping()
+            self.health.mark_up()
             logging.info("Conectado ao Redis com sucesso.")
         except Exception as e:
             logging.error(f"Erro ao conectar ao Redis: {e}")
-            logging.warning("Cache será desabilitado. Funcionando sem persistência.")
+            logging.warning("Cache em memória do processo até a reconexão ao Redis." if self.fallback is not None
+                            else "Cache desabilitado até a reconexão. Funcionando sem persistência.")
             self.redis_client = None
+            self.value_client = None
+            self.health.mark_down(e)
+
+    def _reconnect(self):
+        """Teste de conexão da thread de reconexão (levanta exceção se o Redis continuar fora)."""
+        if self.redis_client is None:
+            client = self._new_client()
+            client.ping()
+            self.value_client = self._new_client(decode_responses=False)
+            self.redis_client = client
+        else:
+            self.redis_client.ping()
+
+    def _on_recover(self):
+        """
+        Depois da reconexão, já com o estado "up" (o _ensure_index não faz nada antes disso):
+        monta o índice se ele ainda não existe (ex.: processo iniciado com o Redis fora) e
+        reenvia o backend em memória.
+        """
+        self._ensure_index()
+        self._resync_fallback()
 
     def _is_connected(self) -> bool:
-        """Verifica se a conexão com Redis está ativa."""
-        if not self.redis_client:
-            return False
+        """
+        Verifica se a conexão com Redis está ativa, sem I/O: o estado é mantido pelos próprios
+        comandos (ver RedisHealth). Com o Redis fora, retorna False na hora.
+        """
+        return self.redis_client is not None and self.health.is_up()
+
+    def _is_available(self) -> bool:
+        """Se há onde guardar os dados: o Redis ou o backend em memória."""
+        return self._is_connected() or self.fallback is not None
+
+    def _use_fallback(self) -> bool:
+        """Se as operações devem ir para o backend em memória (Redis fora ou CACHE_BACKEND=memory)."""
+        return self.fallback is not None and not self._is_connected()
+
+    def _resync_fallback(self):
+        """
+        Depois da reconexão, reenvia ao Redis o que foi gravado no backend em memória enquanto
+        ele esteve fora, e libera essa memória.
+        """
+        if self.fallback is None:
+            return
+        entries = self.fallback.drain()
+        if not entries:
+            return
+        synced = 0
+        for key, value, ttl in entries:
+            try:
+                with self.value_client.pipeline() as pipe:
+                    self._resync_entry(pipe, key, value, max(int(ttl), 1))
+                    pipe.execute()
+                synced += 1
+            except Exception as e:
+                logging.error(f"Erro ao reenviar {key} ao Redis: {e}")
+        logging.info(f"{synced}/{len(entries)} entradas do cache em memória reenviadas ao Redis.")
+
+    def get_backend_stats(self) -> Dict[str, Any]:
+        """Backend em uso neste processo e ocupação do backend em memória."""
+        return {
+            "backend": "memory" if self._use_fallback() else "redis",
+            "configured": self.backend_name,
+            "memory": self.fallback.get_stats() if self.fallback is not None else None
+        }
+
+    def _resync_entry(self, pipe, key: str, value: Any, ttl: int):
+        """Enfileira no pipeline a gravação de uma entrada do backend em memória (ver subclasses)."""
+        pipe.set(key, self.codec.encode(value), ex=ttl, nx=True)
+
+    def _index_add(self, pipe, member: str, ttl: float):
+        """
+        Enfileira no pipeline o registro do membro no índice, expirando em ttl segundos (e a
+        poda dos expirados há mais de index_retention segundos).
+        """
+        now = time.time()
+        pipe.zadd(self.index_key, {member: now + ttl})
+        pipe.zremrangebyscore(self.index_key, "-inf", now - self.index_retention)
+
+    def count_indexed(self) -> int:
+        """Número de chaves ainda não expiradas no índice (ZCOUNT, O(log N))."""
+        if not self._is_connected():
+            return 0
         try:
-            self.redis_client.ping()
-            return True
-        except:
-            logging.warning("Conexão com Redis perdida. Tentando reconectar...")
-            self._connect()
-            return self.redis_client is not None
+            return self.redis_client.zcount(self.index_key, f"({time.time()}", "+inf")
+        except Exception as e:
+            logging.error(f"Erro ao contar chaves do índice {self.index_key}: {e}")
+            return 0
+
+    def count_indexed_expired(self) -> int:
+        """Número de chaves expiradas que ainda estão no índice (dentro de index_retention)."""
+        if not self._is_connected() or not self.index_retention:
+            return 0
+        try:
+            now = time.time()
+            return self.redis_client.zcount(self.index_key, f"({now - self.index_retention}", now)
+        except Exception as e:
+            logging.error(f"Erro ao contar chaves do índice {self.index_key}: {e}")
+            return 0
+
+    def scan_indexed(self, cursor: int = 0, count: int = 100) -> Tuple[int, List[str]]:
+        """
+        Uma página do índice, com cursor (ZSCAN: não bloqueia o Redis).
+
+        Args:
+            cursor: 0 na primeira chamada; depois, o cursor devolvido pela anterior
+            count: Tamanho aproximado da página
+
+        Returns:
+            (próximo cursor, membros não expirados ou dentro de index_retention); cursor 0
+            indica o fim. Como no SCAN, uma página pode vir vazia sem ser a última.
+        """
+        if not self._is_connected():
+            return 0, []
+        try:
+            cursor, items = self.redis_client.zscan(self.index_key, cursor, count=count)
+            oldest = time.time() - self.index_retention
+            return cursor, [member for member, expires_at in items if expires_at > oldest]
+        except Exception as e:
+            logging.error(f"Erro ao percorrer o índice {self.index_key}: {e}")
+            return 0, []
+
+    def iter_indexed(self, batch: int = 500) -> Iterator[str]:
+        """Percorre todos os membros do índice (como scan_indexed), uma página por vez."""
+        cursor = 0
+        while True:
+            cursor, members = self.scan_indexed(cursor, batch)
+            yield from members
+            if not cursor:
+                return
+
+    def _ensure_index(self):
+        """
+        Na primeira vez que um processo encontra o Redis sem o índice montado (ex.: chaves
+        gravadas antes de ele existir), reconstrói o índice em segundo plano.
+        """
+        if not self.index_key or not self._is_connected():
+            return
+        marker = f"{self.index_key}:built"
+        try:
+            # A marca provisória expira: se o processo morrer no meio, outro refaz depois
+            if not self.redis_client.set(marker, "building", nx=True, ex=600):
+                return
+        except Exception as e:
+            logging.error(f"Erro ao verificar o índice {self.index_key}: {e}")
+            return
+        threading.Thread(target=self._rebuild_index, args=(marker,),
+                         name=f"rebuild-{self.index_key}", daemon=True).start()
+
+    def _rebuild_index(self, marker: str):
+        """Registra no índice as chaves existentes, com SCAN incremental e o TTL de cada uma."""
+        indexed = 0
+        try:
+            client = self.redis_client
+            batch = []
+            for key in client.scan_iter(match=f"{self.prefix}*", count=500):
+                batch.append(key)
+                if len(batch) >= 500:
+                    indexed += self._index_existing(client, batch)
+                    batch = []
+            if batch:
+                indexed += self._index_existing(client, batch)
+            client.set(marker, "done")
+            logging.info(f"Índice {self.index_key} reconstruído: {indexed} chaves.")
+        except Exception as e:
+            logging.error(f"Erro ao reconstruir o índice {self.index_key}: {e}")
+
+    def _index_existing(self, client, keys: List[str]) -> int:
+        with client.pipeline(transaction=False) as pipe:
+            for key in keys:
+                pipe.ttl(key)
+            ttls = pipe.execute()
+        now = time.time()
+        # TTL -1: chave sem expiração; -2: removida durante a varredura
+        scores = {key[len(self.prefix):]: (now + ttl if ttl >= 0 else float("inf"))
+                  for key, ttl in zip(keys, ttls) if ttl != -2}
+        if scores:
+            client.zadd(self.index_key, scores)
+        return len(scores)
 
 class PageCache(CacheManager):
-    """Gerencia cache de dados extraídos de páginas."""
+    """
+    Gerencia cache de dados extraídos de páginas.
+
+    Dois níveis: um LRU em memória no processo (L1, limitado em bytes e com TTL curto) na
+    frente do Redis (L2). Toda gravação ou invalidação publica a URL no canal
+    page_cache:invalidate, e cada worker remove a URL do seu L1 ao receber a mensagem.
+    Se a assinatura cair, o L1 é esvaziado ao reconectar; o TTL do L1 limita o atraso de
+    uma mensagem perdida.
+    """
     
     def __init__(self, redis_url: str = None):
         super().__init__(redis_url, default_ttl=7200)  # 2 horas para dados de página
         self.prefix = "page_data:"
+        self.index_key = "page_index"
+        # Por quanto tempo uma entrada com ETag/Last-Modified ou hash do HTML fica guardada
+        # depois de expirar, para poder ser revalidada ou reaproveitada em vez de extraída de novo
+        self.revalidation_window = int(os.getenv("PAGE_CACHE_REVALIDATION_WINDOW", 86400))
+        # Stale-while-revalidate: depois do TTL (soft), os dados ainda são servidos por até
+        # stale_ttl segundos (hard) enquanto uma atualização roda em segundo plano
+        self.stale_ttl = int(os.getenv("PAGE_CACHE_STALE_TTL", 3600))
+        # O índice é pontuado pelo expires_at das entradas (a contagem de páginas em cache é
+        # só das frescas) e as mantém pela maior janela em que a chave ainda pode existir, para
+        # que iter_entries alcance as vencidas guardadas para stale/revalidação
+        self.index_retention = max(self.stale_ttl, self.revalidation_window)
+        self.refresh_prefix = "page_refresh:"
+        # Cache negativo: URLs cujo download falhou respondem com os dados de fallback por
+        # negative_ttl segundos, sem tentar o download de novo
+        self.negative_prefix = "page_negative:"
+        self.negative_ttl = int(os.getenv("PAGE_NEGATIVE_TTL", 300))
+        # Contadores de desfecho das extrações (compartilhados entre workers via Redis)
+        self.stats_key = "page_stats"
+        # L1 em memória (PAGE_L1_MAX_BYTES=0 desabilita)
+        self.l1 = LocalLRUCache(
+            max_bytes=int(os.getenv("PAGE_L1_MAX_BYTES", 32 * 1024 * 1024)),
+            max_entries=int(os.getenv("PAGE_L1_MAX_ENTRIES", 2000)),
+            ttl=float(os.getenv("PAGE_L1_TTL", 30))
+        )
+        self.l1_enabled = self.l1.max_bytes > 0
+        self.invalidation_channel = "page_cache:invalidate"
+        self._tier_counters = {"l1_hits": 0, "l2_hits": 0, "misses": 0}
+        self._tier_lock = threading.Lock()
+        # Identidade deste processo nas mensagens de invalidação e pid em que a assinatura
+        # foi iniciada (refeitas em um processo criado por fork)
+        self._sender_id = None
+        self._subscriber_pid = None
+        self._ensure_index()
+
+    def _get_entry(self, url: str) -> Optional[Dict[str, Any]]:
+        cached_data = self.value_client.get(f"{self.prefix}{url}")
+        return self.codec.decode(cached_data) if cached_data else None
+
+    def _sender(self) -> str:
+        pid = os.getpid()
+        if self._sender_id is None or not self._sender_id.startswith(f"{pid}-"):
+            self._sender_id = f"{pid}-{uuid.uuid4().hex}"
+        return self._sender_id
+
+    def _count_tier(self, counter: str):
+        with self._tier_lock:
+            self._tier_counters[counter] += 1
+
+    def _ensure_subscriber(self):
+        """Inicia (uma vez por processo) a thread que recebe as invalidações dos outros workers."""
+        pid = os.getpid()
+        if self._subscriber_pid == pid:
+            return
+        with self._tier_lock:
+            if self._subscriber_pid == pid:
+                return
+            if self._subscriber_pid is not None:
+                # Processo filho de um fork: o L1 herdado não recebe mais invalidações
+                self.l1.clear()
+            self._subscriber_pid = pid
+        threading.Thread(target=self._listen_invalidations, name="page-cache-invalidation", daemon=True).start()
+
+    def _listen_invalidations(self):
+        delay = 1
+        while True:
+            client = self.redis_client
+            if client is not None:
+                try:
+                    pubsub = client.pubsub(ignore_subscribe_messages=True)
+                    pubsub.subscribe(self.invalidation_channel)
+                    # Invalidações podem ter sido perdidas antes da assinatura (ou enquanto ela caiu)
+                    self.l1.clear()
+                    delay = 1
+                    while True:
+                        message = pubsub.get_message(timeout=1.0)
+                        if message and message["type"] == "message":
+                            sender, _, url = message["data"].partition(" ")
+                            if sender != self._sender():
+                                self.l1.pop(url)
+                except Exception as e:
+                    logging.warning(f"Assinatura de invalidações do cache interrompida: {e}. Nova tentativa em {delay}s.")
+                    self.l1.clear()
+            time.sleep(delay)
+            delay = min(delay * 2, 30)
+
+    def _invalidate_l1(self, url: str):
+        """Remove a URL do L1 deste processo e avisa os outros workers."""
+        if not self.l1_enabled:
+            return
+        self.l1.pop(url)
+        # Sem Redis não há a quem avisar (nem espera pelo timeout do socket): os outros workers
+        # esvaziam o L1 ao refazer a assinatura, e o TTL do L1 limita o atraso até lá
+        if not self._is_connected():
+            return
+        try:
+            self.redis_client.publish(self.invalidation_channel, f"{self._sender()} {url}")
+        except Exception as e:
+            logging.error(f"Erro ao publicar invalidação do cache: {e}")
+
+    def _get_l1_entry(self, url: str) -> Optional[Dict[str, Any]]:
+        """Entrada da URL no L1 (cópia rasa: quem lê pode marcar "stale" sem afetar o L1)."""
+        if not self.l1_enabled:
+            return None
+        self._ensure_subscriber()
+        entry = self.l1.get(url)
+        if entry is None:
+            return None
+        self._count_tier("l1_hits")
+        return dict(entry)
 
-    def get_cached_data(self, url: str) -> Optional[Dict[str, Any]]:
+    def _get_l2_entry(self, url: str) -> Optional[Dict[str, Any]]:
+        """Entrada da URL no Redis, guardada também no L1."""
+        # Lida antes do GET: se uma invalidação chegar durante a leitura, o valor não vai para o L1
+        generation = self.l1.generation
+        cached_data = self.value_client.get(f"{self.prefix}{url}")
+        if not cached_data:
+            self._count_tier("misses")
+            return None
+        self._count_tier("l2_hits")
+        entry, size = self.codec.decode_with_size(cached_data)
+        if self.l1_enabled:
+            self.l1.put(url, entry, size, generation=generation)
+            return dict(entry)
+        return entry
+
+    def _is_fresh(self, entry: Dict[str, Any]) -> bool:
+        # Entradas gravadas antes de existir expires_at valem enquanto a chave existir
+        expires_at = entry.get("expires_at")
+        return expires_at is None or expires_at > time.time()
+
+    def _is_servable_stale(self, entry: Dict[str, Any]) -> bool:
+        return entry["expires_at"] + self.stale_ttl > time.time()
+
+    def get_cached_data(self, url: str, allow_stale: bool = False) -> Optional[Dict[str, Any]]:
         """
         Recupera dados em cache para uma URL.
         
         Args:
             url: URL da página
+            allow_stale: Se True, uma entrada vencida há menos de stale_ttl segundos também
+                é retornada, com "stale": True (cabe ao chamador agendar a atualização)
             
         Returns:
-            Dados em cache ou None se não encontrado
+            Dados em cache ou None se não encontrado (ou expirado)
         """
-        if not self._is_connected():
-            return None
-            
         try:
-            cache_key = f"{self.prefix}{url}"
-            cached_data = self.redis_client.get(cache_key)
+            # Sem ida ao Redis (nem PING) quando a entrada está no L1
+            data = self._get_l1_entry(url)
+            if data is None:
+                if self._use_fallback():
+                    data = self.fallback.get(f"{self.prefix}{url}")
+                elif self._is_connected():
+                    data = self._get_l2_entry(url)
             
-            if cached_data:
-                data = json.loads(cached_data)
+            if data and self._is_fresh(data):
                 logging.info(f"Dados encontrados no cache para: {url}")
                 return data
             
+            if data and allow_stale and self._is_servable_stale(data):
+                logging.info(f"Dados vencidos (stale) encontrados no cache para: {url}")
+                data["stale"] = True
+                return data
+            
             logging.info(f"Nenhum dado em cache para: {url}")
             return None
             
@@ -88,7 +446,53 @@ class PageCache(CacheManager):
             logging.error(f"Erro ao recuperar dados do cache: {e}")
             return None
 
-    def set_cached_data(self, url: str, data: Dict[str, Any], ttl: int = None) -> bool:
+    def get_revalidation_entry(self, url: str) -> Optional[Dict[str, Any]]:
+        """
+        Recupera a entrada de uma URL, mesmo expirada, se ela tiver validadores HTTP ou hash do HTML.
+        
+        Args:
+            url: URL da página
+            
+        Returns:
+            Entrada com "data", "validators" e/ou "content_hash" ou None
+        """
+        if not self._is_available():
+            return None
+            
+        try:
+            data = self.fallback.get(f"{self.prefix}{url}") if self._use_fallback() else self._get_entry(url)
+            if data and (data.get("validators") or data.get("content_hash")):
+                return data
+            return None
+            
+        except Exception as e:
+            logging.error(f"Erro ao recuperar entrada para revalidação: {e}")
+            return None
+
+    def _store_entry(self, url: str, cache_data: Dict[str, Any], ttl: int) -> bool:
+        cache_data["expires_at"] = time.time() + ttl
+        cache_data.pop("stale", None)
+        # Com validadores ou hash a chave sobrevive ao TTL lógico pela janela de revalidação
+        # e, em todo caso, pela janela em que ainda pode ser servida como stale
+        reusable = cache_data.get("validators") or cache_data.get("content_hash")
+        redis_ttl = ttl + max(self.stale_ttl, self.revalidation_window if reusable else 0)
+        payload, size = self.codec.encode_with_size(cache_data)
+        if self._use_fallback():
+            success = self.fallback.set(f"{self.prefix}{url}", cache_data, redis_ttl)
+        else:
+            with self.value_client.pipeline() as pipe:
+                pipe.setex(f"{self.prefix}{url}", redis_ttl, payload)
+                self._index_add(pipe, url, ttl)
+                success = pipe.execute()[0]
+        # Também no backend em memória: as leituras consultam o L1 antes dele
+        if success and self.l1_enabled:
+            self._invalidate_l1(url)
+            self.l1.put(url, cache_data, size)
+        return success
+
+    def set_cached_data(self, url: str, data: Dict[str, Any], ttl: int = None,
+                        validators: Dict[str, str] = None, content_hash: str = None,
+                        extractor_version: str = None) -> bool:
         """
         Armazena dados no cache para uma URL.
         
@@ -96,29 +500,32 @@ class PageCache(CacheManager):
             url: URL da página
             data: Dados a serem armazenados
             ttl: Tempo de vida em segundos (opcional)
+            validators: ETag/Last-Modified da origem (opcional)
+            content_hash: Hash do HTML que gerou os dados (opcional)
+            extractor_version: Versão do extrator que gerou os dados (opcional)
             
         Returns:
             True se armazenado com sucesso, False caso contrário
         """
-        if not self._is_connected():
+        if not self._is_available():
             return False
             
         try:
-            cache_key = f"{self.prefix}{url}"
-            
             # Adiciona metadados
             cache_data = {
                 "data": data,
                 "cached_at": datetime.now().isoformat(),
                 "url": url
             }
+            if validators:
+                cache_data["validators"] = validators
+            if content_hash:
+                cache_data["content_hash"] = content_hash
+            if extractor_version:
+                cache_data["extractor_version"] = extractor_version
             
             ttl = ttl or self.default_ttl
-            success = self.redis_client.setex(
-                cache_key,
-                ttl,
-                json.dumps(cache_data, ensure_ascii=False)
-            )
+            success = self._store_entry(url, cache_data, ttl)
             
             if success:
                 logging.info(f"Dados armazenados no cache para: {url} (TTL: {ttl}s)")
@@ -131,22 +538,266 @@ class PageCache(CacheManager):
             logging.error(f"Erro ao armazenar dados no cache: {e}")
             return False
 
-    def invalidate_cache(self, url: str) -> bool:
+    def extend_ttl(self, url: str, entry: Dict[str, Any], ttl: int = None,
+                   validators: Dict[str, str] = None) -> bool:
         """
-        Remove dados do cache para uma URL específica.
+        Renova o TTL de uma entrada revalidada (304) ou com HTML inalterado, sem tocar nos dados.
         
         Args:
             url: URL da página
+            entry: Entrada retornada por get_revalidation_entry
+            ttl: Novo tempo de vida em segundos (opcional)
+            validators: Validadores atualizados pela origem (opcional)
             
         Returns:
-            True se removido com sucesso, False caso contrário
+            True se renovado com sucesso, False caso contrário
+        """
+        if not self._is_available():
+            return False
+            
+        try:
+            cache_data = dict(entry)
+            cache_data["revalidated_at"] = datetime.now().isoformat()
+            if validators:
+                cache_data["validators"] = validators
+            
+            ttl = ttl or self.default_ttl
+            success = self._store_entry(url, cache_data, ttl)
+            if success:
+                logging.info(f"TTL renovado após revalidação para: {url} (TTL: {ttl}s)")
+            return bool(success)
+                
+        except Exception as e:
+            logging.error(f"Erro ao renovar TTL no cache: {e}")
+            return False
+
+    def replace_data(self, url: str, entry: Dict[str, Any], data: Dict[str, Any],
+                     extractor_version: str) -> bool:
+        """
+        Troca os dados de uma entrada existente (reprocessada a partir do HTML arquivado),
+        mantendo o TTL restante. Não recria entradas que expiraram nesse meio tempo nem
+        sobrescreve entradas que passaram a vir de outro HTML.
+        
+        Args:
+            url: URL da página
+            entry: Entrada atual (de iter_entries)
+            data: Novos dados extraídos
+            extractor_version: Versão do extrator que gerou os novos dados
+            
+        Returns:
+            True se a entrada foi atualizada, False caso contrário
         """
         if not self._is_connected():
             return False
             
+        cache_key = f"{self.prefix}{url}"
         try:
+            with self.value_client.pipeline() as pipe:
+                # WATCH: se a página for extraída de novo durante o reprocessamento, a entrada
+                # nova (mais recente que o HTML arquivado) prevalece
+                pipe.watch(cache_key)
+                current = pipe.get(cache_key)
+                if not current:
+                    return False
+                cache_data = self.codec.decode(current)
+                if cache_data.get("content_hash") != entry.get("content_hash"):
+                    return False
+                cache_data["data"] = data
+                cache_data["extractor_version"] = extractor_version
+                cache_data["reprocessed_at"] = datetime.now().isoformat()
+                pipe.multi()
+                pipe.set(cache_key, self.codec.encode(cache_data), keepttl=True)
+                pipe.execute()
+            self._invalidate_l1(url)
+            return True
+            
+        except redis.WatchError:
+            logging.info(f"Entrada alterada durante o reprocessamento, mantida: {url}")
+            return False
+        except Exception as e:
+            logging.error(f"Erro ao substituir dados no cache: {e}")
+            return False
+
+    def iter_entries(self) -> Iterator[Tuple[str, Dict[str, Any]]]:
+        """Percorre todas as entradas de página (inclusive expiradas ainda guardadas) como (url, entrada)."""
+        if not self._is_connected():
+            return
+            
+        for url in self.iter_indexed():
+            try:
+                cached_data = self.value_client.get(f"{self.prefix}{url}")
+                if cached_data:
+                    yield url, self.codec.decode(cached_data)
+            except Exception as e:
+                logging.error(f"Erro ao ler entrada {url} do cache: {e}")
+
+    def get_negative(self, url: str) -> Optional[Dict[str, Any]]:
+        """
+        Verifica se a URL está no cache negativo (download falhou recentemente).
+        
+        Args:
+            url: URL da página
+            
+        Returns:
+            Entrada com "data" (dados de fallback) e "failed_at", ou None
+        """
+        if not self._is_available():
+            return None
+            
+        try:
+            if self._use_fallback():
+                return self.fallback.get(f"{self.negative_prefix}{url}")
+            cached_data = self.value_client.get(f"{self.negative_prefix}{url}")
+            return self.codec.decode(cached_data) if cached_data else None
+        except Exception as e:
+            logging.error(f"Erro ao consultar cache negativo: {e}")
+            return None
+
+    def set_negative(self, url: str, data: Dict[str, Any], ttl: int = None) -> bool:
+        """
+        Registra uma falha de download da URL no cache negativo.
+        
+        Args:
+            url: URL da página
+            data: Dados de fallback devolvidos enquanto a entrada valer
+            ttl: Tempo de vida em segundos (padrão: negative_ttl)
+            
+        Returns:
+            True se armazenado com sucesso, False caso contrário
+        """
+        if not self._is_available():
+            return False
+            
+        try:
+            ttl = ttl or self.negative_ttl
+            entry = {"data": data, "failed_at": datetime.now().isoformat(), "url": url}
+            if self._use_fallback():
+                success = self.fallback.set(f"{self.negative_prefix}{url}", entry, ttl)
+            else:
+                success = self.value_client.setex(f"{self.negative_prefix}{url}", ttl, self.codec.encode(entry))
+            if success:
+                logging.info(f"Falha registrada no cache negativo para: {url} (TTL: {ttl}s)")
+            return bool(success)
+        except Exception as e:
+            logging.error(f"Erro ao armazenar no cache negativo: {e}")
+            return False
+
+    def claim_refresh(self, url: str, lease: int = 90) -> bool:
+        """
+        Reserva a atualização em segundo plano de uma entrada stale, para que só um worker a agende.
+        
+        Args:
+            url: URL da página
+            lease: Segundos até a reserva expirar (cobre a extração mais longa)
+            
+        Returns:
+            True se a reserva foi obtida (ou se não há Redis para coordenar)
+        """
+        if not self._is_connected():
+            return True
+            
+        try:
+            return bool(self.redis_client.set(f"{self.refresh_prefix}{url}", 1, nx=True, ex=lease))
+        except Exception as e:
+            logging.error(f"Erro ao reservar atualização no cache: {e}")
+            return True
+
+    def release_refresh(self, url: str):
+        """Libera a reserva de claim_refresh ao fim da atualização (antes de o lease expirar)."""
+        if not self._is_connected():
+            return
+            
+        try:
+            self.redis_client.delete(f"{self.refresh_prefix}{url}")
+        except Exception as e:
+            logging.error(f"Erro ao liberar reserva de atualização no cache: {e}")
+
+    def record_outcome(self, outcome: str):
+        """Incrementa o contador de um desfecho de extração (cached, extracted, not_modified, ...)."""
+        if not self._is_connected():
+            return
+            
+        try:
+            self.redis_client.hincrby(self.stats_key, outcome, 1)
+        except Exception as e:
+            logging.error(f"Erro ao registrar desfecho no cache: {e}")
+
+    def get_outcome_counts(self) -> Dict[str, int]:
+        """Retorna os contadores de desfecho de extração."""
+        if not self._is_connected():
+            return {}
+            
+        try:
+            return {outcome: int(count) for outcome, count in self.redis_client.hgetall(self.stats_key).items()}
+        except Exception as e:
+            logging.error(f"Erro ao obter desfechos do cache: {e}")
+            return {}
+
+    def _resync_entry(self, pipe, key: str, value: Any, ttl: int):
+        # Sem sobrescrever: outro worker pode ter gravado uma versão mais recente no Redis
+        super()._resync_entry(pipe, key, value, ttl)
+        if key.startswith(self.prefix):
+            expires_at = value.get("expires_at")
+            self._index_add(pipe, key[len(self.prefix):], expires_at - time.time() if expires_at else ttl)
+
+    def _index_existing(self, client, keys: List[str]) -> int:
+        # Pontuação pelo expires_at gravado na entrada: o TTL da chave inclui as janelas de
+        # stale e revalidação (entradas antigas, sem expires_at, valem enquanto a chave existir)
+        with self.value_client.pipeline(transaction=False) as pipe:
+            for key in keys:
+                pipe.get(key)
+                pipe.ttl(key)
+            results = pipe.execute()
+        now = time.time()
+        scores = {}
+        for key, raw, ttl in zip(keys, results[::2], results[1::2]):
+            if not raw:
+                continue
+            try:
+                expires_at = self.codec.decode(raw).get("expires_at")
+            except Exception:
+                expires_at = None
+            scores[key[len(self.prefix):]] = expires_at or (now + ttl if ttl >= 0 else float("inf"))
+        if scores:
+            client.zadd(self.index_key, scores)
+        return len(scores)
+
+    def get_tier_stats(self) -> Dict[str, Any]:
+        """Acertos no L1 (memória do processo), no L2 (Redis) e faltas, neste processo."""
+        with self._tier_lock:
+            counters = dict(self._tier_counters)
+        lookups = sum(counters.values())
+        return {
+            **counters,
+            "l1_hit_rate": round(counters["l1_hits"] / lookups, 4) if lookups else 0.0,
+            "l1": self.l1.get_stats() if self.l1_enabled else None
+        }
+
+    def invalidate_cache(self, url: str) -> bool:
+        """
+        Remove dados do cache para uma URL específica (inclusive a entrada negativa e a do L1).
+        
+        Args:
+            url: URL da página (normalizada aqui, como nas gravações)
+            
+        Returns:
+            True se removido com sucesso, False caso contrário
+        """
+        if not self._is_available():
+            return False
+            
+        try:
+            url = normalize_url(url)
             cache_key = f"{self.prefix}{url}"
-            result = self.redis_client.delete(cache_key)
+            result = 0
+            if self.fallback is not None:
+                result = self.fallback.delete(cache_key, f"{self.negative_prefix}{url}")
+            if self._is_connected():
+                with self.redis_client.pipeline() as pipe:
+                    pipe.delete(cache_key, f"{self.negative_prefix}{url}")
+                    pipe.zrem(self.index_key, url)
+                    result += pipe.execute()[0]
+            self._invalidate_l1(url)
             
             if result:
                 logging.info(f"Cache invalidado para: {url}")
@@ -160,32 +811,94 @@ class PageCache(CacheManager):
             return False
 
 class ConversationCache(CacheManager):
-    """Gerencia cache de histórico de conversas."""
+    """
+    Gerencia cache de histórico de conversas.
+
+    Cada conversa é uma lista Redis com uma mensagem (JSON) por elemento: adicionar é um
+    RPUSH + LTRIM + EXPIRE em uma única transação, sem reler o histórico, e a leitura pode
+    trazer só as últimas mensagens. Conversas gravadas no formato antigo (um único JSON com
+    o histórico inteiro) são convertidas no primeiro acesso ou por migrate_conversations.py.
+    """
     
     def __init__(self, redis_url: str = None):
         super().__init__(redis_url, default_ttl=86400)  # 24 horas para conversas
         self.prefix = "conversation:"
+        self.index_key = "conversation_index"
         self.max_messages = 50  # Máximo de mensagens por conversa
+        self._ensure_index()
+
+    def _with_migration(self, session_id: str, operation):
+        """Executa a operação; se a chave ainda estiver no formato antigo, converte e repete."""
+        try:
+            return operation()
+        except redis.ResponseError as e:
+            if "WRONGTYPE" not in str(e):
+                raise
+            self.migrate_session(session_id)
+            return operation()
+
+    def migrate_session(self, session_id: str) -> bool:
+        """
+        Converte o histórico de uma sessão do formato antigo (JSON único) para lista,
+        mantendo as últimas max_messages mensagens e o TTL restante.
+        
+        Args:
+            session_id: ID da sessão
+            
+        Returns:
+            True se a chave foi convertida, False se já era lista (ou não existe)
+        """
+        cache_key = f"{self.prefix}{session_id}"
+        try:
+            with self.value_client.pipeline() as pipe:
+                # WATCH: se outro worker converter ou gravar a sessão no meio, a conversão dele vale
+                pipe.watch(cache_key)
+                if pipe.type(cache_key) != b"string":
+                    return False
+                history = self.codec.decode(pipe.get(cache_key) or b"[]")[-self.max_messages:]
+                ttl = pipe.pttl(cache_key)
+                pipe.multi()
+                pipe.delete(cache_key)
+                if history:
+                    pipe.rpush(cache_key, *[self.codec.encode(message) for message in history])
+                    pipe.pexpire(cache_key, ttl if ttl > 0 else self.default_ttl * 1000)
+                pipe.execute()
+            logging.info(f"Histórico convertido para lista na sessão: {session_id} ({len(history)} mensagens)")
+            return True
+        except redis.WatchError:
+            return False
 
-    def get_conversation_history(self, session_id: str) -> List[Dict[str, str]]:
+    def _resync_entry(self, pipe, key: str, value: Any, ttl: int):
+        # As mensagens da queda vão para o fim do histórico que já estava no Redis
+        pipe.rpush(key, *[self.codec.encode(message) for message in value])
+        pipe.ltrim(key, -self.max_messages, -1)
+        pipe.expire(key, ttl)
+        self._index_add(pipe, key[len(self.prefix):], ttl)
+
+    def get_conversation_history(self, session_id: str, limit: int = None) -> List[Dict[str, str]]:
         """
         Recupera o histórico de conversa para uma sessão.
         
         Args:
             session_id: ID da sessão
+            limit: Só as últimas N mensagens (padrão: todas)
             
         Returns:
             Lista de mensagens da conversa
         """
-        if not self._is_connected():
+        if not self._is_available():
             return []
             
         try:
             cache_key = f"{self.prefix}{session_id}"
-            cached_history = self.redis_client.get(cache_key)
+            if self._use_fallback():
+                history = self.fallback.lrange(cache_key, limit)
+            else:
+                start = -limit if limit else 0
+                entries = self._with_migration(session_id, lambda: self.value_client.lrange(cache_key, start, -1))
+                history = [self.codec.decode(entry) for entry in entries]
             
-            if cached_history:
-                history = json.loads(cached_history)
+            if history:
                 logging.info(f"Histórico recuperado para sessão: {session_id} ({len(history)} mensagens)")
                 return history
             
@@ -196,6 +909,44 @@ class ConversationCache(CacheManager):
             logging.error(f"Erro ao recuperar histórico de conversa: {e}")
             return []
 
+    def get_conversation_length(self, session_id: str) -> int:
+        """Número de mensagens guardadas para a sessão (LLEN, sem ler as mensagens)."""
+        if not self._is_available():
+            return 0
+            
+        try:
+            cache_key = f"{self.prefix}{session_id}"
+            if self._use_fallback():
+                return self.fallback.llen(cache_key)
+            return self._with_migration(session_id, lambda: self.redis_client.llen(cache_key))
+        except Exception as e:
+            logging.error(f"Erro ao contar mensagens da conversa: {e}")
+            return 0
+
+    def _append(self, session_id: str, messages: List[Dict[str, str]]) -> int:
+        """
+        Grava as mensagens no fim do histórico em uma única transação (RPUSH + LTRIM +
+        EXPIRE + índice de sessões): requisições simultâneas da mesma sessão não perdem mensagens.
+
+        Returns:
+            Número de mensagens do histórico depois da gravação
+        """
+        cache_key = f"{self.prefix}{session_id}"
+        if self._use_fallback():
+            return self.fallback.append(cache_key, messages, self.max_messages, self.default_ttl)
+        entries = [self.codec.encode(message) for message in messages]
+
+        def append():
+            with self.value_client.pipeline() as pipe:
+                pipe.rpush(cache_key, *entries)
+                # Limita o número de mensagens
+                pipe.ltrim(cache_key, -self.max_messages, -1)
+                pipe.expire(cache_key, self.default_ttl)
+                self._index_add(pipe, session_id, self.default_ttl)
+                return min(pipe.execute()[0], self.max_messages)
+
+        return self._with_migration(session_id, append)
+
     def add_message(self, session_id: str, role: str, content: str) -> bool:
         """
         Adiciona uma mensagem ao histórico de conversa.
@@ -208,34 +959,18 @@ class ConversationCache(CacheManager):
         Returns:
             True se adicionado com sucesso, False caso contrário
         """
-        if not self._is_connected():
+        if not self._is_available():
             return False
             
         try:
-            # Recupera histórico atual
-            history = self.get_conversation_history(session_id)
-            
-            # Adiciona nova mensagem
             new_message = {
                 "role": role,
                 "content": content,
                 "timestamp": datetime.now().isoformat()
             }
-            history.append(new_message)
-            
-            # Limita o número de mensagens
-            if len(history) > self.max_messages:
-                history = history[-self.max_messages:]
-            
-            # Salva histórico atualizado
-            cache_key = f"{self.prefix}{session_id}"
-            success = self.redis_client.setex(
-                cache_key,
-                self.default_ttl,
-                json.dumps(history, ensure_ascii=False)
-            )
+            length = self._append(session_id, [new_message])
             
-            if success:
+            if length:
                 logging.info(f"Mensagem adicionada à sessão: {session_id}")
                 return True
             else:
@@ -246,6 +981,35 @@ class ConversationCache(CacheManager):
             logging.error(f"Erro ao adicionar mensagem: {e}")
             return False
 
+    def append_turn(self, session_id: str, user_message: str, assistant_message: str) -> int:
+        """
+        Adiciona a pergunta do usuário e a resposta do assistente ao histórico, renovando o
+        TTL, em uma única ida ao Redis.
+        
+        Args:
+            session_id: ID da sessão
+            user_message: Pergunta do usuário
+            assistant_message: Resposta do assistente
+            
+        Returns:
+            Número de mensagens do histórico após a gravação (0 se não foi gravado)
+        """
+        if not self._is_available():
+            return 0
+            
+        try:
+            timestamp = datetime.now().isoformat()
+            length = self._append(session_id, [
+                {"role": "user", "content": user_message, "timestamp": timestamp},
+                {"role": "assistant", "content": assistant_message, "timestamp": timestamp}
+            ])
+            logging.info(f"Turno adicionado à sessão: {session_id} ({length} mensagens)")
+            return length
+            
+        except Exception as e:
+            logging.error(f"Erro ao adicionar turno da conversa: {e}")
+            return 0
+
     def clear_conversation(self, session_id: str) -> bool:
         """
         Limpa o histórico de uma conversa específica.
@@ -256,12 +1020,17 @@ class ConversationCache(CacheManager):
         Returns:
             True se limpo com sucesso, False caso contrário
         """
-        if not self._is_connected():
+        if not self._is_available():
             return False
             
         try:
             cache_key = f"{self.prefix}{session_id}"
-            result = self.redis_client.delete(cache_key)
+            result = self.fallback.delete(cache_key) if self.fallback is not None else 0
+            if self._is_connected():
+                with self.redis_client.pipeline() as pipe:
+                    pipe.delete(cache_key)
+                    pipe.zrem(self.index_key, session_id)
+                    result += pipe.execute()[0]
             
             if result:
                 logging.info(f"Conversa limpa para sessão: {session_id}")
@@ -276,25 +1045,18 @@ class ConversationCache(CacheManager):
 
     def get_active_sessions(self) -> List[str]:
         """
-        Retorna lista de sessões ativas.
+        Retorna lista de sessões ativas (percorrendo o índice em páginas, sem KEYS).
         
         Returns:
             Lista de IDs de sessões ativas
         """
-        if not self._is_connected():
-            return []
-            
-        try:
-            pattern = f"{self.prefix}*"
-            keys = self.redis_client.keys(pattern)
-            sessions = [key.replace(self.prefix, "") for key in keys]
-            
-            logging.info(f"Encontradas {len(sessions)} sessões ativas")
-            return sessions
-            
-        except Exception as e:
-            logging.error(f"Erro ao recuperar sessões ativas: {e}")
-            return []
+        sessions = list(self.iter_indexed())
+        logging.info(f"Encontradas {len(sessions)} sessões ativas")
+        return sessions
+
+    def count_active_sessions(self) -> int:
+        """Número de sessões ativas, sem listá-las."""
+        return self.count_indexed()
 
 # Instâncias globais para uso na aplicação
 page_cache = PageCache()
@@ -311,6 +1073,17 @@ def get_cache_stats() -> Dict[str, Any]:
         "redis_connected": False,
         "active_sessions": 0,
         "cached_pages": 0,
+        "expired_pages": 0,
+        "page_outcomes": {},
+        "page_tiers": page_cache.get_tier_stats(),
+        "backends": {
+            "page": page_cache.get_backend_stats(),
+            "conversation": conversation_cache.get_backend_stats()
+        },
+        "redis_health": {
+            "page": page_cache.health.get_stats(),
+            "conversation": conversation_cache.health.get_stats()
+        },
         "redis_info": {}
     }
     
@@ -318,13 +1091,14 @@ def get_cache_stats() -> Dict[str, Any]:
         if page_cache._is_connected():
             stats["redis_connected"] = True
             
-            # Conta sessões ativas
-            sessions = conversation_cache.get_active_sessions()
-            stats["active_sessions"] = len(sessions)
+            # Conta sessões ativas e páginas em cache pelos índices (O(log N), sem KEYS)
+            stats["active_sessions"] = conversation_cache.count_active_sessions()
+            stats["cached_pages"] = page_cache.count_indexed()
+            # Vencidas, ainda guardadas para servir como stale ou revalidar
+            stats["expired_pages"] = page_cache.count_indexed_expired()
             
-            # Conta páginas em cache
-            page_keys = page_cache.redis_client.keys(f"{page_cache.prefix}*")
-            stats["cached_pages"] = len(page_keys)
+            # Desfechos das extrações de página
+            stats["page_outcomes"] = page_cache.get_outcome_counts()
             
             # Informações do Redis
             redis_info = page_cache.redis_client.info()
@@ -0,0 +1,151 @@
+import logging
+import os
+import time
+from typing import Dict, Any, Optional, TYPE_CHECKING
+
+from lazy_cache import LazyPageCache
+
+if TYPE_CHECKING:
+    from cache_manager_melhorado import CacheManager
+
+# Configuração de logs
+logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+
+class CircuitBreaker:
+    """
+    Circuit breaker por upstream ("direct", "scrapingbee") e domínio, compartilhado entre
+    workers via Redis.
+
+    - fechado: as requisições passam; falhas consecutivas são contadas (e esquecidas depois
+      de failure_window segundos sem nova falha)
+    - aberto: após failure_threshold falhas, as requisições falham na hora por open_seconds
+    - meio-aberto: passado esse tempo, uma única requisição de teste é liberada; sucesso
+      fecha o circuito, falha o abre de novo
+
+    Sem Redis o circuito fica sempre fechado (mesmo comportamento de antes).
+    """
+
+    cache = LazyPageCache()
+
+    def __init__(self, cache: Optional["CacheManager"] = None, failure_threshold: int = 3,
+                 open_seconds: int = 60, failure_window: int = 300, probe_lease: int = 60):
+        """
+        Args:
+            cache: CacheManager cuja conexão Redis guarda os estados (padrão: page_cache,
+                resolvido no primeiro uso)
+            failure_threshold: Falhas seguidas que abrem o circuito
+            open_seconds: Tempo em que o circuito fica aberto antes do teste
+            failure_window: Validade da contagem de falhas sem nova falha
+            probe_lease: Tempo máximo da requisição de teste (depois outra pode testar)
+        """
+        self.cache = cache
+        self.prefix = "circuit:"
+        self.index_key = "circuit_index"
+        self.failure_threshold = failure_threshold
+        self.open_seconds = open_seconds
+        self.failure_window = failure_window
+        self.probe_lease = probe_lease
+
+    def _key(self, upstream: str, domain: str) -> str:
+        return f"{self.prefix}{upstream}:{domain}"
+
+    def allow(self, upstream: str, domain: str) -> bool:
+        """Verifica se uma requisição ao upstream para o domínio pode ser feita agora."""
+        if not self.cache._is_connected():
+            return True
+        try:
+            key = self._key(upstream, domain)
+            opened_until = self.cache.redis_client.hget(key, "opened_until")
+            if opened_until is None:
+                return True
+            if time.time() < float(opened_until):
+                return False
+            # Meio-aberto: só uma requisição de teste por vez
+            return bool(self.cache.redis_client.set(f"{key}:probe", 1, nx=True, ex=self.probe_lease))
+        except Exception as e:
+            logging.error(f"Erro ao consultar circuit breaker: {e}")
+            return True
+
+    def record_success(self, upstream: str, domain: str):
+        """Fecha o circuito (e zera as falhas) após uma requisição bem-sucedida."""
+        if not self.cache._is_connected():
+            return
+        try:
+            key = self._key(upstream, domain)
+            if self.cache.redis_client.delete(key, f"{key}:probe"):
+                logging.info(f"Circuito fechado para {upstream}/{domain}.")
+        except Exception as e:
+            logging.error(f"Erro ao registrar sucesso no circuit breaker: {e}")
+
+    def record_failure(self, upstream: str, domain: str):
+        """Conta uma falha; abre o circuito ao atingir o limite ou se o teste do meio-aberto falhou."""
+        if not self.cache._is_connected():
+            return
+        try:
+            key = self._key(upstream, domain)
+            with self.cache.redis_client.pipeline() as pipe:
+                pipe.hincrby(key, "failures", 1)
+                pipe.hget(key, "opened_until")
+                pipe.expire(key, self.failure_window)
+                pipe.sadd(self.index_key, key)
+                failures, opened_until, _, _ = pipe.execute()
+
+            if failures >= self.failure_threshold or opened_until is not None:
+                with self.cache.redis_client.pipeline() as pipe:
+                    pipe.hset(key, "opened_until", time.time() + self.open_seconds)
+                    pipe.expire(key, self.open_seconds + self.failure_window)
+                    pipe.delete(f"{key}:probe")
+                    pipe.execute()
+                logging.warning(f"Circuito aberto para {upstream}/{domain} por {self.open_seconds}s ({failures} falhas seguidas).")
+        except Exception as e:
+            logging.error(f"Erro ao registrar falha no circuit breaker: {e}")
+
+    def get_states(self) -> Dict[str, Dict[str, Any]]:
+        """
+        Estado dos circuitos com falhas recentes.
+
+        Returns:
+            "upstream:domínio" -> {"state" (closed/open/half_open), "failures", "retry_in"}
+        """
+        if not self.cache._is_connected():
+            return {}
+        try:
+            client = self.cache.redis_client
+            keys = sorted(client.smembers(self.index_key))
+            with client.pipeline(transaction=False) as pipe:
+                for key in keys:
+                    pipe.hgetall(key)
+                entries = pipe.execute()
+
+            now = time.time()
+            states = {}
+            expired = []
+            for key, entry in zip(keys, entries):
+                if not entry:
+                    expired.append(key)
+                    continue
+                opened_until = float(entry["opened_until"]) if "opened_until" in entry else None
+                if opened_until is None:
+                    state = "closed"
+                elif now < opened_until:
+                    state = "open"
+                else:
+                    state = "half_open"
+                states[key[len(self.prefix):]] = {
+                    "state": state,
+                    "failures": int(entry.get("failures", 0)),
+                    "retry_in": round(max(opened_until - now, 0), 1) if opened_until else 0
+                }
+            if expired:
+                client.srem(self.index_key, *expired)
+            return states
+        except Exception as e:
+            logging.error(f"Erro ao obter estados do circuit breaker: {e}")
+            return {}
+
+# Instância global para uso na aplicação
+circuit_breaker = CircuitBreaker(
+    failure_threshold=int(os.getenv("CIRCUIT_FAILURE_THRESHOLD", 3)),
+    open_seconds=int(os.getenv("CIRCUIT_OPEN_SECONDS", 60)),
+    failure_window=int(os.getenv("CIRCUIT_FAILURE_WINDOW", 300))
+)
@@ -1,95 +1,658 @@
+import hashlib
 import requests
 import os
 import re
 import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FuturesTimeoutError, as_completed
 from bs4 import BeautifulSoup
 from trafilatura import extract
-from typing import Dict, List, Any
+from trafilatura.utils import load_html
+from typing import Dict, List, Any, Iterable, Iterator, Optional, Tuple, TYPE_CHECKING
+from extraction_engine import PageSignals, collect_page_signals
+from pattern_scanner import PatternScanner, ScanResult
+from http_session import get_session
+from html_stream import read_html
+from html_archive import html_archive
+from fetch_planner import fetch_planner, domain_of, DIRECT, RENDERED
+from circuit_breaker import circuit_breaker
+from stage_timing import Laps, span, stage_histograms
+from parse_pool import ParsePool, ParsePoolError
+from schema_org import extract_schema_fields, has_schema_markup, SCHEMA_FIELDS
+from lazy_cache import LazyPageCache
+
+if TYPE_CHECKING:
+    from cache_manager_melhorado import CacheManager
 
 # Configuração de logs
 logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
 
-def extract_data_from_url(url: str) -> Dict[str, Any]:
+EXTRACTOR_ENGINE = os.environ.get("EXTRACTOR_ENGINE", "single_pass")
+
+# Versão das heurísticas de extração. Deve ser incrementada a cada mudança que altere os
+# dados extraídos: entradas do page_cache com versão antiga são reprocessadas a partir do
+# HTML arquivado (python reprocess_archive.py)
+EXTRACTOR_VERSION = "2"
+
+# Estratégia de download adaptativa por domínio (FETCH_ADAPTIVE=false: sempre ScrapingBee quando há chave)
+ADAPTIVE_FETCH = os.environ.get("FETCH_ADAPTIVE", "true").lower() != "false"
+
+# Hedge do download renderizado: após FETCH_HEDGE_DELAY_MS sem resposta do ScrapingBee, um
+# download direto começa em paralelo e vence a primeira resposta boa (0 = em paralelo desde o início)
+HEDGE_ENABLED = os.environ.get("FETCH_HEDGE", "true").lower() != "false"
+HEDGE_DELAY_MS = int(os.environ.get("FETCH_HEDGE_DELAY_MS", 2000))
+# Um POST renderizado que perde o hedge não é interrompido e segue ocupando uma thread até
+# terminar; as vagas limitam quantos downloads do hedge correm ao mesmo tempo (sem vaga, o
+# download é feito sem hedge) e nenhum fica na fila do pool atrás deles
+HEDGE_WORKERS = int(os.environ.get("FETCH_HEDGE_WORKERS", 32))
+_hedge_pool = ThreadPoolExecutor(max_workers=HEDGE_WORKERS, thread_name_prefix="fetch-hedge")
+_hedge_slots = threading.BoundedSemaphore(HEDGE_WORKERS)
+
+# Download em streaming com limite de tamanho (FETCH_STREAMING=false volta a usar response.text)
+FETCH_STREAMING = os.environ.get("FETCH_STREAMING", "true").lower() != "false"
+
+# Parsing em processos separados, fora do GIL das threads que atendem requisições
+# (PARSE_POOL_WORKERS=0 volta a fazer o parsing na própria thread)
+parse_pool = ParsePool(
+    workers=int(os.environ.get("PARSE_POOL_WORKERS", os.cpu_count() or 2)),
+    max_pending=int(os.environ.get("PARSE_POOL_MAX_PENDING", 0)) or None,
+    task_timeout=float(os.environ.get("PARSE_TIMEOUT", 30)),
+    max_tasks_per_pool=int(os.environ.get("PARSE_POOL_MAX_TASKS", 500)),
+    # Só módulos de parsing, sem cache: o que importa Redis não deve ir para o forkserver
+    preload=["parse_pool", "extraction_engine", "pattern_scanner", "schema_org", "trafilatura"]
+)
+
+class FetchResult:
+    """Resultado do download de uma página."""
+
+    def __init__(self, html: str = "", validators: Dict[str, str] = None, not_modified: bool = False):
+        self.html = html
+        # Validadores HTTP da origem: {"etag": ..., "last_modified": ...}
+        self.validators = validators or {}
+        # True quando a origem respondeu 304 a uma revalidação condicional
+        self.not_modified = not_modified
+
+class ExtractionResult:
+    """
+    Resultado do pipeline de extração de uma URL.
+
+    outcome:
+        - "extracted": página baixada e extraída
+        - "not_modified": a origem respondeu 304; data é o conteúdo em cache
+        - "unchanged": a página foi baixada, mas o HTML é idêntico ao da extração em cache;
+          data é o conteúdo em cache (sem trafilatura, parse nem helpers _extract_*)
+        - "fallback": não foi possível obter o HTML; data são os dados genéricos
+    """
+
+    def __init__(self, data: Dict[str, Any], outcome: str, validators: Dict[str, str] = None,
+                 content_hash: str = None, timings: Dict[str, float] = None):
+        self.data = data
+        self.outcome = outcome
+        self.validators = validators or {}
+        # Hash do HTML que gerou data
+        self.content_hash = content_hash
+        # Duração (ms) de cada etapa do pipeline (download, parse, campos...) e o total
+        self.timings = timings or {}
+
+def extract_data_from_url(url: str, timings: Optional[Dict[str, float]] = None) -> Dict[str, Any]:
     """
     Extrai dados estruturados de uma página de vendas.
     Retorna um dicionário com informações como título, preço, benefícios, etc.
+
+    Se timings for informado, recebe a duração (ms) de cada etapa da extração.
+    """
+    result = extract_page(url)
+    if timings is not None:
+        timings.update(result.timings)
+    return result.data
+
+def extract_page(url: str, cached_entry: Optional[Dict[str, Any]] = None) -> ExtractionResult:
+    """
+    Pipeline completo de uma URL: download (ou revalidação) e extração.
+
+    Args:
+        url: URL da página
+        cached_entry: Entrada anterior do PageCache (com "data", "validators" e
+            "content_hash"). Com validadores, a página é revalidada com
+            If-None-Match/If-Modified-Since e um 304 devolve os dados em cache sem download,
+            parsing nem crédito do ScrapingBee. Se a página precisar ser baixada e o hash do
+            HTML for o mesmo da entrada (extraída pela versão atual do extrator), os dados em
+            cache são reaproveitados sem parsing
+
+    Returns:
+        ExtractionResult com os dados, o desfecho, os validadores da origem e a duração de
+        cada etapa (também agregada nos histogramas de stage_histograms)
     """
     logging.info(f"Iniciando extração de dados para: {url}")
+    timings = {}
+    with span(timings, "total"):
+        result = _run_pipeline(url, cached_entry, timings)
+    result.timings = timings
+    stage_histograms.observe(timings)
+    return result
+
+def _run_pipeline(url: str, cached_entry: Optional[Dict[str, Any]], timings: Dict[str, float]) -> ExtractionResult:
+    validators = (cached_entry or {}).get("validators")
+    fetch_result = _fetch_page(url, validators, timings)
+    if fetch_result.not_modified:
+        logging.info(f"Página não modificada desde a última extração: {url}")
+        return ExtractionResult(cached_entry["data"], "not_modified", fetch_result.validators)
     
     # Obter o HTML da página
-    html_content = _get_html_content(url)
-    if not html_content:
+    if not fetch_result.html:
         logging.error("Não foi possível obter o conteúdo HTML da página.")
-        return _get_fallback_data(url)
+        return ExtractionResult(_get_fallback_data(url), "fallback")
     
+    with span(timings, "hash"):
+        content_hash = compute_content_hash(fetch_result.html)
+    if (cached_entry and cached_entry.get("content_hash") == content_hash
+            and cached_entry.get("extractor_version") == EXTRACTOR_VERSION):
+        logging.info(f"HTML idêntico ao da última extração, reaproveitando dados: {url}")
+        return ExtractionResult(cached_entry["data"], "unchanged", fetch_result.validators, content_hash)
+    
+    try:
+        structured_data = parse_html(url, fetch_result.html, timings)
+    except ParsePoolError as e:
+        logging.error(f"{e}: {url}")
+        return ExtractionResult(_get_fallback_data(url), "fallback")
+    
+    logging.info("Extração de dados concluída com sucesso.")
+    return ExtractionResult(structured_data, "extracted", fetch_result.validators, content_hash)
+
+def compute_content_hash(html_content: str) -> str:
+    """Hash do HTML baixado, usado para detectar páginas que não mudaram."""
+    return hashlib.sha256(html_content.encode("utf-8", "surrogatepass")).hexdigest()
+
+# Frases de páginas que só exibem conteúdo com JavaScript
+JS_REQUIRED_PATTERN = re.compile(r'(habilit|ativ)(e|ar) o javascript|enable javascript|javascript (is )?required', re.IGNORECASE)
+
+def content_score(html_content: str) -> float:
+    """
+    Estima, de 0 a 1, se o HTML já traz o conteúdo real da página de vendas (e não um shell
+    de SPA que só é preenchido por JavaScript), com os mesmos sinais usados na extração:
+    volume de texto, título/h1, parágrafos, preço e CTA.
+    """
+    tree = load_html(html_content) if html_content else None
+    if tree is None:
+        return 0.0
+
+    signals = collect_page_signals(tree)
+    text = signals.full_text
+    words = len(text.split())
+    score = 0.4 * min(words / 300, 1.0)
+    if signals.h1 or signals.og_title or (signals.title and len(signals.title) > 15):
+        score += 0.15
+    if sum(1 for paragraph in signals.paragraphs if len(paragraph.strip()) > 40) >= 2:
+        score += 0.15
+    if any(signals.price_texts) or any(PRICE_SCANNER.scan(text).findall("preco")):
+        score += 0.15
+    if any(_looks_like_cta(cta.strip()) for texts in signals.cta_texts for cta in texts):
+        score += 0.15
+    if words < 150 and JS_REQUIRED_PATTERN.search(text):
+        score /= 2
+    return round(score, 3)
+
+def extract_data_from_html(url: str, html_content: str, timings: Optional[Dict[str, float]] = None,
+                           fast_path: Optional[List[str]] = None) -> Dict[str, Any]:
+    """
+    Etapa de parsing: transforma o HTML já baixado nos dados estruturados da página.
+
+    Por padrão usa o motor de passada única (EXTRACTOR_ENGINE=single_pass), que faz um único
+    parse com lxml, percorre o DOM uma vez e reaproveita a mesma árvore no trafilatura.
+    EXTRACTOR_ENGINE=legacy mantém o caminho original com BeautifulSoup.
+
+    Nos dois motores, os campos publicados pela página em JSON-LD/microdata schema.org
+    (nome, descrição, preço e avaliações de um produto) são usados diretamente, sem os
+    helpers heurísticos correspondentes.
+
+    Args:
+        url: URL da página
+        html_content: HTML baixado
+        timings: Se informado, recebe a duração (ms) de cada etapa e de cada campo
+        fast_path: Se informado, recebe os campos que vieram dos dados schema.org
+    """
+    if EXTRACTOR_ENGINE == "legacy":
+        return _extract_with_legacy_engine(url, html_content, timings, fast_path)
+    return _extract_with_single_pass_engine(url, html_content, timings, fast_path)
+
+class SchemaFastPathStats:
+    """
+    Taxa de acerto do atalho schema.org: em quantas páginas extraídas cada campo veio dos
+    dados estruturados (e dispensou as heurísticas). Agregada entre workers no Redis e
+    registrada aqui, no processo que atende a requisição, com os campos que o parsing
+    devolve (schema_org só extrai, sem depender do cache).
+    """
+
+    cache = LazyPageCache()
+
+    def __init__(self, cache: Optional["CacheManager"] = None):
+        self.cache = cache
+        self.stats_key = "schema_fast_path"
+
+    def record(self, fields: List[str]):
+        """Registra uma página extraída e os campos que vieram dos dados estruturados."""
+        if not self.cache._is_connected():
+            return
+        try:
+            with self.cache.redis_client.pipeline(transaction=False) as pipe:
+                pipe.hincrby(self.stats_key, "pages", 1)
+                if fields:
+                    pipe.hincrby(self.stats_key, "pages_with_schema", 1)
+                for field in fields:
+                    pipe.hincrby(self.stats_key, field, 1)
+                pipe.execute()
+        except Exception as e:
+            logging.error(f"Erro ao registrar uso dos dados estruturados: {e}")
+
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        Returns:
+            {"pages", "pages_with_schema", "hit_rate", "fields": {campo: {"hits", "hit_rate"}}}
+        """
+        if not self.cache._is_connected():
+            return {}
+        try:
+            counters = self.cache.redis_client.hgetall(self.stats_key)
+        except Exception as e:
+            logging.error(f"Erro ao obter estatísticas dos dados estruturados: {e}")
+            return {}
+
+        pages = int(counters.get("pages", 0))
+        with_schema = int(counters.get("pages_with_schema", 0))
+        return {
+            "pages": pages,
+            "pages_with_schema": with_schema,
+            "hit_rate": round(with_schema / pages, 4) if pages else 0.0,
+            "fields": {
+                field: {
+                    "hits": int(counters.get(field, 0)),
+                    "hit_rate": round(int(counters.get(field, 0)) / pages, 4) if pages else 0.0
+                }
+                for field in SCHEMA_FIELDS
+            }
+        }
+
+# Instância global para uso na aplicação
+schema_stats = SchemaFastPathStats()
+
+def parse_html(url: str, html_content: str, timings: Optional[Dict[str, float]] = None) -> Dict[str, Any]:
+    """
+    extract_data_from_html executado no parse_pool (ou na própria thread, sem pool).
+
+    Em timings, além das etapas do parsing, "fila_parse" é o tempo de espera por um
+    processo livre somado ao envio do HTML e ao retorno dos dados.
+
+    Raises:
+        ParsePoolError: se o parsing passar de PARSE_TIMEOUT segundos (ParsePoolTimeout) ou o
+            processo morrer durante a tarefa (ParsePoolBroken)
+    """
+    start = time.perf_counter()
+    structured_data, parse_timings, parse_ms, fast_path = parse_pool.run(_parse_in_worker, url, html_content)
+    schema_stats.record(fast_path)
+    if timings is not None:
+        for stage, ms in parse_timings.items():
+            timings[stage] = timings.get(stage, 0.0) + ms
+        timings["fila_parse"] = max((time.perf_counter() - start) * 1000 - parse_ms, 0.0)
+    return structured_data
+
+def _parse_in_worker(url: str, html_content: str) -> Tuple[Dict[str, Any], Dict[str, float], float, List[str]]:
+    """
+    Roda no processo do parse_pool: dados extraídos, tempos por etapa, duração total (ms) e
+    campos obtidos dos dados schema.org.
+    """
+    timings = {}
+    fast_path = []
+    start = time.perf_counter()
+    structured_data = extract_data_from_html(url, html_content, timings, fast_path)
+    return structured_data, timings, (time.perf_counter() - start) * 1000, fast_path
+
+def _extract_with_single_pass_engine(url: str, html_content: str, timings: Optional[Dict[str, float]] = None,
+                                     fast_path: Optional[List[str]] = None) -> Dict[str, Any]:
+    """Um único parse lxml compartilhado entre a coleta de sinais e o trafilatura."""
+    lap = Laps(timings)
+    tree = load_html(html_content)
+    lap("parse")
+    if tree is None:
+        logging.warning("lxml não conseguiu interpretar o HTML. Usando o motor legado.")
+        return _extract_with_legacy_engine(url, html_content, timings, fast_path)
+
+    # A coleta precisa acontecer antes do trafilatura, que pode podar a árvore
+    signals = collect_page_signals(tree)
+    lap("sinais")
+    schema = extract_schema_fields(tree) if has_schema_markup(html_content) else {}
+    if fast_path is not None:
+        fast_path.extend(schema)
+    lap("schema")
+
+    main_text = extract(tree, include_comments=False, include_tables=False)
+    if not main_text:
+        logging.warning("Trafilatura não conseguiu extrair texto. Usando o texto completo do DOM.")
+        main_text = signals.full_text
+    lap("trafilatura")
+
+    # Todos os padrões de texto (preço, benefícios, CTA, garantia, público) em uma passada
+    scan = SALES_SCANNER.scan(main_text)
+    lap("padroes")
+
+    structured_data = {"url": url}
+    structured_data["titulo"] = schema.get("titulo") or _title_from_signals(signals, main_text)
+    lap("campo.titulo")
+    structured_data["descricao"] = schema.get("descricao") or _description_from_signals(signals, main_text)
+    lap("campo.descricao")
+    structured_data["preco"] = schema.get("preco") or _price_from_signals(signals, scan)
+    lap("campo.preco")
+    structured_data["beneficios"] = _benefits_from_signals(signals, scan, main_text)
+    lap("campo.beneficios")
+    structured_data["cta"] = _cta_from_signals(signals, scan)
+    lap("campo.cta")
+    structured_data["garantia"] = _guarantee_from_matches(scan.findall("garantia"))
+    lap("campo.garantia")
+    structured_data["publico_alvo"] = _target_audience_from_matches(scan.findall("publico_alvo"))
+    lap("campo.publico_alvo")
+    structured_data["depoimentos"] = schema.get("depoimentos") or _testimonials_from_signals(signals)
+    lap("campo.depoimentos")
+    structured_data["tipo_produto"] = _product_type_from_text(main_text)
+    lap("campo.tipo_produto")
+    return structured_data
+
+def _extract_with_legacy_engine(url: str, html_content: str, timings: Optional[Dict[str, float]] = None,
+                                fast_path: Optional[List[str]] = None) -> Dict[str, Any]:
+    """Caminho original: trafilatura + BeautifulSoup (html.parser) e um helper por campo."""
+    lap = Laps(timings)
+    schema = {}
+    if has_schema_markup(html_content):
+        tree = load_html(html_content)
+        schema = extract_schema_fields(tree) if tree is not None else {}
+    if fast_path is not None:
+        fast_path.extend(schema)
+    lap("schema")
     # Extrair texto principal usando trafilatura
     main_text = extract(html_content, include_comments=False, include_tables=False)
     if not main_text:
         logging.warning("Trafilatura não conseguiu extrair texto. Tentando com BeautifulSoup.")
         main_text = _extract_text_with_bs4(html_content)
+    lap("trafilatura")
     
     # Analisar HTML com BeautifulSoup para extração estruturada
     soup = BeautifulSoup(html_content, 'html.parser')
+    lap("parse")
     
     # Extrair dados estruturados
-    structured_data = {
-        "url": url,
-        "titulo": _extract_title(soup, main_text),
-        "descricao": _extract_description(soup, main_text),
-        "preco": _extract_price(soup, main_text),
-        "beneficios": _extract_benefits(soup, main_text),
-        "cta": _extract_cta(soup, main_text),
-        "garantia": _extract_guarantee(soup, main_text),
-        "publico_alvo": _extract_target_audience(soup, main_text),
-        "depoimentos": _extract_testimonials(soup, main_text),
-        "tipo_produto": _extract_product_type(soup, main_text)
-    }
-    
-    logging.info("Extração de dados concluída com sucesso.")
+    structured_data = {"url": url}
+    for field, helper in LEGACY_FIELD_HELPERS:
+        structured_data[field] = schema[field] if field in schema else helper(soup, main_text)
+        lap(f"campo.{field}")
     return structured_data
 
+DEFAULT_HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
+}
+
+def _read_body(response, cancel: Optional[threading.Event] = None) -> str:
+    """Lê o HTML da resposta (aberta com stream=True) conforme o modo de download configurado."""
+    if FETCH_STREAMING:
+        return read_html(response, cancel=cancel)
+    return response.text
+
 def _get_html_content(url: str) -> str:
     """Obtém o conteúdo HTML da página usando ScrapingBee ou fallback."""
+    return _fetch_page(url).html
+
+def _validators_from_headers(headers, prefix: str = "") -> Dict[str, str]:
+    """Lê ETag/Last-Modified da resposta (o ScrapingBee repassa os da origem com prefixo Spb-)."""
+    validators = {}
+    if headers.get(f"{prefix}ETag"):
+        validators["etag"] = headers[f"{prefix}ETag"]
+    if headers.get(f"{prefix}Last-Modified"):
+        validators["last_modified"] = headers[f"{prefix}Last-Modified"]
+    return validators
+
+def _revalidate(url: str, validators: Dict[str, str], accept_body: bool) -> Optional[FetchResult]:
+    """
+    Requisição condicional direta à origem.
+
+    Returns:
+        FetchResult com not_modified=True em um 304; o HTML novo em um 200 se accept_body;
+        None quando é preciso seguir com o download normal
+    """
+    headers = dict(DEFAULT_HEADERS)
+    if validators.get("etag"):
+        headers["If-None-Match"] = validators["etag"]
+    if validators.get("last_modified"):
+        headers["If-Modified-Since"] = validators["last_modified"]
+
+    domain = domain_of(url)
+    if not circuit_breaker.allow("direct", domain):
+        logging.warning(f"Circuito aberto para direct/{domain}. Revalidação ignorada: {url}")
+        return None
+
+    try:
+        # stream=True: se a página mudou e o download será feito pelo ScrapingBee, o corpo nem é lido
+        with get_session("direct").get(url, headers=headers, timeout=15, stream=True) as response:
+            if response.status_code == 304:
+                circuit_breaker.record_success("direct", domain)
+                return FetchResult(validators=_validators_from_headers(response.headers) or validators, not_modified=True)
+            response.raise_for_status()
+            circuit_breaker.record_success("direct", domain)
+            if not accept_body:
+                return None
+            return FetchResult(_read_body(response), _validators_from_headers(response.headers))
+    except requests.exceptions.RequestException as e:
+        logging.warning(f"Falha na revalidação condicional de {url}: {e}")
+        _record_request_failure("direct", domain, e)
+        return None
+
+def _fetch_page(url: str, validators: Optional[Dict[str, str]] = None,
+                timings: Optional[Dict[str, float]] = None) -> FetchResult:
+    """
+    Baixa a página (ver _download_page) e guarda o HTML no arquivo local para reprocessamento.
+    """
+    with span(timings, "download"):
+        result = _download_page(url, validators)
+    if result.html:
+        with span(timings, "arquivo"):
+            html_archive.store(url, result.html, compute_content_hash(result.html), result.validators, EXTRACTOR_VERSION)
+    return result
+
+def _download_page(url: str, validators: Optional[Dict[str, str]] = None) -> FetchResult:
+    """
+    Baixa a página usando requisição direta ou ScrapingBee (renderizada).
+
+    Com SCRAPINGBEE_API_KEY, o fetch_planner escolhe a estratégia por domínio: domínios
+    desconhecidos ou que funcionam sem JavaScript recebem primeiro um download direto, que só
+    é escalado para o ScrapingBee se o HTML não tiver conteúdo real (content_score).
+
+    Args:
+        url: URL da página
+        validators: Validadores de uma extração anterior; se presentes, a página é
+            revalidada antes de qualquer download completo
+    """
     api_key = os.environ.get("SCRAPINGBEE_API_KEY")
+    domain = domain_of(url)
+    if not api_key:
+        strategy = DIRECT
+    elif ADAPTIVE_FETCH:
+        strategy = fetch_planner.strategy_for(domain)
+    else:
+        strategy = RENDERED
+
+    direct_result = None
+    if validators:
+        # Um 200 na revalidação já é o download direto (só não serve se o domínio exige renderização)
+        direct_result = _revalidate(url, validators, accept_body=strategy != RENDERED)
+        if direct_result and direct_result.not_modified:
+            return direct_result
 
     if not api_key:
         logging.warning("SCRAPINGBEE_API_KEY não configurada. Usando fallback direto.")
-        try:
-            headers = {
-                'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
-            }
-            response = requests.get(url, headers=headers, timeout=15)
-            response.raise_for_status()
-            return response.text
-        except requests.exceptions.RequestException as e:
-            logging.error(f"Erro ao acessar a URL sem ScrapingBee: {e}")
-            return ""
+        return direct_result or _download_direct(url)
+
+    if strategy == RENDERED:
+        fetch_planner.record("rendered_known")
+        if HEDGE_ENABLED:
+            # O download direto ainda não foi tentado: corre em paralelo com o renderizado
+            return _download_hedged(url, api_key, domain)
     else:
-        payload = {
-            "api_key": api_key,
-            "url": url,
-            "render_js": True,
-            "premium_proxy": True,
-            "wait": 3000,  # Aguardar 3 segundos para JavaScript carregar
-            "screenshot": False
-        }
+        direct_result = direct_result or _download_direct(url)
+        if direct_result.html and fetch_planner.accepts_direct(domain, content_score(direct_result.html)):
+            return direct_result
+
+    rendered_result = _download_rendered(url, api_key)
+    if rendered_result.html:
+        if ADAPTIVE_FETCH:
+            fetch_planner.remember(domain, RENDERED)
+        return rendered_result
+
+    # Fallback para requisição direta (reaproveita a que já foi feita, se houver)
+    if direct_result and direct_result.html:
+        return direct_result
+    return _download_direct(url)
+
+def _timed(download, *args) -> Tuple[FetchResult, float]:
+    """
+    Executa um download em uma vaga de _hedge_slots (já reservada por quem submeteu) e
+    devolve o resultado com o instante (perf_counter) em que terminou.
+    """
+    try:
+        result = download(*args)
+        return result, time.perf_counter()
+    finally:
+        _hedge_slots.release()
+
+def _download_hedged(url: str, api_key: str, domain: str) -> FetchResult:
+    """
+    Download renderizado com hedge: se o ScrapingBee não responder em FETCH_HEDGE_DELAY_MS, um
+    download direto começa em paralelo e vale a primeira resposta que passar no controle de
+    qualidade (HTML não vazio no renderizado; content_score mínimo no direto).
+
+    Se o direto vencer, o POST ao ScrapingBee (já cobrado) corre até o fim em segundo plano,
+    e o tempo economizado é o quanto ele ainda levou depois da resposta vencedora, ambos
+    contados a partir do início do renderizado. Se o renderizado vencer, só a leitura do
+    corpo do direto é cancelada.
+    """
+    if not _hedge_slots.acquire(blocking=False):
+        logging.warning(f"Todas as {HEDGE_WORKERS} vagas de hedge ocupadas. Download de {url} sem hedge.")
+        result = _download_rendered(url, api_key)
+        return result if result.html else _download_direct(url)
+
+    started_at = time.perf_counter()
+    primary = _hedge_pool.submit(_timed, _download_rendered, url, api_key)
+    try:
+        result, _ = primary.result(timeout=HEDGE_DELAY_MS / 1000)
+        if result.html:
+            return result
+        # O ScrapingBee falhou antes do hedge: segue só com o download direto (fallback)
+        return _download_direct(url)
+    except FuturesTimeoutError:
+        pass
+    except Exception as e:
+        logging.error(f"Erro no download renderizado de {url}: {e}")
+        return _download_direct(url)
+
+    if not _hedge_slots.acquire(blocking=False):
+        logging.warning(f"Sem vaga para o hedge de {url}. Aguardando o ScrapingBee.")
+        try:
+            result, _ = primary.result()
+        except Exception as e:
+            logging.error(f"Erro no download renderizado de {url}: {e}")
+            result = FetchResult()
+        return result if result.html else _download_direct(url)
+
+    logging.info(f"ScrapingBee sem resposta em {HEDGE_DELAY_MS}ms para {url}. Iniciando download direto em paralelo.")
+    cancel = threading.Event()
+    hedge = _hedge_pool.submit(_timed, _download_direct, url, cancel)
+    kinds = {primary: RENDERED, hedge: DIRECT}
+    results = {}
+
+    for future in as_completed(kinds):
+        kind = kinds[future]
         try:
-            response = requests.post("https://app.scrapingbee.com/api/v1/", json=payload, timeout=45)
+            result, finished_at = future.result()
+        except Exception as e:
+            logging.error(f"Erro no download {kind} de {url}: {e}")
+            continue
+        results[kind] = result
+        if kind == RENDERED and result.html:
+            passed = True
+        else:
+            passed = bool(result.html) and content_score(result.html) >= fetch_planner.min_score
+        if not passed:
+            continue
+
+        if kind == RENDERED:
+            # O hedge não adiantou nada: o direto para de ler o corpo
+            cancel.set()
+            fetch_planner.record_hedge(domain, RENDERED)
+            return result
+
+        logging.info(f"Download direto venceu o ScrapingBee para {url}.")
+        if ADAPTIVE_FETCH:
+            fetch_planner.remember(domain, DIRECT)
+        if primary.done():
+            # O renderizado já tinha terminado sem passar no controle: não houve tempo economizado
+            fetch_planner.record_hedge(domain, DIRECT)
+        else:
+            winner_ms = (finished_at - started_at) * 1000
+            primary.add_done_callback(
+                lambda f: fetch_planner.record_hedge(
+                    domain, DIRECT,
+                    (f.result()[1] - started_at) * 1000 - winner_ms if not f.exception() else None
+                )
+            )
+        return result
+
+    # Nenhuma resposta passou no controle de qualidade: usa o HTML direto, se houver
+    return results.get(DIRECT) or FetchResult()
+
+def _download_direct(url: str, cancel: Optional[threading.Event] = None) -> FetchResult:
+    """Download direto na origem."""
+    domain = domain_of(url)
+    if not circuit_breaker.allow("direct", domain):
+        logging.warning(f"Circuito aberto para direct/{domain}. Download direto ignorado: {url}")
+        return FetchResult()
+
+    try:
+        with get_session("direct").get(url, headers=DEFAULT_HEADERS, timeout=15, stream=True) as response:
             response.raise_for_status()
-            return response.text
-        except requests.exceptions.RequestException as e:
-            logging.error(f"Erro ao acessar a URL com ScrapingBee: {e}")
-            # Fallback para requisição direta
-            try:
-                headers = {
-                    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
-                }
-                response = requests.get(url, headers=headers, timeout=15)
-                response.raise_for_status()
-                return response.text
-            except requests.exceptions.RequestException as e2:
-                logging.error(f"Erro no fallback direto: {e2}")
-                return ""
+            circuit_breaker.record_success("direct", domain)
+            return FetchResult(_read_body(response, cancel), _validators_from_headers(response.headers))
+    except requests.exceptions.RequestException as e:
+        logging.error(f"Erro no download direto de {url}: {e}")
+        _record_request_failure("direct", domain, e)
+        return FetchResult()
+
+def _download_rendered(url: str, api_key: str) -> FetchResult:
+    """Download renderizado (JavaScript executado) pelo ScrapingBee."""
+    payload = {
+        "api_key": api_key,
+        "url": url,
+        "render_js": True,
+        "premium_proxy": True,
+        "wait": 3000,  # Aguardar 3 segundos para JavaScript carregar
+        "screenshot": False
+    }
+    domain = domain_of(url)
+    if not circuit_breaker.allow("scrapingbee", domain):
+        logging.warning(f"Circuito aberto para scrapingbee/{domain}. Download renderizado ignorado: {url}")
+        return FetchResult()
+
+    try:
+        with get_session("scrapingbee").post("https://app.scrapingbee.com/api/v1/", json=payload,
+                                             timeout=45, stream=True) as response:
+            response.raise_for_status()
+            circuit_breaker.record_success("scrapingbee", domain)
+            return FetchResult(_read_body(response), _validators_from_headers(response.headers, prefix="Spb-"))
+    except requests.exceptions.RequestException as e:
+        logging.error(f"Erro ao acessar a URL com ScrapingBee: {e}")
+        _record_request_failure("scrapingbee", domain, e)
+        return FetchResult()
+
+def _record_request_failure(upstream: str, domain: str, error: requests.exceptions.RequestException):
+    """Conta a falha no circuit breaker se ela indica indisponibilidade (rede, timeout, 5xx, 429)."""
+    response = getattr(error, "response", None)
+    if response is None or response.status_code >= 500 or response.status_code == 429:
+        circuit_breaker.record_failure(upstream, domain)
 
 def _extract_text_with_bs4(html_content: str) -> str:
     """Extrai texto usando BeautifulSoup como fallback."""
@@ -120,6 +683,26 @@ def _extract_title(soup: BeautifulSoup, text: str) -> str:
     if og_title and og_title.get('content'):
         return og_title['content'].strip()
     
+    return _title_from_text(text)
+
+def _title_from_signals(signals: PageSignals, text: str) -> str:
+    """Versão de _extract_title que usa os sinais coletados na passada única."""
+    if signals.title:
+        title = signals.title.strip()
+        if title and len(title) > 10:
+            return title
+    
+    for h1 in signals.h1:
+        title = h1.strip()
+        if title and len(title) > 10:
+            return title
+    
+    if signals.og_title:
+        return signals.og_title.strip()
+    
+    return _title_from_text(text)
+
+def _title_from_text(text: str) -> str:
     # Fallback: primeira linha significativa do texto
     lines = text.split('\n')
     for line in lines:
@@ -152,6 +735,24 @@ def _extract_description(soup: BeautifulSoup, text: str) -> str:
         if len(desc) > 100 and len(desc) < 500:
             return desc
     
+    return _description_from_text(text)
+
+def _description_from_signals(signals: PageSignals, text: str) -> str:
+    """Versão de _extract_description que usa os sinais coletados na passada única."""
+    for content in (signals.meta_description, signals.og_description):
+        if content:
+            desc = content.strip()
+            if len(desc) > 50:
+                return desc
+    
+    for paragraph in signals.paragraphs:
+        desc = paragraph.strip()
+        if len(desc) > 100 and len(desc) < 500:
+            return desc
+    
+    return _description_from_text(text)
+
+def _description_from_text(text: str) -> str:
     # Fallback: extrair do texto principal
     lines = text.split('\n')
     for line in lines:
@@ -161,22 +762,71 @@ def _extract_description(soup: BeautifulSoup, text: str) -> str:
     
     return "Descubra este produto incrível que vai transformar sua vida!"
 
+# Padrões de preço em português
+PRICE_PATTERNS = [
+    r'R\$\s*\d{1,3}(?:\.\d{3})*(?:,\d{2})?',
+    r'por\s+apenas\s+R\$\s*\d{1,3}(?:\.\d{3})*(?:,\d{2})?',
+    r'investimento\s*:?\s*R\$\s*\d{1,3}(?:\.\d{3})*(?:,\d{2})?',
+    r'valor\s*:?\s*R\$\s*\d{1,3}(?:\.\d{3})*(?:,\d{2})?',
+    r'preço\s*:?\s*R\$\s*\d{1,3}(?:\.\d{3})*(?:,\d{2})?'
+]
+
+# Padrões de benefícios no texto
+BENEFIT_PATTERNS = [
+    r'✅\s*([^✅\n]{20,200})',
+    r'•\s*([^•\n]{20,200})',
+    r'→\s*([^→\n]{20,200})',
+    r'✓\s*([^✓\n]{20,200})',
+    r'▶\s*([^▶\n]{20,200})'
+]
+
+# Padrões de CTA no texto
+CTA_PATTERNS = [
+    r'(QUERO\s+[^!\n]{5,50}!?)',
+    r'(COMPRE\s+[^!\n]{5,50}!?)',
+    r'(ADQUIRA\s+[^!\n]{5,50}!?)',
+    r'(GARANTA\s+[^!\n]{5,50}!?)'
+]
+
+GUARANTEE_PATTERNS = [
+    r'garantia\s+de\s+(\d+\s+dias?)',
+    r'(\d+\s+dias?)\s+de\s+garantia',
+    r'reembolso\s+em\s+(\d+\s+dias?)',
+    r'satisfação\s+garantida',
+    r'risco\s+zero'
+]
+
+AUDIENCE_PATTERNS = [
+    r'ideal\s+para\s+([^.\n]{10,100})',
+    r'para\s+quem\s+([^.\n]{10,100})',
+    r'se\s+você\s+é\s+([^.\n]{10,100})'
+]
+
+# Campo -> (padrões em ordem de prioridade, flags)
+SALES_PATTERNS = {
+    "preco": (PRICE_PATTERNS, re.IGNORECASE),
+    "beneficios": (BENEFIT_PATTERNS, re.MULTILINE),
+    "cta": (CTA_PATTERNS, re.IGNORECASE),
+    "garantia": (GUARANTEE_PATTERNS, re.IGNORECASE),
+    "publico_alvo": (AUDIENCE_PATTERNS, re.IGNORECASE)
+}
+
+# Compilados uma única vez: um scanner para o texto principal e outro só de preço para
+# os elementos encontrados pelos seletores CSS de preço
+SALES_SCANNER = PatternScanner(SALES_PATTERNS, priority_fields=["preco", "cta", "garantia", "publico_alvo"])
+PRICE_SCANNER = PatternScanner({"preco": SALES_PATTERNS["preco"]}, priority_fields=["preco"])
+
+def _findall_each(field: str, text: str) -> Iterator[List[Any]]:
+    """Executa re.findall padrão por padrão, sob demanda (caminho do motor legado)."""
+    patterns, flags = SALES_PATTERNS[field]
+    return (re.findall(pattern, text, flags) for pattern in patterns)
+
 def _extract_price(soup: BeautifulSoup, text: str) -> str:
     """Extrai o preço do produto."""
-    # Padrões de preço em português
-    price_patterns = [
-        r'R\$\s*\d{1,3}(?:\.\d{3})*(?:,\d{2})?',
-        r'por\s+apenas\s+R\$\s*\d{1,3}(?:\.\d{3})*(?:,\d{2})?',
-        r'investimento\s*:?\s*R\$\s*\d{1,3}(?:\.\d{3})*(?:,\d{2})?',
-        r'valor\s*:?\s*R\$\s*\d{1,3}(?:\.\d{3})*(?:,\d{2})?',
-        r'preço\s*:?\s*R\$\s*\d{1,3}(?:\.\d{3})*(?:,\d{2})?'
-    ]
-    
     # Procurar no texto principal
-    for pattern in price_patterns:
-        matches = re.findall(pattern, text, re.IGNORECASE)
-        if matches:
-            return matches[0].strip()
+    price = _price_from_matches(_findall_each("preco", text))
+    if price:
+        return price
     
     # Procurar em elementos com classes relacionadas a preço
     price_selectors = [
@@ -187,39 +837,62 @@ def _extract_price(soup: BeautifulSoup, text: str) -> str:
     for selector in price_selectors:
         elements = soup.select(selector)
         for element in elements:
-            text_content = element.get_text().strip()
-            for pattern in price_patterns:
-                matches = re.findall(pattern, text_content, re.IGNORECASE)
-                if matches:
-                    return matches[0].strip()
+            price = _price_from_matches(_findall_each("preco", element.get_text().strip()))
+            if price:
+                return price
+    
+    return "Consulte o preço na página"
+
+def _price_from_signals(signals: PageSignals, scan: ScanResult) -> str:
+    """Versão de _extract_price que usa os sinais e os candidatos da passada única."""
+    price = _price_from_matches(scan.findall("preco"))
+    if price:
+        return price
+    
+    # Um mesmo elemento pode casar com mais de um seletor: cada texto é escaneado uma vez
+    scanned = {}
+    for element_texts in signals.price_texts:
+        for element_text in element_texts:
+            element_text = element_text.strip()
+            if element_text not in scanned:
+                scanned[element_text] = _price_from_matches(PRICE_SCANNER.scan(element_text).findall("preco"))
+            if scanned[element_text]:
+                return scanned[element_text]
     
     return "Consulte o preço na página"
 
+def _price_from_matches(matches: Iterable[List[Any]]) -> Optional[str]:
+    for pattern_matches in matches:
+        if pattern_matches:
+            return pattern_matches[0].strip()
+    return None
+
 def _extract_benefits(soup: BeautifulSoup, text: str) -> List[str]:
     """Extrai os benefícios do produto."""
-    benefits = []
-    
     # Procurar por listas (ul, ol)
+    list_items = []
     lists = soup.find_all(['ul', 'ol'])
     for list_elem in lists:
-        items = list_elem.find_all('li')
+        list_items.append([item.get_text() for item in list_elem.find_all('li')])
+    
+    return _benefits_from_list_items(list_items, _findall_each("beneficios", text), text)
+
+def _benefits_from_signals(signals: PageSignals, scan: ScanResult, text: str) -> List[str]:
+    """Versão de _extract_benefits que usa os sinais e os candidatos da passada única."""
+    return _benefits_from_list_items(signals.list_items, scan.findall("beneficios"), text)
+
+def _benefits_from_list_items(list_items: List[List[str]], matches: Iterable[List[Any]], text: str) -> List[str]:
+    benefits = []
+    
+    for items in list_items:
         for item in items:
-            benefit = item.get_text().strip()
+            benefit = item.strip()
             if len(benefit) > 20 and len(benefit) < 200:
                 benefits.append(benefit)
     
-    # Procurar por padrões de benefícios no texto
-    benefit_patterns = [
-        r'✅\s*([^✅\n]{20,200})',
-        r'•\s*([^•\n]{20,200})',
-        r'→\s*([^→\n]{20,200})',
-        r'✓\s*([^✓\n]{20,200})',
-        r'▶\s*([^▶\n]{20,200})'
-    ]
-    
-    for pattern in benefit_patterns:
-        matches = re.findall(pattern, text, re.MULTILINE)
-        for match in matches:
+    # Padrões de benefícios encontrados no texto
+    for pattern_matches in matches:
+        for match in pattern_matches:
             benefit = match.strip()
             if benefit and benefit not in benefits:
                 benefits.append(benefit)
@@ -248,6 +921,8 @@ def _extract_benefits(soup: BeautifulSoup, text: str) -> List[str]:
     
     return benefits[:5]  # Máximo 5 benefícios
 
+CTA_KEYWORDS = ['comprar', 'adquirir', 'quero', 'garanta', 'acesse', 'clique', 'inscreva']
+
 def _extract_cta(soup: BeautifulSoup, text: str) -> str:
     """Extrai o call-to-action principal."""
     # Procurar por botões e links
@@ -260,76 +935,84 @@ def _extract_cta(soup: BeautifulSoup, text: str) -> str:
         elements = soup.select(selector)
         for element in elements:
             cta_text = element.get_text().strip()
-            if len(cta_text) > 5 and len(cta_text) < 100:
-                # Verificar se parece um CTA
-                cta_keywords = ['comprar', 'adquirir', 'quero', 'garanta', 'acesse', 'clique', 'inscreva']
-                if any(keyword in cta_text.lower() for keyword in cta_keywords):
-                    return cta_text
+            if _looks_like_cta(cta_text):
+                return cta_text
     
-    # Procurar no texto por padrões de CTA
-    cta_patterns = [
-        r'(QUERO\s+[^!\n]{5,50}!?)',
-        r'(COMPRE\s+[^!\n]{5,50}!?)',
-        r'(ADQUIRA\s+[^!\n]{5,50}!?)',
-        r'(GARANTA\s+[^!\n]{5,50}!?)'
-    ]
+    return _cta_from_matches(_findall_each("cta", text))
+
+def _cta_from_signals(signals: PageSignals, scan: ScanResult) -> str:
+    """Versão de _extract_cta que usa os sinais e os candidatos da passada única."""
+    for element_texts in signals.cta_texts:
+        for element_text in element_texts:
+            cta_text = element_text.strip()
+            if _looks_like_cta(cta_text):
+                return cta_text
     
-    for pattern in cta_patterns:
-        matches = re.findall(pattern, text, re.IGNORECASE)
-        if matches:
-            return matches[0].strip()
+    return _cta_from_matches(scan.findall("cta"))
+
+def _looks_like_cta(cta_text: str) -> bool:
+    if len(cta_text) > 5 and len(cta_text) < 100:
+        # Verificar se parece um CTA
+        return any(keyword in cta_text.lower() for keyword in CTA_KEYWORDS)
+    return False
+
+def _cta_from_matches(matches: Iterable[List[Any]]) -> str:
+    # Procurar no texto por padrões de CTA
+    for pattern_matches in matches:
+        if pattern_matches:
+            return pattern_matches[0].strip()
     
     return "Compre Agora!"
 
 def _extract_guarantee(soup: BeautifulSoup, text: str) -> str:
     """Extrai informações sobre garantia."""
-    guarantee_patterns = [
-        r'garantia\s+de\s+(\d+\s+dias?)',
-        r'(\d+\s+dias?)\s+de\s+garantia',
-        r'reembolso\s+em\s+(\d+\s+dias?)',
-        r'satisfação\s+garantida',
-        r'risco\s+zero'
-    ]
-    
-    for pattern in guarantee_patterns:
-        matches = re.findall(pattern, text, re.IGNORECASE)
-        if matches:
-            if isinstance(matches[0], tuple):
-                return f"Garantia de {matches[0][0]}"
+    return _guarantee_from_matches(_findall_each("garantia", text))
+
+def _guarantee_from_matches(matches: Iterable[List[Any]]) -> str:
+    for pattern_matches in matches:
+        if pattern_matches:
+            if isinstance(pattern_matches[0], tuple):
+                return f"Garantia de {pattern_matches[0][0]}"
             else:
-                return matches[0]
+                return pattern_matches[0]
     
     return "Garantia de satisfação"
 
 def _extract_target_audience(soup: BeautifulSoup, text: str) -> str:
     """Extrai informações sobre o público-alvo."""
-    audience_patterns = [
-        r'ideal\s+para\s+([^.\n]{10,100})',
-        r'para\s+quem\s+([^.\n]{10,100})',
-        r'se\s+você\s+é\s+([^.\n]{10,100})'
-    ]
-    
-    for pattern in audience_patterns:
-        matches = re.findall(pattern, text, re.IGNORECASE)
-        if matches:
-            return matches[0].strip()
+    return _target_audience_from_matches(_findall_each("publico_alvo", text))
+
+def _target_audience_from_matches(matches: Iterable[List[Any]]) -> str:
+    for pattern_matches in matches:
+        if pattern_matches:
+            return pattern_matches[0].strip()
     
     return "Empreendedores e profissionais"
 
 def _extract_testimonials(soup: BeautifulSoup, text: str) -> List[str]:
     """Extrai depoimentos de clientes."""
-    testimonials = []
-    
     # Procurar por elementos que podem conter depoimentos
     testimonial_selectors = [
         '[class*="depoimento"]', '[class*="testimonial"]',
         '[class*="review"]', '.quote', 'blockquote'
     ]
     
-    for selector in testimonial_selectors:
-        elements = soup.select(selector)
-        for element in elements:
-            testimonial = element.get_text().strip()
+    element_texts = [
+        [element.get_text() for element in soup.select(selector)]
+        for selector in testimonial_selectors
+    ]
+    return _testimonials_from_element_texts(element_texts)
+
+def _testimonials_from_signals(signals: PageSignals) -> List[str]:
+    """Versão de _extract_testimonials que usa os sinais coletados na passada única."""
+    return _testimonials_from_element_texts(signals.testimonial_texts)
+
+def _testimonials_from_element_texts(element_texts: List[List[str]]) -> List[str]:
+    testimonials = []
+    
+    for texts in element_texts:
+        for element_text in texts:
+            testimonial = element_text.strip()
             if len(testimonial) > 50 and len(testimonial) < 500:
                 testimonials.append(testimonial)
     
@@ -344,6 +1027,9 @@ def _extract_testimonials(soup: BeautifulSoup, text: str) -> List[str]:
 
 def _extract_product_type(soup: BeautifulSoup, text: str) -> str:
     """Identifica o tipo de produto (curso, livro, software, etc.)."""
+    return _product_type_from_text(text)
+
+def _product_type_from_text(text: str) -> str:
     type_keywords = {
         'curso': ['curso', 'treinamento', 'aulas', 'módulos'],
         'livro': ['livro', 'ebook', 'e-book', 'páginas'],
@@ -359,6 +1045,19 @@ def _extract_product_type(soup: BeautifulSoup, text: str) -> str:
     
     return "produto digital"
 
+# Campos do motor legado, na ordem do dicionário de saída
+LEGACY_FIELD_HELPERS = [
+    ("titulo", _extract_title),
+    ("descricao", _extract_description),
+    ("preco", _extract_price),
+    ("beneficios", _extract_benefits),
+    ("cta", _extract_cta),
+    ("garantia", _extract_guarantee),
+    ("publico_alvo", _extract_target_audience),
+    ("depoimentos", _extract_testimonials),
+    ("tipo_produto", _extract_product_type)
+]
+
 def _get_fallback_data(url: str) -> Dict[str, Any]:
     """Retorna dados de fallback quando a extração falha."""
     return {
@@ -0,0 +1,186 @@
+import logging
+from typing import Dict, List, Any, Optional
+from lxml import etree
+
+# Configuração de logs
+logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+
+# Elementos cujo texto o BeautifulSoup.get_text() ignora quando aparecem como descendentes
+# (Script, Stylesheet, TemplateString, RubyTextString, RubyParenthesisString).
+SKIPPED_TEXT_TAGS = {"script", "style", "template", "rt", "rp"}
+
+# Seletores CSS usados pelos helpers _extract_* de data_extractor_melhorado, na mesma ordem.
+# Cada seletor é descrito como (tag, modo, valor):
+#   - ("button", None, None)        -> seletor de tag
+#   - (None, "token", "price")      -> .price
+#   - (None, "contains", "price")   -> [class*="price"]
+#   - ("a", "contains", "btn")      -> a[class*="btn"]
+PRICE_SELECTORS = [
+    (None, "token", "price"), (None, "token", "valor"), (None, "token", "preco"), (None, "token", "investimento"),
+    (None, "contains", "price"), (None, "contains", "valor"), (None, "contains", "preco")
+]
+
+CTA_SELECTORS = [
+    ("button", None, None), ("a", "contains", "btn"), ("a", "contains", "button"),
+    (None, "contains", "cta"), (None, "contains", "comprar"), (None, "contains", "adquirir")
+]
+
+TESTIMONIAL_SELECTORS = [
+    (None, "contains", "depoimento"), (None, "contains", "testimonial"),
+    (None, "contains", "review"), (None, "token", "quote"), ("blockquote", None, None)
+]
+
+class PageSignals:
+    """
+    Sinais estruturais de uma página, coletados em uma única passada pelo DOM.
+
+    Os textos seguem a semântica de BeautifulSoup.get_text(): concatenação dos nós de texto
+    descendentes, ignorando comentários e o conteúdo de script/style/template/rt/rp.
+    """
+
+    def __init__(self):
+        self.title: Optional[str] = None
+        self.h1: List[str] = []
+        self.og_title: Optional[str] = None
+        self.meta_description: Optional[str] = None
+        self.og_description: Optional[str] = None
+        self.paragraphs: List[str] = []
+        self.list_items: List[List[str]] = []
+        self.price_texts: List[List[str]] = [[] for _ in PRICE_SELECTORS]
+        self.cta_texts: List[List[str]] = [[] for _ in CTA_SELECTORS]
+        self.testimonial_texts: List[List[str]] = [[] for _ in TESTIMONIAL_SELECTORS]
+        self.full_text: str = ""
+
+def _matches(tag: str, classes: Optional[str], selector) -> bool:
+    """Verifica se um elemento corresponde a um seletor simples (tag/classe)."""
+    sel_tag, mode, value = selector
+    if sel_tag and sel_tag != tag:
+        return False
+    if mode is None:
+        return True
+    if classes is None:
+        return False
+    if mode == "token":
+        return value in classes.split()
+    return value in classes
+
+def _match_indexes(tag: str, classes: Optional[str], selectors) -> List[int]:
+    return [i for i, selector in enumerate(selectors) if _matches(tag, classes, selector)]
+
+def collect_page_signals(tree) -> PageSignals:
+    """
+    Percorre a árvore lxml uma única vez e coleta todos os sinais usados pelos helpers _extract_*.
+
+    O texto de cada elemento é montado de baixo para cima durante a passada (evento "end"),
+    então nenhum subárvore é percorrida mais de uma vez.
+
+    Args:
+        tree: Elemento raiz lxml (por exemplo, o retornado por trafilatura.utils.load_html)
+
+    Returns:
+        PageSignals com título, metas, parágrafos, itens de lista e candidatos por seletor
+    """
+    signals = PageSignals()
+
+    # Buffers de texto por elemento aberto; a raiz recebe o texto do documento inteiro
+    buffers: List[List[str]] = [[]]
+    # Ações pendentes para cada elemento aberto (preenchidas no "start", executadas no "end")
+    pending: List[Optional[Dict[str, Any]]] = []
+    # Listas (ul/ol) abertas, com a posição em signals.list_items
+    open_lists: List[int] = []
+
+    for event, element in etree.iterwalk(tree, events=("start", "end")):
+        tag = element.tag
+        if not isinstance(tag, str):
+            # Comentários e instruções de processamento não contribuem com texto
+            if event == "end" and element.tail:
+                buffers[-1].append(element.tail)
+            continue
+        tag = tag.lower()
+
+        if event == "start":
+            actions = None
+            classes = element.get("class")
+            if classes is not None:
+                classes = " ".join(classes.split())
+
+            if tag == "meta":
+                prop = element.get("property")
+                if prop == "og:title" and signals.og_title is None:
+                    signals.og_title = element.get("content") or ""
+                elif prop == "og:description" and signals.og_description is None:
+                    signals.og_description = element.get("content") or ""
+                if element.get("name") == "description" and signals.meta_description is None:
+                    signals.meta_description = element.get("content") or ""
+            elif tag in ("ul", "ol"):
+                signals.list_items.append([])
+                open_lists.append(len(signals.list_items) - 1)
+                actions = {"list": True}
+
+            if tag == "li" and open_lists:
+                # Reserva a posição do item em todas as listas abertas (ordem de documento)
+                slots = []
+                for list_index in open_lists:
+                    signals.list_items[list_index].append("")
+                    slots.append((list_index, len(signals.list_items[list_index]) - 1))
+                actions = actions or {}
+                actions["li_slots"] = slots
+
+            targets = []
+            if tag == "title" and signals.title is None:
+                signals.title = ""
+                targets.append(("title", None))
+            elif tag == "h1":
+                signals.h1.append("")
+                targets.append(("h1", len(signals.h1) - 1))
+            elif tag == "p":
+                signals.paragraphs.append("")
+                targets.append(("p", len(signals.paragraphs) - 1))
+
+            for name, selectors, texts in (
+                ("price", PRICE_SELECTORS, signals.price_texts),
+                ("cta", CTA_SELECTORS, signals.cta_texts),
+                ("testimonial", TESTIMONIAL_SELECTORS, signals.testimonial_texts),
+            ):
+                for i in _match_indexes(tag, classes, selectors):
+                    texts[i].append("")
+                    targets.append((name, (i, len(texts[i]) - 1)))
+
+            if targets:
+                actions = actions or {}
+                actions["targets"] = targets
+
+            pending.append(actions)
+            buffers.append([element.text] if element.text else [])
+            continue
+
+        # event == "end"
+        text = "".join(buffers.pop())
+        actions = pending.pop()
+        if tag not in SKIPPED_TEXT_TAGS:
+            buffers[-1].append(text)
+        if element.tail:
+            buffers[-1].append(element.tail)
+
+        if actions:
+            for list_index, item_index in actions.get("li_slots", ()):
+                signals.list_items[list_index][item_index] = text
+            for name, position in actions.get("targets", ()):
+                if name == "title":
+                    signals.title = text
+                elif name == "h1":
+                    signals.h1[position] = text
+                elif name == "p":
+                    signals.paragraphs[position] = text
+                else:
+                    texts = {
+                        "price": signals.price_texts,
+                        "cta": signals.cta_texts,
+                        "testimonial": signals.testimonial_texts
+                    }[name]
+                    texts[position[0]][position[1]] = text
+            if actions.get("list"):
+                open_lists.pop()
+
+    signals.full_text = "".join(buffers[0])
+    return signals
@@ -0,0 +1,184 @@
+import logging
+import os
+import threading
+import time
+from typing import Dict, Any, Optional, Tuple, TYPE_CHECKING
+from urllib.parse import urlsplit
+
+from lazy_cache import LazyPageCache
+
+if TYPE_CHECKING:
+    from cache_manager_melhorado import CacheManager
+
+# Configuração de logs
+logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+
+# Estratégias de download, da mais barata para a mais cara
+DIRECT = "direct"        # GET direto na origem
+RENDERED = "rendered"    # ScrapingBee com render_js/premium_proxy
+STRATEGIES = (DIRECT, RENDERED)
+
+def domain_of(url: str) -> str:
+    """Domínio usado como chave da estratégia (host sem "www.")."""
+    host = (urlsplit(url).hostname or "").lower()
+    return host[4:] if host.startswith("www.") else host
+
+class FetchPlanner:
+    """
+    Decide a estratégia de download por domínio.
+
+    Domínios desconhecidos começam pelo download direto; se o HTML não trouxer conteúdo real
+    (content_score abaixo do mínimo), o download é escalado para a renderização e a estratégia
+    vencedora fica registrada para o domínio (no Redis, compartilhada entre workers, com
+    validade para que o domínio volte a ser testado de tempos em tempos).
+    """
+
+    # Intervalo para reconsultar o Redis (estratégias aprendidas por outros workers)
+    LOCAL_RECHECK = 60
+
+    cache = LazyPageCache()
+
+    def __init__(self, cache: Optional["CacheManager"] = None, min_score: float = 0.5,
+                 memory_ttl: int = 7 * 86400):
+        """
+        Args:
+            cache: CacheManager cuja conexão Redis guarda as estratégias (padrão: page_cache,
+                resolvido no primeiro uso)
+            min_score: content_score mínimo para aceitar o download direto
+            memory_ttl: Por quanto tempo a estratégia de um domínio é lembrada (segundos)
+        """
+        self.cache = cache
+        self.prefix = "fetch_strategy:"
+        self.hedge_prefix = "fetch_hedge:"
+        self.min_score = min_score
+        self.memory_ttl = memory_ttl
+        self._lock = threading.Lock()
+        # Cópia local (usada também quando o Redis está indisponível):
+        # domínio -> (estratégia, expira_em, consultado_em)
+        self._local: Dict[str, Tuple[str, float, float]] = {}
+        self._counters = {"direct_accepted": 0, "escalated": 0, "rendered_known": 0}
+
+    def strategy_for(self, domain: str) -> Optional[str]:
+        """Estratégia lembrada para o domínio, ou None se ainda não há uma."""
+        now = time.time()
+        with self._lock:
+            local = self._local.get(domain)
+        if local and local[2] + self.LOCAL_RECHECK > now:
+            return local[0] if local[1] > now else None
+
+        if self.cache._is_connected():
+            try:
+                key = f"{self.prefix}{domain}"
+                strategy = self.cache.redis_client.get(key)
+                if strategy not in STRATEGIES:
+                    with self._lock:
+                        self._local.pop(domain, None)
+                    return None
+                ttl = self.cache.redis_client.ttl(key)
+                with self._lock:
+                    self._local[domain] = (strategy, now + max(ttl, 0), now)
+                return strategy
+            except Exception as e:
+                logging.error(f"Erro ao ler estratégia de download de {domain}: {e}")
+
+        # Sem Redis, vale a cópia local até expirar
+        return local[0] if local and local[1] > now else None
+
+    def remember(self, domain: str, strategy: str):
+        """Registra a estratégia vencedora de um domínio."""
+        if self.strategy_for(domain) == strategy:
+            return
+        logging.info(f"Estratégia de download para {domain}: {strategy}")
+        now = time.time()
+        with self._lock:
+            self._local[domain] = (strategy, now + self.memory_ttl, now)
+        if self.cache._is_connected():
+            try:
+                self.cache.redis_client.setex(f"{self.prefix}{domain}", self.memory_ttl, strategy)
+            except Exception as e:
+                logging.error(f"Erro ao gravar estratégia de download de {domain}: {e}")
+
+    def accepts_direct(self, domain: str, score: float) -> bool:
+        """Decide se o HTML do download direto basta; se sim, lembra "direct" para o domínio."""
+        if score >= self.min_score:
+            self.record("direct_accepted")
+            self.remember(domain, DIRECT)
+            return True
+        logging.info(f"Conteúdo do download direto insuficiente para {domain} (score {score}). Escalando para renderização.")
+        self.record("escalated")
+        return False
+
+    def record_hedge(self, domain: str, winner: str, saved_ms: Optional[float] = None):
+        """
+        Registra uma corrida entre o download renderizado e o direto (hedge) de um domínio.
+
+        Args:
+            domain: Domínio da página
+            winner: Estratégia cuja resposta foi usada (DIRECT ou RENDERED)
+            saved_ms: Quanto antes a resposta direta vencedora chegou em relação ao fim do
+                download renderizado (None se não houve economia a medir)
+        """
+        if not self.cache._is_connected():
+            return
+        try:
+            with self.cache.redis_client.pipeline(transaction=False) as pipe:
+                pipe.hincrby(f"{self.hedge_prefix}races", domain, 1)
+                pipe.hincrby(f"{self.hedge_prefix}{winner}_wins", domain, 1)
+                if saved_ms is not None:
+                    pipe.hincrbyfloat(f"{self.hedge_prefix}saved_ms", domain, round(saved_ms, 1))
+                pipe.execute()
+        except Exception as e:
+            logging.error(f"Erro ao registrar hedge de {domain}: {e}")
+
+    def get_hedge_stats(self) -> Dict[str, Dict[str, Any]]:
+        """
+        Estatísticas de hedge por domínio.
+
+        Returns:
+            domínio -> {"races", "direct_wins", "rendered_wins", "hedge_win_rate", "saved_ms"}
+        """
+        if not self.cache._is_connected():
+            return {}
+        try:
+            with self.cache.redis_client.pipeline(transaction=False) as pipe:
+                for metric in ("races", "direct_wins", "rendered_wins", "saved_ms"):
+                    pipe.hgetall(f"{self.hedge_prefix}{metric}")
+                races, direct_wins, rendered_wins, saved_ms = pipe.execute()
+        except Exception as e:
+            logging.error(f"Erro ao obter estatísticas de hedge: {e}")
+            return {}
+
+        stats = {}
+        for domain, count in races.items():
+            count = int(count)
+            wins = int(direct_wins.get(domain, 0))
+            stats[domain] = {
+                "races": count,
+                "direct_wins": wins,
+                "rendered_wins": int(rendered_wins.get(domain, 0)),
+                "hedge_win_rate": round(wins / count, 4) if count else 0.0,
+                "saved_ms": round(float(saved_ms.get(domain, 0)), 1)
+            }
+        return stats
+
+    def record(self, counter: str):
+        with self._lock:
+            self._counters[counter] += 1
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Contadores de decisões do processo, estratégias conhecidas localmente e hedges por domínio."""
+        now = time.time()
+        with self._lock:
+            known = {domain: entry[0] for domain, entry in self._local.items() if entry[1] > now}
+            counters = dict(self._counters)
+        return {
+            **counters,
+            "known_domains": {strategy: sum(1 for s in known.values() if s == strategy) for strategy in STRATEGIES},
+            "hedges": self.get_hedge_stats()
+        }
+
+# Instância global para uso na aplicação
+fetch_planner = FetchPlanner(
+    min_score=float(os.getenv("FETCH_MIN_CONTENT_SCORE", 0.5)),
+    memory_ttl=int(os.getenv("FETCH_STRATEGY_TTL", 7 * 86400))
+)
@@ -0,0 +1,129 @@
+import gzip
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from datetime import datetime
+from typing import Dict, Any, List, Optional
+
+from url_utils import normalize_url
+
+# Configuração de logs
+logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+
+class HtmlArchive:
+    """
+    Arquivo local e comprimido do HTML baixado, para reprocessar páginas sem novo download.
+
+    Cada download vira um registro gzip (JSON com URL, data, validadores, hash e versão do
+    extrator) em <base_dir>/<xx>/<sha1 da URL normalizada>/<ms do download>-<hash>.json.gz.
+    Um download com o mesmo HTML do último registro da URL não gera arquivo novo, e só os
+    max_versions registros mais recentes de cada URL são mantidos.
+    """
+
+    def __init__(self, base_dir: str, max_versions: int = 3, enabled: bool = True):
+        """
+        Args:
+            base_dir: Diretório do arquivo
+            max_versions: Downloads guardados por URL
+            enabled: Se False, store não grava nada
+        """
+        self.base_dir = base_dir
+        self.max_versions = max_versions
+        self.enabled = enabled
+
+    def _url_dir(self, url: str) -> str:
+        digest = hashlib.sha1(normalize_url(url).encode("utf-8")).hexdigest()
+        return os.path.join(self.base_dir, digest[:2], digest)
+
+    def _records(self, url_dir: str) -> List[str]:
+        """Arquivos de uma URL, do mais recente para o mais antigo."""
+        try:
+            names = [name for name in os.listdir(url_dir) if name.endswith(".json.gz")]
+        except FileNotFoundError:
+            return []
+        return [os.path.join(url_dir, name) for name in sorted(names, reverse=True)]
+
+    def store(self, url: str, html_content: str, content_hash: str, validators: Dict[str, str] = None,
+              extractor_version: str = None) -> Optional[str]:
+        """
+        Guarda o HTML de um download.
+
+        Args:
+            url: URL da página
+            html_content: HTML baixado
+            content_hash: Hash do HTML (compute_content_hash)
+            validators: ETag/Last-Modified da origem
+            extractor_version: Versão do extrator no momento do download
+
+        Returns:
+            Caminho do registro (o existente, se o HTML não mudou) ou None
+        """
+        if not self.enabled:
+            return None
+
+        try:
+            url_dir = self._url_dir(url)
+            records = self._records(url_dir)
+            if records and records[0].endswith(f"-{content_hash[:16]}.json.gz"):
+                return records[0]
+
+            os.makedirs(url_dir, exist_ok=True)
+            path = os.path.join(url_dir, f"{int(time.time() * 1000):013d}-{content_hash[:16]}.json.gz")
+            record = {
+                "url": url,
+                "normalized_url": normalize_url(url),
+                "fetched_at": datetime.now().isoformat(),
+                "extractor_version": extractor_version,
+                "validators": validators or {},
+                "content_hash": content_hash,
+                "html": html_content
+            }
+            # Grava em um temporário e renomeia: leitores nunca veem um registro pela metade
+            tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with gzip.open(tmp_path, "wt", encoding="utf-8", compresslevel=6) as f:
+                json.dump(record, f, ensure_ascii=False)
+            os.replace(tmp_path, path)
+
+            for old_path in records[self.max_versions - 1:]:
+                try:
+                    os.remove(old_path)
+                except FileNotFoundError:
+                    pass  # Já removido por outro worker
+            return path
+
+        except OSError as e:
+            logging.error(f"Erro ao arquivar HTML de {url}: {e}")
+            return None
+
+    def find(self, url: str, content_hash: str = None) -> Optional[str]:
+        """
+        Localiza um registro da URL.
+
+        Args:
+            url: URL da página
+            content_hash: Se informado, o registro cujo HTML tem esse hash; senão, o mais recente
+
+        Returns:
+            Caminho do registro ou None
+        """
+        records = self._records(self._url_dir(url))
+        if content_hash is None:
+            return records[0] if records else None
+        suffix = f"-{content_hash[:16]}.json.gz"
+        return next((path for path in records if path.endswith(suffix)), None)
+
+    @staticmethod
+    def load(path: str) -> Dict[str, Any]:
+        """Lê um registro do arquivo."""
+        with gzip.open(path, "rt", encoding="utf-8") as f:
+            return json.load(f)
+
+# Instância global para uso na aplicação
+html_archive = HtmlArchive(
+    base_dir=os.getenv("HTML_ARCHIVE_DIR", "html_archive"),
+    max_versions=int(os.getenv("HTML_ARCHIVE_MAX_VERSIONS", 3)),
+    enabled=os.getenv("HTML_ARCHIVE_ENABLED", "true").lower() != "false"
+)
@@ -0,0 +1,225 @@
+import codecs
+import logging
+import os
+import re
+import threading
+from typing import Optional
+
+# Configuração de logs
+logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+
+# Limite de bytes baixados por página (o restante do corpo é descartado)
+FETCH_MAX_BYTES = int(os.getenv("FETCH_MAX_BYTES", 5 * 1024 * 1024))
+CHUNK_SIZE = 64 * 1024
+
+# Quantos bytes iniciais são examinados em busca de <meta charset>
+META_PRESCAN_BYTES = 4096
+
+_HEADER_CHARSET = re.compile(r'charset\s*=\s*["\']?([\w.:-]+)', re.IGNORECASE)
+_META_CHARSET = re.compile(
+    rb'<meta[^>]+charset\s*=\s*["\']?\s*([\w.:-]+)',
+    re.IGNORECASE
+)
+
+# Tokens que mudam o estado do filtro: comentário, abertura de script/style e atributo com data URI
+_TOKEN = re.compile(r'<!--|<(script|style)(?=[\s>/])|=\s{0,8}(["\']?)data:', re.IGNORECASE)
+_SCRIPT_END = re.compile(r'</script', re.IGNORECASE)
+_STYLE_END = re.compile(r'</style', re.IGNORECASE)
+_JSON_SCRIPT_TYPE = re.compile(r'type\s*=\s*["\']?application/(ld\+)?json', re.IGNORECASE)
+_UNQUOTED_END = re.compile(r'[\s>]')
+# Maior token parcial que pode ficar cortado no fim de um chunk
+_MAX_TOKEN_LEN = 24
+# Limite para a tag de abertura de um script/style (atributos)
+_MAX_OPEN_TAG_LEN = 64 * 1024
+
+def charset_from_headers(content_type: Optional[str]) -> Optional[str]:
+    """Extrai o charset declarado no cabeçalho Content-Type."""
+    if not content_type:
+        return None
+    match = _HEADER_CHARSET.search(content_type)
+    return match.group(1) if match else None
+
+def charset_from_prefix(prefix: bytes) -> Optional[str]:
+    """Detecta o charset pelo BOM ou pela declaração <meta> nos primeiros bytes do documento."""
+    for bom, encoding in ((codecs.BOM_UTF8, "utf-8-sig"), (codecs.BOM_UTF16_LE, "utf-16"), (codecs.BOM_UTF16_BE, "utf-16")):
+        if prefix.startswith(bom):
+            return encoding
+    match = _META_CHARSET.search(prefix[:META_PRESCAN_BYTES])
+    return match.group(1).decode("ascii", "ignore") if match else None
+
+def _decoder_for(encoding: Optional[str]):
+    try:
+        return codecs.getincrementaldecoder(encoding or "utf-8")(errors="replace")
+    except LookupError:
+        logging.warning(f"Charset desconhecido '{encoding}'. Usando utf-8.")
+        return codecs.getincrementaldecoder("utf-8")(errors="replace")
+
+class HtmlStreamFilter:
+    """
+    Filtro incremental de HTML: recebe o texto em pedaços e devolve o HTML sem o conteúdo de
+    <script>/<style> (as tags ficam, vazias) e com valores data: de atributos reduzidos a "data:,".
+
+    Scripts JSON (application/json e application/ld+json) são mantidos, assim como comentários.
+    Nada disso altera o que os extratores leem: o texto de script/style já é ignorado por
+    eles e pelo trafilatura.
+    """
+
+    def __init__(self):
+        self._pending = ""
+        # None (texto normal), "open_tag", "skip", "keep", "comment" ou "data_uri"
+        self._state = None
+        self._end = None
+        self._quote = None
+
+    def feed(self, text: str) -> str:
+        data = self._pending + text
+        self._pending = ""
+        out = []
+        pos = 0
+
+        while pos < len(data):
+            if self._state is None:
+                match = _TOKEN.search(data, pos)
+                if not match:
+                    # Guarda o fim do chunk: pode ser o começo de um token cortado
+                    cut = max(pos, len(data) - _MAX_TOKEN_LEN)
+                    out.append(data[pos:cut])
+                    self._pending = data[cut:]
+                    break
+                if match.end() == len(data):
+                    # O token pode continuar no próximo chunk (ex.: "<scrip" + "t>")
+                    out.append(data[pos:match.start()])
+                    self._pending = data[match.start():]
+                    break
+                out.append(data[pos:match.start()])
+                if match.group(0) == "<!--":
+                    out.append("<!--")
+                    self._state, self._end = "comment", "-->"
+                    pos = match.end()
+                elif match.group(1):
+                    self._state = "open_tag"
+                    self._end = _SCRIPT_END if match.group(1).lower() == "script" else _STYLE_END
+                    pos = match.start()
+                else:
+                    out.append(match.group(0))
+                    out.append(",")
+                    self._state, self._quote = "data_uri", match.group(2)
+                    pos = match.end()
+
+            elif self._state == "open_tag":
+                close = data.find(">", pos)
+                if close == -1:
+                    if len(data) - pos > _MAX_OPEN_TAG_LEN:
+                        # Tag absurdamente longa: descarta até o fechamento do elemento
+                        self._state = "skip"
+                        out.append(data[pos:pos + 1])
+                        pos += 1
+                        continue
+                    self._pending = data[pos:]
+                    break
+                tag = data[pos:close + 1]
+                out.append(tag)
+                keep = self._end is _SCRIPT_END and _JSON_SCRIPT_TYPE.search(tag)
+                self._state = "keep" if keep else "skip"
+                pos = close + 1
+
+            elif self._state in ("skip", "keep"):
+                match = self._end.search(data, pos)
+                if not match:
+                    # Mantém os últimos caracteres: o fechamento pode estar cortado
+                    cut = max(pos, len(data) - 8)
+                    if self._state == "keep":
+                        out.append(data[pos:cut])
+                    self._pending = data[cut:]
+                    break
+                if self._state == "keep":
+                    out.append(data[pos:match.start()])
+                # Emite o "</script" e volta ao texto normal (o resto da tag sai como texto)
+                out.append(match.group(0))
+                self._state = None
+                pos = match.end()
+
+            elif self._state == "comment":
+                close = data.find(self._end, pos)
+                if close == -1:
+                    cut = max(pos, len(data) - 2)
+                    out.append(data[pos:cut])
+                    self._pending = data[cut:]
+                    break
+                out.append(data[pos:close + 3])
+                self._state = None
+                pos = close + 3
+
+            else:  # data_uri
+                if self._quote:
+                    close = data.find(self._quote, pos)
+                else:
+                    match = _UNQUOTED_END.search(data, pos)
+                    close = match.start() if match else -1
+                if close == -1:
+                    pos = len(data)
+                    break
+                self._state = None
+                pos = close
+
+        return "".join(out)
+
+    def close(self) -> str:
+        """Devolve o que sobrou no buffer ao fim do documento."""
+        rest, self._pending = self._pending, ""
+        if self._state in ("skip", "data_uri"):
+            return ""
+        return rest
+
+def read_html(response, max_bytes: int = None, cancel: Optional[threading.Event] = None) -> str:
+    """
+    Lê o corpo de uma resposta requests aberta com stream=True, em chunks.
+
+    O charset vem do Content-Type ou da declaração <meta> (sem detecção estatística sobre
+    o corpo inteiro), script/style e data URIs são descartados durante a leitura, e o
+    download para em max_bytes.
+
+    Args:
+        response: Resposta requests com stream=True
+        max_bytes: Limite de bytes baixados (padrão: FETCH_MAX_BYTES)
+        cancel: Se sinalizado, a leitura é abandonada (retorna "")
+
+    Returns:
+        HTML filtrado
+    """
+    max_bytes = max_bytes or FETCH_MAX_BYTES
+    encoding = charset_from_headers(response.headers.get("Content-Type"))
+    decoder = None
+    html_filter = HtmlStreamFilter()
+    out = []
+    prefix = b""
+    received = 0
+
+    for chunk in response.iter_content(chunk_size=CHUNK_SIZE):
+        if cancel is not None and cancel.is_set():
+            return ""
+        if not chunk:
+            continue
+        if received + len(chunk) > max_bytes:
+            chunk = chunk[:max_bytes - received]
+        received += len(chunk)
+
+        if decoder is None:
+            # Acumula o começo do documento até poder ler a declaração <meta charset>
+            prefix += chunk
+            if len(prefix) < META_PRESCAN_BYTES and received < max_bytes:
+                continue
+            decoder = _decoder_for(encoding or charset_from_prefix(prefix))
+            chunk, prefix = prefix, b""
+
+        out.append(html_filter.feed(decoder.decode(chunk)))
+        if received >= max_bytes:
+            logging.warning(f"Limite de {max_bytes} bytes atingido ao baixar {response.url}. Conteúdo truncado.")
+            break
+
+    if decoder is None:
+        decoder = _decoder_for(encoding or charset_from_prefix(prefix))
+        out.append(html_filter.feed(decoder.decode(prefix)))
+    out.append(html_filter.feed(decoder.decode(b"", final=True)))
+    out.append(html_filter.close())
+    return "".join(out)
@@ -0,0 +1,180 @@
+import logging
+import os
+import threading
+from typing import Dict, Any, Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+from requests.cookies import RequestsCookieJar
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+from urllib3.util.retry import Retry
+
+# Configuração de logs
+logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+
+# Configuração dos pools por upstream
+#   pool_connections: quantos hosts distintos mantêm pool em memória
+#   pool_maxsize: conexões keep-alive guardadas por host (deve cobrir o número de threads)
+#   retries: tentativas extras só em falhas de conexão e status transitórios (o read
+#            não é repetido para não duplicar requisições já processadas pelo upstream)
+#   post: o upstream é chamado com POST (cobrado por requisição); ver _build_session
+UPSTREAMS = {
+    "scrapingbee": {"pool_connections": 1, "pool_maxsize": 16, "retries": 1, "post": True},
+    "direct": {"pool_connections": 64, "pool_maxsize": 4, "retries": 1, "post": False},
+    "openrouter": {"pool_connections": 1, "pool_maxsize": 16, "retries": 2, "post": True},
+}
+
+RETRY_STATUS = (429, 502, 503, 504)
+
+# Espera máxima por um Retry-After antes de repetir: a espera segura a thread da requisição
+# (ex.: /generate_response esperando o OpenRouter), e um upstream que pede mais que isso
+# provavelmente continua indisponível
+MAX_RETRY_AFTER = float(os.getenv("HTTP_MAX_RETRY_AFTER", 3))
+
+class PoolStats:
+    """Contadores de reaproveitamento de conexões de um upstream."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def record(self, reused: bool):
+        with self._lock:
+            if reused:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+    def as_dict(self) -> Dict[str, Any]:
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "reuse_rate": round(self.hits / total, 4) if total else 0.0
+            }
+
+def _counting_pool(base, stats: PoolStats):
+    """Subclasse do pool do urllib3 que registra se cada conexão entregue já estava aberta."""
+
+    class CountingPool(base):
+        def _get_conn(self, timeout=None):
+            conn = super()._get_conn(timeout)
+            # Conexões novas (ou descartadas por estarem caídas) ainda não têm socket
+            stats.record(getattr(conn, "sock", None) is not None)
+            return conn
+
+    return CountingPool
+
+class PooledAdapter(HTTPAdapter):
+    """HTTPAdapter com pools instrumentados por PoolStats."""
+
+    def __init__(self, stats: PoolStats, **kwargs):
+        self.stats = stats
+        super().__init__(**kwargs)
+
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = {
+            "http": _counting_pool(HTTPConnectionPool, self.stats),
+            "https": _counting_pool(HTTPSConnectionPool, self.stats),
+        }
+
+class BoundedRetry(Retry):
+    """Retry que espera no máximo MAX_RETRY_AFTER segundos pelo Retry-After do upstream."""
+
+    def get_retry_after(self, response) -> Optional[float]:
+        retry_after = super().get_retry_after(response)
+        return min(retry_after, MAX_RETRY_AFTER) if retry_after is not None else None
+
+class IsolatedCookiesSession(requests.Session):
+    """
+    Sessão compartilhada entre threads (pool e retries) com um cookie jar novo a cada
+    requisição: os cookies recebidos valem para a cadeia de redirecionamentos da própria
+    requisição (consentimento, sessão do site), mas não vazam para a próxima página nem
+    para outras threads.
+    """
+
+    def __init__(self):
+        self._local = threading.local()
+        super().__init__()
+
+    @property
+    def cookies(self) -> RequestsCookieJar:
+        jar = getattr(self._local, "jar", None)
+        if jar is None:
+            jar = self._local.jar = RequestsCookieJar()
+        return jar
+
+    @cookies.setter
+    def cookies(self, jar: RequestsCookieJar):
+        self._local.jar = jar
+
+    def request(self, *args, **kwargs):
+        self._local.jar = RequestsCookieJar()
+        return super().request(*args, **kwargs)
+
+_sessions: Dict[str, requests.Session] = {}
+_stats: Dict[str, PoolStats] = {}
+_lock = threading.Lock()
+
+def _build_session(upstream: str) -> requests.Session:
+    config = UPSTREAMS[upstream]
+    if config["post"]:
+        # Um 502/504 pode chegar depois de o upstream ter processado (e cobrado) o POST: ele
+        # só é repetido em falhas de conexão (a requisição não saiu) e quando o upstream pede
+        # (429/503 com Retry-After, esperando no máximo MAX_RETRY_AFTER segundos)
+        allowed_methods = Retry.DEFAULT_ALLOWED_METHODS | {"POST"}
+        status_forcelist = ()
+    else:
+        allowed_methods = Retry.DEFAULT_ALLOWED_METHODS
+        status_forcelist = RETRY_STATUS
+    retries = BoundedRetry(
+        total=config["retries"],
+        connect=config["retries"],
+        read=0,
+        status=config["retries"],
+        status_forcelist=status_forcelist,
+        allowed_methods=allowed_methods,
+        backoff_factor=0.5,
+        respect_retry_after_header=True,
+        raise_on_status=False
+    )
+    stats = _stats.setdefault(upstream, PoolStats())
+    adapter = PooledAdapter(
+        stats,
+        pool_connections=config["pool_connections"],
+        pool_maxsize=config["pool_maxsize"],
+        max_retries=retries
+    )
+
+    session = IsolatedCookiesSession()
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+def get_session(upstream: str) -> requests.Session:
+    """
+    Retorna a sessão compartilhada (keep-alive, pool e retries) de um upstream.
+
+    Args:
+        upstream: "scrapingbee", "direct" (sites de destino) ou "openrouter"
+    """
+    session = _sessions.get(upstream)
+    if session is None:
+        with _lock:
+            session = _sessions.get(upstream)
+            if session is None:
+                session = _sessions[upstream] = _build_session(upstream)
+                logging.info(f"Sessão HTTP criada para o upstream: {upstream}")
+    return session
+
+def get_pool_stats() -> Dict[str, Dict[str, Any]]:
+    """
+    Retorna os contadores de reaproveitamento de conexões por upstream.
+
+    Returns:
+        upstream -> {"hits", "misses", "reuse_rate"}
+    """
+    return {upstream: stats.as_dict() for upstream, stats in _stats.items()}
@@ -0,0 +1,30 @@
+from typing import Any, Optional, TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from cache_manager_melhorado import CacheManager
+
+class LazyPageCache:
+    """
+    Atributo "cache" dos componentes que guardam estado no Redis do page_cache (estratégias
+    de download, circuit breaker, histogramas de tempo).
+
+    Um CacheManager atribuído (injetado no construtor) é usado como está; sem ele, o
+    page_cache de cache_manager_melhorado só é importado no primeiro acesso. Assim importar
+    esses módulos não cria clientes Redis nem threads de reconexão, o que importa nos
+    processos do parse_pool, que importam o extrator mas nunca usam o cache.
+    """
+
+    def __set_name__(self, owner: type, name: str):
+        self.attribute = f"_{name}"
+
+    def __get__(self, instance: Any, owner: type = None) -> "CacheManager":
+        if instance is None:
+            return self
+        cache = instance.__dict__.get(self.attribute)
+        if cache is None:
+            from cache_manager_melhorado import page_cache
+            cache = instance.__dict__[self.attribute] = page_cache
+        return cache
+
+    def __set__(self, instance: Any, cache: Optional["CacheManager"]):
+        instance.__dict__[self.attribute] = cache
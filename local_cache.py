@@ -0,0 +1,110 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+class LocalLRUCache:
+    """
+    Cache em memória do processo, LRU, com TTL por entrada e limite de memória.
+
+    O tamanho de cada entrada é informado por quem grava (ex.: o tamanho do JSON lido do
+    Redis); ao passar de max_bytes ou max_entries, as entradas menos usadas saem primeiro.
+    Os valores são guardados como recebidos: quem lê não deve alterá-los.
+    """
+
+    def __init__(self, max_bytes: int, max_entries: int = 10000, ttl: float = 30):
+        """
+        Args:
+            max_bytes: Soma máxima dos tamanhos das entradas
+            max_entries: Número máximo de entradas
+            ttl: Tempo de vida padrão de uma entrada em segundos
+        """
+        self.max_bytes = max_bytes
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        # chave -> (valor, tamanho, expira_em)
+        self._entries: "OrderedDict[str, Tuple[Any, int, float]]" = OrderedDict()
+        self._bytes = 0
+        # Incrementada a cada remoção explícita: permite descartar gravações de valores lidos
+        # antes de uma invalidação (ver put com generation)
+        self.generation = 0
+        self._counters = {"evictions": 0, "expirations": 0, "invalidations": 0}
+
+    def get(self, key: str) -> Optional[Any]:
+        """Valor da chave, ou None se ausente ou expirado."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry[2] <= time.monotonic():
+                self._remove(key)
+                self._counters["expirations"] += 1
+                return None
+            self._entries.move_to_end(key)
+            return entry[0]
+
+    def put(self, key: str, value: Any, size: int, ttl: float = None, generation: int = None) -> bool:
+        """
+        Grava a chave, removendo as entradas menos usadas até caber.
+
+        Args:
+            key: Chave
+            value: Valor
+            size: Tamanho aproximado do valor em bytes
+            ttl: Tempo de vida em segundos (padrão: o do cache)
+            generation: Se informada e houve alguma remoção explícita desde que ela foi lida
+                (self.generation mudou), a gravação é descartada
+
+        Returns:
+            True se gravado
+        """
+        if size > self.max_bytes:
+            return False
+        with self._lock:
+            if generation is not None and generation != self.generation:
+                return False
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (value, size, time.monotonic() + (ttl if ttl is not None else self.ttl))
+            self._bytes += size
+            while self._bytes > self.max_bytes or len(self._entries) > self.max_entries:
+                oldest = next(iter(self._entries))
+                self._remove(oldest)
+                self._counters["evictions"] += 1
+            return True
+
+    def pop(self, key: str):
+        """Remove a chave (invalidação)."""
+        with self._lock:
+            self.generation += 1
+            self._counters["invalidations"] += 1
+            if key in self._entries:
+                self._remove(key)
+
+    def clear(self):
+        """Remove todas as entradas."""
+        with self._lock:
+            self.generation += 1
+            self._entries.clear()
+            self._bytes = 0
+
+    def items(self) -> List[Tuple[str, Any, float]]:
+        """Entradas não expiradas como (chave, valor, segundos de vida restantes), da menos usada à mais usada."""
+        now = time.monotonic()
+        with self._lock:
+            return [(key, value, expires_at - now)
+                    for key, (value, _, expires_at) in self._entries.items() if expires_at > now]
+
+    def _remove(self, key: str):
+        _, size, _ = self._entries.pop(key)
+        self._bytes -= size
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                **self._counters
+            }
@@ -0,0 +1,87 @@
+import copy
+import threading
+from typing import Any, Dict, List, Optional, Tuple
+
+from cache_codec import ValueCodec
+from local_cache import LocalLRUCache
+
+class MemoryBackend:
+    """
+    Backend em memória do processo para o PageCache e o ConversationCache: valores com TTL
+    e listas limitadas (histórico de conversa), em um LRU com limite de bytes.
+
+    Assume automaticamente enquanto o Redis está indisponível, para que extrações e
+    conversas continuem em cache nesse intervalo; o que foi gravado é devolvido por drain
+    para ser reenviado ao Redis quando ele voltar. Com CACHE_BACKEND=memory é o único
+    backend (testes e benchmarks sem Redis).
+
+    As chaves são as mesmas do Redis (prefixo + URL/sessão). Os valores lidos são cópias
+    rasas: quem lê pode alterá-los sem afetar o que está guardado.
+    """
+
+    def __init__(self, max_bytes: int = 64 * 1024 * 1024, max_entries: int = 10000):
+        """
+        Args:
+            max_bytes: Soma máxima dos tamanhos (serializados) dos valores
+            max_entries: Número máximo de chaves
+        """
+        self._store = LocalLRUCache(max_bytes=max_bytes, max_entries=max_entries)
+        # Serializa as operações compostas (append lê e regrava a lista) e o drain
+        self._lock = threading.Lock()
+        # Só para estimar o tamanho dos valores
+        self._sizer = ValueCodec("orjson")
+
+    def _size(self, value: Any) -> int:
+        return self._sizer.encode_with_size(value)[1]
+
+    def get(self, key: str) -> Optional[Any]:
+        """Valor da chave, ou None se ausente ou expirado."""
+        return copy.copy(self._store.get(key))
+
+    def set(self, key: str, value: Any, ttl: float) -> bool:
+        """Grava o valor com tempo de vida em segundos."""
+        with self._lock:
+            return self._store.put(key, value, self._size(value), ttl=ttl)
+
+    def delete(self, *keys: str) -> int:
+        """Remove as chaves; devolve quantas existiam."""
+        removed = 0
+        with self._lock:
+            for key in keys:
+                if self._store.get(key) is not None:
+                    removed += 1
+                self._store.pop(key)
+        return removed
+
+    def append(self, key: str, items: List[Any], max_len: int, ttl: float) -> int:
+        """
+        Acrescenta os itens ao fim da lista da chave, mantendo só os últimos max_len e
+        renovando o tempo de vida (como RPUSH + LTRIM + EXPIRE).
+
+        Returns:
+            Tamanho da lista depois da gravação (0 se não coube no limite de memória)
+        """
+        with self._lock:
+            current = self._store.get(key) or []
+            updated = (current + list(items))[-max_len:]
+            if not self._store.put(key, updated, self._size(updated), ttl=ttl):
+                return 0
+            return len(updated)
+
+    def lrange(self, key: str, limit: int = None) -> List[Any]:
+        """Itens da lista da chave (só os últimos limit, se informado)."""
+        items = self._store.get(key) or []
+        return list(items[-limit:] if limit else items)
+
+    def llen(self, key: str) -> int:
+        return len(self._store.get(key) or [])
+
+    def drain(self) -> List[Tuple[str, Any, float]]:
+        """Remove e devolve todas as entradas não expiradas como (chave, valor, segundos restantes)."""
+        with self._lock:
+            items = self._store.items()
+            self._store.clear()
+            return items
+
+    def get_stats(self) -> Dict[str, Any]:
+        return self._store.get_stats()
@@ -0,0 +1,42 @@
+"""
+Converte os históricos de conversa gravados no formato antigo (um único JSON com o
+histórico inteiro) para o formato de lista do ConversationCache.
+
+A conversão também acontece sozinha no primeiro acesso a cada sessão; este script a
+antecipa para todas as sessões ativas, percorrendo o índice de sessões aos poucos.
+
+Uso:
+    python migrate_conversations.py
+"""
+import logging
+import sys
+import time
+
+from cache_manager_melhorado import conversation_cache
+
+# Configuração de logs
+logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+
+def main():
+    if not conversation_cache._is_connected():
+        logging.error("Redis indisponível: nada a migrar.")
+        return 1
+
+    stats = {"convertidas": 0, "ja_em_lista": 0, "erros": 0}
+    start = time.perf_counter()
+    for session_id in conversation_cache.iter_indexed():
+        try:
+            if conversation_cache.migrate_session(session_id):
+                stats["convertidas"] += 1
+            else:
+                stats["ja_em_lista"] += 1
+        except Exception as e:
+            stats["erros"] += 1
+            logging.error(f"Erro ao converter a sessão {session_id}: {e}")
+
+    elapsed = time.perf_counter() - start
+    logging.info(f"Migração concluída em {elapsed:.1f}s: {stats}")
+    return 1 if stats["erros"] else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
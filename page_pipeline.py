@@ -0,0 +1,75 @@
+import logging
+from datetime import datetime
+from typing import Dict, Any
+
+from cache_manager_melhorado import page_cache
+from data_extractor_melhorado import extract_page, EXTRACTOR_VERSION
+
+# Configuração de logs
+logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+
+def extract_and_cache(url: str, refresh: bool = False) -> Dict[str, Any]:
+    """
+    Extrai a página (revalidando ou reaproveitando a entrada expirada, se houver), atualiza o
+    cache e retorna o corpo da resposta de /extract_data. Usado pelo /extract_data, pelas
+    atualizações em segundo plano e pelo BatchExtractor (/extract_batch e warm_cache.py).
+
+    Com refresh=True (atualização de uma entrada stale), uma falha no download não substitui
+    os dados stale pelos dados genéricos de fallback.
+    """
+    logging.info(f"Extraindo dados de: {url}")
+    expired_entry = page_cache.get_revalidation_entry(url)
+    result = extract_page(url, expired_entry)
+    page_cache.record_outcome(result.outcome)
+
+    if result.outcome in ("not_modified", "unchanged"):
+        # A origem confirmou (304) ou o hash do HTML mostrou que nada mudou: só renova o TTL
+        page_cache.extend_ttl(url, expired_entry, validators=result.validators)
+        return {
+            "data": result.data,
+            "cached": True,
+            "outcome": result.outcome,
+            "timestamp": expired_entry.get("cached_at"),
+            "timings_ms": result.timings
+        }
+
+    if refresh and result.outcome == "fallback":
+        logging.warning(f"Atualização de {url} falhou; os dados stale foram mantidos.")
+        return {
+            "data": expired_entry["data"] if expired_entry else result.data,
+            "cached": True,
+            "stale": True,
+            "outcome": "stale",
+            "timestamp": expired_entry.get("cached_at") if expired_entry else None
+        }
+
+    if result.outcome == "fallback":
+        # Não grava o fallback como dados da página: só uma entrada negativa de vida curta
+        page_cache.set_negative(url, result.data)
+        return {
+            "data": result.data,
+            "cached": False,
+            "outcome": result.outcome,
+            "timestamp": datetime.now().isoformat(),
+            "timings_ms": result.timings
+        }
+
+    structured_data = result.data
+    if structured_data:
+        # Armazena no cache
+        page_cache.set_cached_data(url, structured_data, validators=result.validators,
+                                    content_hash=result.content_hash, extractor_version=EXTRACTOR_VERSION)
+
+        logging.info(f"Dados extraídos com sucesso para: {url}")
+        return {
+            "data": structured_data,
+            "cached": False,
+            "outcome": result.outcome,
+            "timestamp": datetime.now().isoformat(),
+            "timings_ms": result.timings
+        }
+    else:
+        logging.error(f"Falha na extração de dados para: {url}")
+        return {
+            "error": "Não foi possível extrair dados da URL fornecida."
+        }
@@ -0,0 +1,248 @@
+import itertools
+import logging
+import multiprocessing
+import os
+import signal
+import threading
+import time
+from concurrent.futures import Future, ProcessPoolExecutor, TimeoutError as FuturesTimeoutError
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Callable, Dict, List, Optional
+
+# Configuração de logs
+logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+
+class ParsePoolError(Exception):
+    """A tarefa não pôde ser concluída pelo pool (a função não chegou a devolver resultado)."""
+
+class ParsePoolTimeout(ParsePoolError):
+    """A tarefa não terminou dentro do tempo limite do pool."""
+
+class ParsePoolBroken(ParsePoolError):
+    """O processo que executava a tarefa morreu (ex.: falta de memória ou encerrado por travar)."""
+
+# Nos processos do pool: fila pela qual cada tarefa avisa que começou a executar
+_started_queue = None
+
+def _init_worker(started_queue):
+    global _started_queue
+    _started_queue = started_queue
+
+def _run_task(task_id: int, fn: Callable[..., Any], *args) -> Any:
+    """Executa a tarefa no processo do pool, avisando antes o início (e o pid) ao ParsePool."""
+    _started_queue.put((task_id, os.getpid()))
+    return fn(*args)
+
+class _Task:
+    """Tarefa enviada a um pool: quando e em qual processo começou a executar."""
+
+    def __init__(self, executor: ProcessPoolExecutor):
+        self.executor = executor
+        self.future: Optional[Future] = None
+        self.started = threading.Event()
+        self.started_at = 0.0
+        self.pid: Optional[int] = None
+
+    def overdue(self, timeout: float) -> bool:
+        return self.started.is_set() and time.monotonic() - self.started_at > timeout
+
+class ParsePool:
+    """
+    Pool de processos para o trabalho de CPU (parsing do HTML), fora do GIL das threads que
+    atendem as requisições.
+
+    - fila limitada: no máximo max_pending tarefas no pool; quem chega com a fila cheia espera
+      até queue_timeout e então executa no próprio processo (contado em "inline")
+    - tempo limite: uma tarefa que passa de task_timeout segundos em execução (a espera na
+      fila do executor não conta) é abandonada (ParsePoolTimeout) e o pool é substituído; as
+      outras tarefas do pool antigo terminam normalmente e só então o processo travado é
+      encerrado (se ele morrer, quem ainda esperava recebe ParsePoolBroken)
+    - reciclagem: após max_tasks_per_pool tarefas os processos são trocados, devolvendo a
+      memória acumulada pelo lxml/trafilatura
+
+    Os processos são criados sob demanda, na primeira tarefa. Com workers=0 tudo roda no
+    próprio processo (comportamento anterior).
+    """
+
+    def __init__(self, workers: int, max_pending: int = None, task_timeout: float = 30,
+                 queue_timeout: float = 5, max_tasks_per_pool: int = 500,
+                 start_method: str = "forkserver", preload: Optional[List[str]] = None):
+        """
+        Args:
+            workers: Número de processos (0 desabilita o pool)
+            max_pending: Máximo de tarefas no pool, em execução ou na fila (padrão: 4 por processo)
+            task_timeout: Tempo máximo de uma tarefa em segundos
+            queue_timeout: Espera máxima por uma vaga na fila antes de executar no próprio processo
+            max_tasks_per_pool: Tarefas antes de reciclar os processos
+            start_method: Método de criação dos processos; "forkserver" evita herdar as
+                threads do worker (fork com threads pode travar nos locks herdados)
+            preload: Módulos importados uma vez no forkserver, para que os processos já
+                nasçam com eles carregados
+        """
+        self.workers = workers
+        self.max_pending = max_pending or workers * 4
+        self.task_timeout = task_timeout
+        self.queue_timeout = queue_timeout
+        self.max_tasks_per_pool = max_tasks_per_pool
+        if start_method not in multiprocessing.get_all_start_methods():
+            start_method = "spawn"
+        self._context = multiprocessing.get_context(start_method)
+        if start_method == "forkserver" and preload:
+            self._context.set_forkserver_preload(preload)
+        self._slots = threading.BoundedSemaphore(self.max_pending) if workers else None
+        self._lock = threading.Lock()
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._executor_tasks = 0
+        # Tarefas ainda não concluídas (de todos os pools, inclusive os substituídos)
+        self._tasks: Dict[int, _Task] = {}
+        self._task_ids = itertools.count()
+        # Fila de avisos de início e pid em que a thread que a lê foi iniciada (um processo
+        # criado por fork precisa das suas)
+        self._started_queue = None
+        self._listener_pid: Optional[int] = None
+        self._counters = {"submitted": 0, "inline": 0, "timeouts": 0, "errors": 0, "recycled": 0}
+
+    def run(self, fn: Callable[..., Any], *args) -> Any:
+        """
+        Executa fn(*args) em um processo do pool e devolve o resultado.
+
+        fn deve ser uma função de módulo (serializável com pickle), assim como os argumentos e
+        o resultado. Erros da tarefa são propagados; ParsePoolTimeout se passar do tempo limite
+        e ParsePoolBroken se o processo morrer durante a tarefa (ambos ParsePoolError).
+        """
+        if not self.workers:
+            return fn(*args)
+
+        if not self._slots.acquire(timeout=self.queue_timeout):
+            logging.warning(f"Fila do pool de parsing cheia ({self.max_pending} tarefas). Executando no próprio processo.")
+            self._record("inline")
+            return fn(*args)
+
+        try:
+            executor = self._executor_for_task()
+            try:
+                task = self._submit(executor, fn, args)
+            except BrokenProcessPool:
+                # Um processo morreu (ex.: falta de memória): o pool não aceita mais tarefas
+                self._retire(executor, "pool quebrado")
+                executor = self._executor_for_task()
+                task = self._submit(executor, fn, args)
+            self._record("submitted")
+
+            try:
+                return self._result(task)
+            except FuturesTimeoutError:
+                self._record("timeouts")
+                self._retire(executor, f"tarefa passou de {self.task_timeout}s")
+                raise ParsePoolTimeout(f"Parsing não terminou em {self.task_timeout}s")
+            except BrokenProcessPool as e:
+                self._record("errors")
+                self._retire(executor, "processo encerrado durante a tarefa")
+                raise ParsePoolBroken("Processo de parsing encerrado durante a tarefa") from e
+        finally:
+            self._slots.release()
+
+    def _submit(self, executor: ProcessPoolExecutor, fn: Callable[..., Any], args: tuple) -> _Task:
+        task = _Task(executor)
+        with self._lock:
+            task_id = next(self._task_ids)
+            self._tasks[task_id] = task
+        try:
+            task.future = executor.submit(_run_task, task_id, fn, *args)
+        except BaseException:
+            self._forget(task_id)
+            raise
+        task.future.add_done_callback(lambda _: self._forget(task_id))
+        return task
+
+    def _forget(self, task_id: int):
+        with self._lock:
+            self._tasks.pop(task_id, None)
+
+    def _result(self, task: _Task) -> Any:
+        """Resultado da tarefa, com o tempo limite contado do início da execução."""
+        # Enquanto a tarefa espera um processo livre, só acompanha o aviso de início
+        while not task.started.wait(0.05):
+            if task.future.done():
+                return task.future.result()
+        remaining = self.task_timeout - (time.monotonic() - task.started_at)
+        return task.future.result(timeout=max(remaining, 0))
+
+    def _listen_started(self, started_queue):
+        while True:
+            task_id, pid = started_queue.get()
+            with self._lock:
+                task = self._tasks.get(task_id)
+            if task is not None:
+                task.pid = pid
+                task.started_at = time.monotonic()
+                task.started.set()
+
+    def _executor_for_task(self) -> ProcessPoolExecutor:
+        """Pool atual (criado ou reciclado se necessário), já contando a nova tarefa."""
+        with self._lock:
+            if self._executor is not None and self._executor_tasks >= self.max_tasks_per_pool:
+                self._retire_locked(self._executor, "reciclagem")
+                self._record_locked("recycled")
+            if self._executor is None:
+                pid = os.getpid()
+                if self._listener_pid != pid:
+                    self._started_queue = self._context.SimpleQueue()
+                    self._listener_pid = pid
+                    threading.Thread(target=self._listen_started, args=(self._started_queue,),
+                                     name="parse-pool-started", daemon=True).start()
+                self._executor = ProcessPoolExecutor(max_workers=self.workers, mp_context=self._context,
+                                                     initializer=_init_worker, initargs=(self._started_queue,))
+                self._executor_tasks = 0
+            self._executor_tasks += 1
+            return self._executor
+
+    def _retire(self, executor: ProcessPoolExecutor, reason: str):
+        with self._lock:
+            self._retire_locked(executor, reason)
+
+    def _retire_locked(self, executor: ProcessPoolExecutor, reason: str):
+        """Tira o pool de uso (se ainda for o atual) e encerra os processos dele em segundo plano."""
+        if executor is not self._executor:
+            return
+        self._executor = None
+        logging.info(f"Substituindo os processos do pool de parsing: {reason}.")
+        threading.Thread(target=self._reap, args=(executor,), name="parse-pool-reaper", daemon=True).start()
+
+    def _reap(self, executor: ProcessPoolExecutor):
+        # Deixa terminar as tarefas do pool antigo que estão dentro do prazo (e as que esperam
+        # um processo livre, se algum não estiver travado); só então encerra os travados, já
+        # que a morte de um processo quebra o pool para todas as tarefas dele
+        executor.shutdown(wait=False)
+        while True:
+            with self._lock:
+                tasks = [task for task in self._tasks.values() if task.executor is executor]
+            hung = [task for task in tasks if task.overdue(self.task_timeout)]
+            running = [task for task in tasks if task.started.is_set() and task not in hung]
+            waiting = [task for task in tasks if not task.started.is_set()]
+            if not running and (not waiting or len(hung) >= self.workers):
+                break
+            time.sleep(0.2)
+        for task in hung:
+            logging.warning(f"Encerrando processo de parsing travado (pid {task.pid}).")
+            try:
+                os.kill(task.pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    def _record(self, counter: str):
+        with self._lock:
+            self._record_locked(counter)
+
+    def _record_locked(self, counter: str):
+        self._counters[counter] += 1
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Configuração e contadores do pool neste processo."""
+        with self._lock:
+            return {
+                "workers": self.workers,
+                "max_pending": self.max_pending,
+                "running": self._executor is not None,
+                **self._counters
+            }
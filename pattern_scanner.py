@@ -0,0 +1,193 @@
+import re
+from functools import lru_cache
+from typing import Dict, List, Any, Iterable, Tuple
+
+# Dígitos decimais Unicode fora do ASCII: quando aparecem, \d precisa do caminho exato
+_NON_ASCII_DIGIT = re.compile(r'[^\D0-9]')
+
+# Metacaracteres que não podem abrir um padrão decomponível em "literal + resto"
+_SPECIAL_CHARS = set('.^$*+?{}[]|()\\')
+
+_INLINE_FLAGS = ((re.IGNORECASE, 'i'), (re.MULTILINE, 'm'), (re.DOTALL, 's'))
+
+@lru_cache(maxsize=None)
+def _bmp_chars() -> str:
+    return ''.join(chr(code) for code in range(0x10000) if not 0xD800 <= code < 0xE000)
+
+@lru_cache(maxsize=None)
+def _case_variants(char: str) -> Tuple[str, ...]:
+    """Todos os caracteres que casam com `char` sob re.IGNORECASE (inclui dobras especiais como 'ſ')."""
+    return tuple(sorted(set(re.findall(re.escape(char), _bmp_chars(), re.IGNORECASE)) | {char}))
+
+def _split_first_token(pattern: str) -> Tuple[str, str]:
+    """
+    Separa o primeiro token de um padrão, descartando um grupo de captura inicial.
+
+    Returns:
+        (primeiro, resto): primeiro é um caractere literal ou '\\d'; resto é o padrão restante
+    """
+    body = pattern
+    prefix = ''
+    if body.startswith('(') and not body.startswith('(?'):
+        body = body[1:]
+        prefix = '(?:'
+    if body.startswith('\\d'):
+        first, rest = '\\d', body[2:]
+    elif body.startswith('\\') and len(body) > 1 and not body[1].isalnum():
+        first, rest = body[1], body[2:]
+    elif body and body[0] not in _SPECIAL_CHARS:
+        first, rest = body[0], body[1:]
+    else:
+        raise ValueError(f"Padrão não começa com um literal: {pattern!r}")
+
+    if rest.startswith('+'):
+        # X+ equivale a X seguido de X*
+        rest = (first if first == '\\d' else re.escape(first)) + '*' + rest[1:]
+    elif rest[:1] in ('*', '?', '{'):
+        raise ValueError(f"Primeiro token opcional não suportado: {pattern!r}")
+    return first, prefix + rest
+
+def _non_capturing(pattern: str) -> str:
+    """Converte grupos de captura em grupos não capturantes (os valores vêm do padrão original)."""
+    return re.sub(r'(?<!\\)\((?!\?)', '(?:', pattern)
+
+class ScanResult:
+    """Candidatos encontrados por PatternScanner.scan, agrupados por campo e por padrão."""
+
+    def __init__(self, matches: Dict[str, List[List[Any]]]):
+        self._matches = matches
+
+    def findall(self, field: str) -> List[List[Any]]:
+        """
+        Retorna, para cada padrão do campo (na ordem de registro), o mesmo que
+        re.findall(padrão, texto, flags) retornaria.
+
+        Para campos de prioridade só o primeiro casamento dos padrões que ainda podiam
+        vencer é coletado; o primeiro padrão não vazio e seu primeiro valor são os mesmos
+        do re.findall.
+        """
+        return self._matches[field]
+
+class PatternScanner:
+    """
+    Compila vários padrões de vários campos em um único scanner com grupos nomeados.
+
+    Cada padrão vira um ramo que começa com um caractere literal (as variantes de
+    maiúsculas/minúsculas são expandidas) seguido de um grupo nomeado que identifica o
+    padrão, o que permite ao motor de regex pular direto para as posições candidatas.
+    O texto é percorrido uma única vez; em cada posição candidata os padrões daquele
+    caractere inicial são confirmados individualmente, o que mantém o resultado idêntico
+    a chamar re.findall padrão por padrão.
+
+    Nos campos de prioridade (em que vence o primeiro casamento do padrão mais prioritário)
+    os padrões que não podem mais vencer saem do scanner durante a passada.
+    """
+
+    # Limite de regex combinados mantidos em memória (um por conjunto de padrões ativos)
+    MAX_COMPILED = 256
+
+    def __init__(self, fields: Dict[str, Tuple[List[str], int]], priority_fields: Iterable[str] = ()):
+        """
+        Args:
+            fields: campo -> (padrões na ordem de prioridade do campo, flags do re)
+            priority_fields: campos em que só interessa o primeiro casamento do padrão mais prioritário
+        """
+        self.fields = {field: len(patterns) for field, (patterns, _) in fields.items()}
+        self.priority_fields = set(priority_fields)
+        self._patterns: List[Tuple[str, int, Any]] = []
+        self._field_indexes: Dict[str, List[int]] = {}
+        self._by_first_char: Dict[str, List[int]] = {}
+        self._digit_patterns: List[int] = []
+        # Ramos de cada padrão: (ramos rápidos, ramos exatos)
+        self._branches: List[Tuple[List[str], List[str]]] = []
+
+        for field, (patterns, flags) in fields.items():
+            for pattern_index, pattern in enumerate(patterns):
+                index = len(self._patterns)
+                self._patterns.append((field, pattern_index, re.compile(pattern, flags)))
+                self._field_indexes.setdefault(field, []).append(index)
+
+                first, rest = _split_first_token(pattern)
+                inline = ''.join(letter for flag, letter in _INLINE_FLAGS if flags & flag)
+                rest = _non_capturing(rest)
+                if inline:
+                    rest = f'(?{inline}:{rest})'
+
+                if first == '\\d':
+                    self._digit_patterns.append(index)
+                    firsts = '0123456789'
+                    exact = [f'\\d(?P<p{index}>){rest}']
+                else:
+                    firsts = _case_variants(first) if flags & re.IGNORECASE else (first,)
+                    exact = [f'{re.escape(char)}(?P<p{index}_{ord(char)}>){rest}' for char in firsts]
+                fast = [f'{re.escape(char)}(?P<p{index}_{ord(char)}>){rest}' for char in firsts]
+                self._branches.append((fast, exact))
+
+                for char in firsts:
+                    self._by_first_char.setdefault(char, []).append(index)
+
+        self._all = frozenset(range(len(self._patterns)))
+        self._scanners: Dict[Tuple[frozenset, bool], Any] = {}
+
+    def _scanner(self, active: frozenset, exact: bool):
+        """Regex combinado só com os padrões ativos (compilado uma vez por combinação)."""
+        key = (active, exact and any(index in active for index in self._digit_patterns))
+        scanner = self._scanners.get(key)
+        if scanner is None:
+            branches = [branch for index in sorted(active) for branch in self._branches[index][1 if key[1] else 0]]
+            if len(self._scanners) >= self.MAX_COMPILED:
+                # Descarta a combinação mais antiga; na prática poucas combinações se repetem
+                self._scanners.pop(next(iter(self._scanners)))
+            scanner = self._scanners[key] = re.compile('|'.join(branches))
+        return scanner
+
+    def _candidates_at(self, text: str, position: int) -> List[int]:
+        char = text[position]
+        candidates = self._by_first_char.get(char)
+        if candidates is None and self._digit_patterns and char.isdecimal():
+            return self._digit_patterns
+        return candidates or []
+
+    def scan(self, text: str) -> ScanResult:
+        """Percorre o texto uma vez e coleta os candidatos de todos os campos."""
+        matches = {field: [[] for _ in range(count)] for field, count in self.fields.items()}
+        if not text:
+            return ScanResult(matches)
+
+        exact = bool(_NON_ASCII_DIGIT.search(text))
+        active = self._all
+        scanner = self._scanner(active, exact)
+        # Próxima posição permitida por padrão (re.findall não sobrepõe casamentos)
+        next_allowed = [0] * len(self._patterns)
+
+        position = 0
+        while active:
+            hit = scanner.search(text, position)
+            if not hit:
+                break
+            start = hit.start()
+            retired = set()
+            for index in self._candidates_at(text, start):
+                if index not in active or start < next_allowed[index]:
+                    continue
+                field, pattern_index, compiled = self._patterns[index]
+                match = compiled.match(text, start)
+                if not match:
+                    continue
+                next_allowed[index] = max(match.end(), start + 1)
+                if compiled.groups == 0:
+                    value = match.group(0)
+                elif compiled.groups == 1:
+                    value = match.group(1) or ''
+                else:
+                    value = match.groups('')
+                matches[field][pattern_index].append(value)
+                if field in self.priority_fields:
+                    # Este padrão e os de menor prioridade do campo não podem mais vencer
+                    retired.update(self._field_indexes[field][pattern_index:])
+            if retired:
+                active = active - retired
+                scanner = self._scanner(active, exact)
+            position = start + 1
+
+        return ScanResult(matches)
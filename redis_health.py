@@ -0,0 +1,194 @@
+import logging
+import os
+import random
+import threading
+import time
+from typing import Any, Callable, Dict, Optional
+
+import redis
+from redis.client import Pipeline
+
+# Configuração de logs
+logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+
+# Erros que indicam que o servidor está inacessível (e não um erro do comando)
+CONNECTION_ERRORS = (redis.exceptions.ConnectionError, redis.exceptions.TimeoutError)
+
+class RedisHealth:
+    """
+    Estado de saúde de uma conexão Redis, inferido dos próprios comandos (sem PING a cada
+    operação).
+
+    - "up": os comandos passam
+    - "down": um comando falhou por conexão/timeout; quem consulta o cache falha na hora
+      (sem esperar o timeout do socket) até a reconexão
+    - "reconnecting": uma thread em segundo plano está testando a conexão; falhas voltam
+      para "down" e a próxima tentativa espera o dobro (até max_backoff segundos)
+
+    Transições são contadas e registradas no log uma única vez, não a cada requisição.
+    O estado vale para o processo (cada worker observa a própria conexão).
+    """
+
+    UP = "up"
+    DOWN = "down"
+    RECONNECTING = "reconnecting"
+
+    def __init__(self, name: str, probe: Callable[[], None], initial_backoff: float = 0.5,
+                 max_backoff: float = 30, on_recover: Optional[Callable[[], None]] = None):
+        """
+        Args:
+            name: Nome da conexão nos logs e métricas
+            probe: Testa (e se preciso refaz) a conexão; deve levantar exceção se falhar
+            initial_backoff: Espera antes da primeira tentativa de reconexão em segundos
+            max_backoff: Espera máxima entre tentativas
+            on_recover: Chamada na thread de reconexão logo depois de a conexão voltar
+        """
+        self.name = name
+        self.probe = probe
+        self.initial_backoff = initial_backoff
+        self.max_backoff = max_backoff
+        self.on_recover = on_recover
+        self._lock = threading.Lock()
+        self._state = self.UP
+        self._since = time.time()
+        self._last_error: Optional[str] = None
+        self._transitions: Dict[str, int] = {}
+        self._failed_attempts = 0
+        self._next_attempt_at: Optional[float] = None
+        # pid em que a thread de reconexão foi iniciada (um processo filho precisa da sua)
+        self._reconnect_pid: Optional[int] = None
+
+    def is_up(self) -> bool:
+        """Consulta barata (sem I/O) usada antes de cada operação do cache."""
+        return self._state == self.UP
+
+    def mark_up(self):
+        """Conexão confirmada (conexão inicial ou reconexão bem-sucedida)."""
+        with self._lock:
+            self._set_state_locked(self.UP)
+            self._failed_attempts = 0
+            self._next_attempt_at = None
+
+    def mark_down(self, error: Exception):
+        """Um comando falhou por conexão: passa a falhar rápido e reconecta em segundo plano."""
+        pid = os.getpid()
+        with self._lock:
+            self._last_error = f"{type(error).__name__}: {error}"
+            if self._state == self.UP:
+                logging.warning(f"Redis ({self.name}) indisponível: {error}. Reconectando em segundo plano.")
+                self._set_state_locked(self.DOWN)
+            if self._reconnect_pid == pid:
+                return
+            self._reconnect_pid = pid
+        threading.Thread(target=self._reconnect_loop, name=f"redis-reconnect-{self.name}", daemon=True).start()
+
+    def _set_state_locked(self, state: str):
+        if state == self._state:
+            return
+        transition = f"{self._state}->{state}"
+        self._transitions[transition] = self._transitions.get(transition, 0) + 1
+        self._state = state
+        self._since = time.time()
+
+    def _reconnect_loop(self):
+        delay = self.initial_backoff
+        while True:
+            # Jitter: workers que perderam a conexão juntos não reconectam todos no mesmo instante
+            wait = delay * random.uniform(0.8, 1.2)
+            with self._lock:
+                self._next_attempt_at = time.time() + wait
+            time.sleep(wait)
+
+            with self._lock:
+                if self._state == self.UP:
+                    # Reconectado por fora (ex.: cliente substituído)
+                    self._reconnect_pid = None
+                    return
+                self._set_state_locked(self.RECONNECTING)
+            try:
+                self.probe()
+            except Exception as e:
+                with self._lock:
+                    self._failed_attempts += 1
+                    self._last_error = f"{type(e).__name__}: {e}"
+                    self._set_state_locked(self.DOWN)
+                    attempts = self._failed_attempts
+                delay = min(delay * 2, self.max_backoff)
+                logging.warning(f"Reconexão ao Redis ({self.name}) falhou ({attempts}ª tentativa): {e}. "
+                                f"Nova tentativa em ~{delay:.0f}s.")
+                continue
+
+            with self._lock:
+                attempts = self._failed_attempts
+                self._set_state_locked(self.UP)
+                self._failed_attempts = 0
+                self._next_attempt_at = None
+                self._reconnect_pid = None
+            logging.info(f"Reconectado ao Redis ({self.name}) após {attempts + 1} tentativa(s).")
+            if self.on_recover is not None:
+                try:
+                    self.on_recover()
+                except Exception as e:
+                    logging.error(f"Erro após a reconexão ao Redis ({self.name}): {e}")
+            return
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Estado atual e contagem de transições neste processo."""
+        with self._lock:
+            return {
+                "state": self._state,
+                "since": self._since,
+                "seconds_in_state": round(time.time() - self._since, 1),
+                "last_error": self._last_error,
+                "failed_attempts": self._failed_attempts,
+                "next_attempt_in": (round(max(self._next_attempt_at - time.time(), 0), 1)
+                                    if self._next_attempt_at and self._state != self.UP else None),
+                "transitions": dict(self._transitions)
+            }
+
+class TrackedRedis(redis.Redis):
+    """
+    Cliente Redis que avisa on_connection_error quando um comando (ou pipeline) falha por
+    conexão ou timeout. Os erros continuam sendo propagados para quem chamou.
+    """
+
+    on_connection_error: Optional[Callable[[Exception], None]] = None
+
+    def execute_command(self, *args, **options):
+        try:
+            return super().execute_command(*args, **options)
+        except CONNECTION_ERRORS as e:
+            self._report(e)
+            raise
+
+    def pipeline(self, transaction=True, shard_hint=None) -> "TrackedPipeline":
+        pipe = TrackedPipeline(self.connection_pool, self.response_callbacks, transaction, shard_hint)
+        pipe.on_connection_error = self.on_connection_error
+        return pipe
+
+    def _report(self, error: Exception):
+        if self.on_connection_error is not None:
+            self.on_connection_error(error)
+
+class TrackedPipeline(Pipeline):
+    """Pipeline do TrackedRedis (inclusive os comandos imediatos depois de um WATCH)."""
+
+    on_connection_error: Optional[Callable[[Exception], None]] = None
+
+    def execute_command(self, *args, **options):
+        try:
+            return super().execute_command(*args, **options)
+        except CONNECTION_ERRORS as e:
+            self._report(e)
+            raise
+
+    def execute(self, raise_on_error: bool = True):
+        try:
+            return super().execute(raise_on_error)
+        except CONNECTION_ERRORS as e:
+            self._report(e)
+            raise
+
+    def _report(self, error: Exception):
+        if self.on_connection_error is not None:
+            self.on_connection_error(error)
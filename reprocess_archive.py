@@ -0,0 +1,87 @@
+"""
+Reprocessa as entradas do page_cache extraídas por uma versão antiga do extrator.
+
+Para cada entrada com extractor_version diferente de EXTRACTOR_VERSION, o HTML que a gerou é
+lido do arquivo local (html_archive) e passa de novo pela etapa de parsing, em paralelo em
+todos os núcleos. A entrada é reescrita com os novos dados mantendo o TTL restante; nenhuma
+página é baixada de novo.
+
+Uso:
+    python reprocess_archive.py [--workers N] [--force] [--dry-run]
+"""
+import argparse
+import logging
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+from typing import Dict, Any, Tuple
+
+from cache_manager_melhorado import page_cache
+from data_extractor_melhorado import extract_data_from_html, EXTRACTOR_VERSION
+from html_archive import html_archive, HtmlArchive
+
+# Configuração de logs
+logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+
+def _parse_record(url: str, path: str) -> Dict[str, Any]:
+    """Roda no processo worker: lê o registro arquivado e extrai os dados."""
+    record = HtmlArchive.load(path)
+    return extract_data_from_html(url, record["html"])
+
+def main():
+    parser = argparse.ArgumentParser(description="Reprocessa o page_cache a partir do HTML arquivado")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 2,
+                        help="Processos de parsing (padrão: número de CPUs)")
+    parser.add_argument("--force", action="store_true",
+                        help="Reprocessa também as entradas já na versão atual")
+    parser.add_argument("--dry-run", action="store_true",
+                        help="Só lista o que seria reprocessado")
+    args = parser.parse_args()
+
+    stats = {"entradas": 0, "atualizadas_antes": 0, "sem_arquivo": 0,
+             "reprocessadas": 0, "gravadas": 0, "erros": 0}
+    start = time.perf_counter()
+
+    with ProcessPoolExecutor(max_workers=args.workers) as pool:
+        futures: Dict[Any, Tuple[str, Dict[str, Any]]] = {}
+
+        def collect(done):
+            for future in done:
+                url, entry = futures.pop(future)
+                try:
+                    data = future.result()
+                except Exception as e:
+                    stats["erros"] += 1
+                    logging.error(f"Erro ao reprocessar {url}: {e}")
+                    continue
+                stats["reprocessadas"] += 1
+                if page_cache.replace_data(url, entry, data, EXTRACTOR_VERSION):
+                    stats["gravadas"] += 1
+
+        for url, entry in page_cache.iter_entries():
+            stats["entradas"] += 1
+            if not args.force and entry.get("extractor_version") == EXTRACTOR_VERSION:
+                stats["atualizadas_antes"] += 1
+                continue
+            # Com hash, só serve o HTML exato que gerou a entrada; sem hash, o download mais recente
+            path = html_archive.find(url, entry.get("content_hash"))
+            if path is None:
+                stats["sem_arquivo"] += 1
+                continue
+            if args.dry_run:
+                logging.info(f"Seria reprocessada: {url} (versão {entry.get('extractor_version')}) <- {path}")
+                continue
+
+            # Limita os trabalhos pendentes para não carregar o cache inteiro em memória
+            if len(futures) >= args.workers * 4:
+                done, _ = wait(futures, return_when=FIRST_COMPLETED)
+                collect(done)
+            futures[pool.submit(_parse_record, url, path)] = (url, entry)
+
+        collect(wait(futures).done)
+
+    elapsed = time.perf_counter() - start
+    logging.info(f"Reprocessamento concluído em {elapsed:.1f}s (versão do extrator: {EXTRACTOR_VERSION}): {stats}")
+
+if __name__ == "__main__":
+    main()
@@ -4,10 +4,14 @@ from typing import Dict, Any, List
 from jinja2 import Template
 import requests
 import os
+from http_session import get_session
 
 # Configuração de logs
 logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
 
+# Mensagens do histórico enviadas ao LLM (as últimas, para não sobrecarregar o prompt)
+HISTORY_MESSAGES = 10
+
 class ResponseGenerator:
     def __init__(self, llm_api_key: str = None, llm_model: str = "meta-llama/llama-3.1-8b-instruct:free"):
         self.llm_api_key = llm_api_key or os.getenv("OPENROUTER_API_KEY")
@@ -59,7 +63,7 @@ Lembre-se: Seu objetivo é VENDER. Seja um consultor que realmente se importa co
         ]
         
         # Adiciona o histórico de conversa para manter contexto
-        for msg in conversation_history[-10:]:  # Últimas 10 mensagens para não sobrecarregar
+        for msg in conversation_history[-HISTORY_MESSAGES:]:
             messages.append({"role": msg["role"], "content": msg["content"]})
         
         messages.append({"role": "user", "content": user_question})
@@ -83,7 +87,7 @@ Lembre-se: Seu objetivo é VENDER. Seja um consultor que realmente se importa co
             }
             
             logging.info(f"Enviando requisição para OpenRouter com modelo {self.llm_model}...")
-            response = requests.post(self.openrouter_api_url, headers=headers, json=payload, timeout=30)
+            response = get_session("openrouter").post(self.openrouter_api_url, headers=headers, json=payload, timeout=30)
             response.raise_for_status()
             
             json_response = response.json()
@@ -0,0 +1,175 @@
+import html
+import json
+import logging
+import re
+from typing import Dict, List, Any, Iterable, Optional
+
+# Configuração de logs
+logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+
+# Tipos schema.org que descrevem o que a página vende
+PRODUCT_TYPES = {"Product", "ProductGroup", "IndividualProduct", "Course", "Book",
+                 "SoftwareApplication", "WebApplication", "MobileApplication", "Service", "Event"}
+OFFER_TYPES = {"Offer", "AggregateOffer"}
+
+CURRENCY_SYMBOLS = {"BRL": "R$", "USD": "US$", "EUR": "€"}
+
+# Campos da extração que podem vir dos dados estruturados
+SCHEMA_FIELDS = ("titulo", "descricao", "preco", "depoimentos")
+
+_TAG_RE = re.compile(r"<[^>]+>")
+_NUMBER_RE = re.compile(r"^\d+(?:\.\d+)?$")
+_BR_NUMBER_RE = re.compile(r"^\d{1,3}(?:\.\d{3})*(?:,\d+)?$|^\d+(?:,\d+)?$")
+
+def has_schema_markup(html_content: str) -> bool:
+    """Teste barato no HTML bruto: só vale a pena procurar dados estruturados se houver marcação."""
+    return "ld+json" in html_content or "itemscope" in html_content
+
+def extract_schema_fields(tree) -> Dict[str, Any]:
+    """
+    Campos da extração obtidos com alta confiança dos dados schema.org embutidos na página
+    (JSON-LD e microdata) de um produto, curso, livro, software etc.
+
+    Só entram valores que dispensam as heurísticas: nome e descrição não vazios, preço
+    numérico positivo com moeda e avaliações com texto de tamanho plausível.
+
+    Args:
+        tree: Elemento raiz lxml, antes de qualquer poda (o trafilatura remove scripts)
+
+    Returns:
+        Subconjunto de {"titulo", "descricao", "preco", "depoimentos"}
+    """
+    products = [entity for entity in _entities(tree) if _types(entity) & PRODUCT_TYPES]
+    fields = {}
+    for product in products:
+        if "titulo" not in fields:
+            name = _clean_text(_first(product.get("name")))
+            if 3 <= len(name) <= 200:
+                fields["titulo"] = name
+        if "descricao" not in fields:
+            description = _clean_text(_first(product.get("description")))
+            if 30 <= len(description) <= 2000:
+                fields["descricao"] = description
+        if "preco" not in fields:
+            price = _price_from_offers(_as_list(product.get("offers")))
+            if price:
+                fields["preco"] = price
+        if "depoimentos" not in fields:
+            reviews = _reviews(_as_list(product.get("review")) + _as_list(product.get("reviews")))
+            if reviews:
+                fields["depoimentos"] = reviews
+    return fields
+
+def _entities(tree) -> Iterable[Dict[str, Any]]:
+    """Entidades de todos os blocos JSON-LD e itens microdata de nível superior, nessa ordem."""
+    for script in tree.xpath('//script[contains(@type, "ld+json")]'):
+        try:
+            document = json.loads(script.text or "", strict=False)
+        except ValueError:
+            logging.debug("Bloco JSON-LD inválido ignorado.")
+            continue
+        for entity in _as_list(document):
+            if isinstance(entity, dict):
+                yield entity
+                for node in _as_list(entity.get("@graph")):
+                    if isinstance(node, dict):
+                        yield node
+
+    for scope in tree.xpath("//*[@itemscope and not(@itemprop)]"):
+        yield _microdata_item(scope)
+
+def _microdata_item(scope) -> Dict[str, Any]:
+    """Converte um item microdata (itemscope) no formato de uma entidade JSON-LD."""
+    item = {"@type": (scope.get("itemtype") or "").split()}
+
+    def walk(parent):
+        for child in parent:
+            if not isinstance(child.tag, str):
+                continue
+            nested = child.get("itemscope") is not None
+            prop = child.get("itemprop")
+            if prop:
+                value = _microdata_item(child) if nested else _microdata_value(child)
+                for name in prop.split():
+                    item.setdefault(name, []).append(value)
+            if not nested:
+                walk(child)
+
+    walk(scope)
+    return item
+
+def _microdata_value(element) -> str:
+    if element.get("content") is not None:
+        return element.get("content")
+    tag = element.tag.lower()
+    if tag in ("a", "link"):
+        return element.get("href") or ""
+    if tag in ("img", "source"):
+        return element.get("src") or ""
+    if tag == "time" and element.get("datetime"):
+        return element.get("datetime")
+    return element.text_content()
+
+def _as_list(value) -> List[Any]:
+    if value is None:
+        return []
+    return value if isinstance(value, list) else [value]
+
+def _first(value) -> Any:
+    values = _as_list(value)
+    return values[0] if values else None
+
+def _types(entity: Dict[str, Any]) -> set:
+    # "Product", "schema:Product" e "https://schema.org/Product" são o mesmo tipo
+    return {re.split(r"[/:#]", str(t))[-1] for t in _as_list(entity.get("@type"))}
+
+def _clean_text(value) -> str:
+    if not isinstance(value, str):
+        return ""
+    return " ".join(html.unescape(_TAG_RE.sub(" ", value)).split())
+
+def _parse_amount(value) -> Optional[float]:
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return float(value)
+    text = _clean_text(value).replace(" ", "")
+    if _NUMBER_RE.match(text):
+        return float(text)
+    if _BR_NUMBER_RE.match(text):
+        return float(text.replace(".", "").replace(",", "."))
+    return None
+
+def _price_from_offers(offers: List[Any]) -> Optional[str]:
+    """Menor preço entre as ofertas, no formato da página ("R$ 1.499,90")."""
+    candidates = []
+    for offer in offers:
+        if not isinstance(offer, dict):
+            continue
+        if offer.get("@type") and not _types(offer) & OFFER_TYPES:
+            continue
+        specification = _first(offer.get("priceSpecification"))
+        currency = _clean_text(_first(offer.get("priceCurrency")))
+        if not currency and isinstance(specification, dict):
+            currency = _clean_text(_first(specification.get("priceCurrency")))
+        for key in ("price", "lowPrice"):
+            amount = _parse_amount(_first(offer.get(key)))
+            if amount is None and key == "price" and isinstance(specification, dict):
+                amount = _parse_amount(_first(specification.get("price")))
+            if amount and amount > 0 and currency:
+                candidates.append((amount, currency.upper()))
+
+    if not candidates:
+        return None
+    amount, currency = min(candidates)
+    formatted = f"{amount:,.2f}".replace(",", "_").replace(".", ",").replace("_", ".")
+    return f"{CURRENCY_SYMBOLS.get(currency, currency)} {formatted}"
+
+def _reviews(reviews: List[Any]) -> List[str]:
+    """Textos das avaliações, com os mesmos limites dos depoimentos extraídos do HTML."""
+    texts = []
+    for review in reviews:
+        if not isinstance(review, dict):
+            continue
+        text = _clean_text(_first(review.get("reviewBody")) or _first(review.get("description")))
+        if 50 < len(text) < 500:
+            texts.append(text)
+    return texts[:3]
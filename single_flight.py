@@ -0,0 +1,174 @@
+import json
+import logging
+import os
+import threading
+import time
+import uuid
+from typing import Any, Callable, Dict, Optional, Tuple
+
+import redis
+
+from cache_manager_melhorado import CacheManager, page_cache
+
+# Configuração de logs
+logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+
+class _Call:
+    """Execução em andamento de uma chave no processo."""
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.result = None
+        self.error = None
+
+class SingleFlight:
+    """
+    Garante uma única execução por chave de cada vez; quem chega durante a execução recebe o
+    mesmo resultado em vez de repetir o trabalho.
+
+    No processo, as threads seguidoras esperam a líder em um Event. Entre workers (gunicorn),
+    a líder guarda um lock no Redis com lease (expira sozinho se o worker morrer) cujo valor
+    é um token da execução e, ao terminar, publica o resultado em uma chave de vida curta
+    com esse token; os outros workers esperam a chave do token que está no lock, então
+    nunca leem o resultado de uma execução anterior ou posterior da mesma chave.
+    Sem Redis, a coalescência fica só dentro do processo.
+    """
+
+    def __init__(self, cache: CacheManager, name: str, lease: int = 90, result_ttl: int = 30,
+                 poll_interval: float = 0.1):
+        """
+        Args:
+            cache: CacheManager cuja conexão Redis é usada para o lock
+            name: Prefixo das chaves no Redis
+            lease: Validade do lock em segundos (deve cobrir a execução mais longa)
+            result_ttl: Por quanto tempo o resultado fica disponível para os outros workers
+            poll_interval: Intervalo entre consultas de quem espera outro worker
+        """
+        self.cache = cache
+        self.lock_prefix = f"{name}:lock:"
+        self.result_prefix = f"{name}:result:"
+        self.lease = lease
+        self.result_ttl = result_ttl
+        self.poll_interval = poll_interval
+        self._lock = threading.Lock()
+        self._calls: Dict[str, _Call] = {}
+
+    def do(self, key: str, fn: Callable[[], Any]) -> Tuple[Any, bool]:
+        """
+        Executa fn para a chave, ou aguarda a execução já em andamento.
+
+        Args:
+            key: Chave da execução (ex.: URL normalizada)
+            fn: Função sem argumentos; o resultado deve ser serializável em JSON
+
+        Returns:
+            (resultado, coalesced): coalesced é True se o resultado veio da execução de outra
+            requisição (neste ou em outro worker)
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+
+        if not leader:
+            call.event.wait()
+            if call.error:
+                raise call.error
+            return call.result, True
+
+        try:
+            call.result, coalesced = self._run_across_workers(key, fn)
+            return call.result, coalesced
+        except Exception as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.event.set()
+
+    def _run_across_workers(self, key: str, fn: Callable[[], Any]) -> Tuple[Any, bool]:
+        if not self.cache._is_connected():
+            return fn(), False
+
+        client = self.cache.redis_client
+        lock_key = f"{self.lock_prefix}{key}"
+        token = uuid.uuid4().hex
+        deadline = time.time() + self.lease
+
+        while True:
+            try:
+                acquired = client.set(lock_key, token, nx=True, ex=self.lease)
+            except Exception as e:
+                logging.error(f"Erro ao adquirir lock de {key}: {e}")
+                return fn(), False
+
+            if acquired:
+                try:
+                    result = fn()
+                    try:
+                        client.setex(self._result_key(key, token), self.result_ttl,
+                                     json.dumps(result, ensure_ascii=False))
+                    except Exception as e:
+                        logging.error(f"Erro ao publicar resultado de {key}: {e}")
+                    return result, False
+                finally:
+                    self._release(lock_key, token)
+
+            logging.info(f"Execução em andamento em outro worker, aguardando: {key}")
+            result = self._wait_remote(key, lock_key, deadline)
+            if result is not None:
+                return result, True
+            if time.time() >= deadline:
+                logging.warning(f"Tempo de espera esgotado para {key}. Executando localmente.")
+                return fn(), False
+            # O outro worker terminou sem publicar resultado (erro): tenta assumir a execução
+
+    def _result_key(self, key: str, token: str) -> str:
+        return f"{self.result_prefix}{key}:{token}"
+
+    def _wait_remote(self, key: str, lock_key: str, deadline: float) -> Optional[Any]:
+        """Resultado da execução que detém o lock, ou None se o lock sumir sem resultado."""
+        client = self.cache.redis_client
+        token = None
+        try:
+            while time.time() < deadline:
+                current = client.get(lock_key)
+                if current is not None:
+                    # Se o lease expirou e outro worker assumiu, passa a esperar a nova execução
+                    token = current
+                if token is not None:
+                    # O resultado é publicado antes de o lock ser liberado
+                    cached_result = client.get(self._result_key(key, token))
+                    if cached_result:
+                        return json.loads(cached_result)
+                if current is None:
+                    return None
+                time.sleep(self.poll_interval)
+        except Exception as e:
+            logging.error(f"Erro ao aguardar resultado de outro worker: {e}")
+        return None
+
+    def _release(self, lock_key: str, token: str):
+        """Libera o lock só se ele ainda for deste worker (o lease pode ter expirado)."""
+        try:
+            with self.cache.redis_client.pipeline() as pipe:
+                pipe.watch(lock_key)
+                if pipe.get(lock_key) == token:
+                    pipe.multi()
+                    pipe.delete(lock_key)
+                    pipe.execute()
+                else:
+                    pipe.unwatch()
+        except redis.WatchError:
+            pass
+        except Exception as e:
+            logging.error(f"Erro ao liberar lock {lock_key}: {e}")
+
+# Instância global para uso na aplicação: uma extração por URL normalizada
+page_flight = SingleFlight(
+    page_cache,
+    "page_flight",
+    lease=int(os.getenv("SINGLE_FLIGHT_LEASE", 90))
+)
@@ -0,0 +1,150 @@
+import logging
+import time
+from contextlib import contextmanager
+from typing import Dict, Any, Iterator, List, Optional, TYPE_CHECKING
+
+from lazy_cache import LazyPageCache
+
+if TYPE_CHECKING:
+    from cache_manager_melhorado import CacheManager
+
+# Configuração de logs
+logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+
+# Limites superiores (ms) dos buckets dos histogramas; acima do último vai para "inf"
+DEFAULT_BUCKETS_MS = [0.1, 0.25, 0.5, 1, 2, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000, 30000]
+
+@contextmanager
+def span(timings: Optional[Dict[str, float]], stage: str) -> Iterator[None]:
+    """
+    Soma em timings[stage] a duração (ms) do bloco; com timings None não mede nada.
+
+    Uso:
+        with span(timings, "download"):
+            ...
+    """
+    if timings is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings[stage] = timings.get(stage, 0.0) + (time.perf_counter() - start) * 1000
+
+class Laps:
+    """
+    Cronômetro de etapas sequenciais: cada chamada soma em timings a duração (ms) desde a
+    marcação anterior. Mais barato que um span por etapa em sequências longas (ex.: um campo
+    após o outro). Sem timings não faz nada.
+    """
+
+    __slots__ = ("timings", "last")
+
+    def __init__(self, timings: Optional[Dict[str, float]]):
+        self.timings = timings
+        self.last = time.perf_counter() if timings is not None else 0.0
+
+    def __call__(self, stage: str):
+        if self.timings is None:
+            return
+        now = time.perf_counter()
+        self.timings[stage] = self.timings.get(stage, 0.0) + (now - self.last) * 1000
+        self.last = now
+
+class StageHistograms:
+    """
+    Histogramas de duração por etapa do pipeline de extração, agregados entre workers no
+    Redis (um hash por etapa com a contagem de cada bucket, o total e a soma em ms).
+    Sem Redis as observações são descartadas.
+    """
+
+    cache = LazyPageCache()
+
+    def __init__(self, cache: Optional["CacheManager"] = None, buckets: Optional[List[float]] = None):
+        """
+        Args:
+            cache: CacheManager cuja conexão Redis guarda os histogramas (padrão: page_cache,
+                resolvido no primeiro uso)
+            buckets: Limites superiores dos buckets em ms, em ordem crescente
+        """
+        self.cache = cache
+        self.prefix = "stage_timing:"
+        self.index_key = "stage_timing_index"
+        self.buckets = list(buckets or DEFAULT_BUCKETS_MS)
+
+    def _bucket_field(self, ms: float) -> str:
+        for bound in self.buckets:
+            if ms <= bound:
+                return f"le_{bound}"
+        return "le_inf"
+
+    def observe(self, timings: Dict[str, float]):
+        """Registra as durações (ms) de uma execução do pipeline."""
+        if not timings or not self.cache._is_connected():
+            return
+        try:
+            with self.cache.redis_client.pipeline(transaction=False) as pipe:
+                for stage, ms in timings.items():
+                    key = f"{self.prefix}{stage}"
+                    pipe.hincrby(key, self._bucket_field(ms), 1)
+                    pipe.hincrby(key, "count", 1)
+                    pipe.hincrbyfloat(key, "sum_ms", round(ms, 3))
+                pipe.sadd(self.index_key, *timings.keys())
+                pipe.execute()
+        except Exception as e:
+            logging.error(f"Erro ao registrar tempos de extração: {e}")
+
+    def _percentile(self, counts: List[int], total: int, pct: float) -> float:
+        """Estimativa do percentil por interpolação linear dentro do bucket."""
+        target = total * pct / 100
+        cumulative = 0
+        lower = 0.0
+        for bound, count in zip(self.buckets, counts):
+            if count and cumulative + count >= target:
+                return round(lower + (bound - lower) * (target - cumulative) / count, 2)
+            cumulative += count
+            lower = bound
+        # Caiu no bucket "inf": o melhor limite conhecido é o último bucket
+        return float(self.buckets[-1])
+
+    def get_stats(self) -> Dict[str, Dict[str, Any]]:
+        """
+        Histograma de cada etapa.
+
+        Returns:
+            etapa -> {"count", "mean_ms", "p50_ms", "p95_ms", "p99_ms", "buckets"}, com
+            "buckets" em ordem: [{"le": limite superior em ms ("inf" no último), "count"}]
+        """
+        if not self.cache._is_connected():
+            return {}
+        try:
+            client = self.cache.redis_client
+            stages = sorted(client.smembers(self.index_key))
+            with client.pipeline(transaction=False) as pipe:
+                for stage in stages:
+                    pipe.hgetall(f"{self.prefix}{stage}")
+                entries = pipe.execute()
+        except Exception as e:
+            logging.error(f"Erro ao obter histogramas de tempo: {e}")
+            return {}
+
+        stats = {}
+        for stage, entry in zip(stages, entries):
+            total = int(entry.get("count", 0))
+            if not total:
+                continue
+            counts = [int(entry.get(f"le_{bound}", 0)) for bound in self.buckets]
+            stats[stage] = {
+                "count": total,
+                "mean_ms": round(float(entry.get("sum_ms", 0)) / total, 2),
+                "p50_ms": self._percentile(counts, total, 50),
+                "p95_ms": self._percentile(counts, total, 95),
+                "p99_ms": self._percentile(counts, total, 99),
+                "buckets": [{"le": bound, "count": count} for bound, count in zip(self.buckets, counts)]
+                           + [{"le": "inf", "count": int(entry.get("le_inf", 0))}]
+            }
+        return stats
+
+# Instância global para uso na aplicação
+stage_histograms = StageHistograms()
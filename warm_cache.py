@@ -0,0 +1,135 @@
+"""
+Aquece o page_cache depois de um deploy ou de um flush do Redis.
+
+As URLs vêm de arquivos com uma URL por linha (linhas vazias e iniciadas por # são
+ignoradas; "-" lê da entrada padrão) e/ou dos logs da API, a partir das linhas
+"Solicitação de extração de dados para: <url>" (as URLs mais pedidas primeiro). A extração
+usa o BatchExtractor, com limite de concorrência global e por host e uma taxa máxima de
+downloads por segundo; URLs que já estão no cache são puladas.
+
+Uso:
+    python warm_cache.py [urls.txt ...] [--log api_server.log] [--top N] [--concorrencia N]
+                         [--por-host N] [--taxa URLS_POR_SEGUNDO] [--force] [--dry-run]
+
+Sai com código 1 se a proporção de falhas passar de --max-falhas (para uso como etapa de release).
+"""
+import argparse
+import logging
+import re
+import sys
+import time
+from collections import Counter
+from typing import Iterable, List
+
+from batch_extractor import BatchExtractor
+
+# Configuração de logs
+logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+
+# Linha registrada pelo endpoint /extract_data a cada solicitação
+LOG_REQUEST_PATTERN = re.compile(r"Solicitação de extração de dados para: (\S+)")
+
+# Intervalo mínimo entre os relatórios de progresso (segundos)
+PROGRESS_INTERVAL = 5
+
+def urls_from_list(lines: Iterable[str]) -> List[str]:
+    """URLs de uma lista com uma URL por linha."""
+    urls = []
+    for line in lines:
+        line = line.strip()
+        if line and not line.startswith("#"):
+            urls.append(line)
+    return urls
+
+def urls_from_log(lines: Iterable[str]) -> Counter:
+    """Quantas vezes cada URL foi solicitada nas linhas de log da API."""
+    counts = Counter()
+    for line in lines:
+        match = LOG_REQUEST_PATTERN.search(line)
+        if match:
+            counts[match.group(1)] += 1
+    return counts
+
+def _read_lines(path: str) -> Iterable[str]:
+    if path == "-":
+        return sys.stdin.readlines()
+    with open(path, encoding="utf-8", errors="replace") as f:
+        return f.readlines()
+
+def main():
+    parser = argparse.ArgumentParser(description="Pré-carrega o page_cache a partir de listas de URLs e logs da API")
+    parser.add_argument("paths", nargs="*", help="Arquivos com uma URL por linha (\"-\" para a entrada padrão)")
+    parser.add_argument("--log", action="append", default=[],
+                        help="Log da API de onde extrair as URLs solicitadas (pode repetir)")
+    parser.add_argument("--top", type=int, default=0, help="Só as N URLs mais solicitadas nos logs")
+    parser.add_argument("--concorrencia", type=int, default=8, help="Downloads simultâneos")
+    parser.add_argument("--por-host", type=int, default=2, help="Downloads simultâneos por host")
+    parser.add_argument("--taxa", type=float, default=2.0,
+                        help="Máximo de downloads iniciados por segundo (0: sem limite)")
+    parser.add_argument("--force", action="store_true", help="Extrai de novo mesmo as URLs já em cache")
+    parser.add_argument("--max-falhas", type=float, default=10.0,
+                        help="Porcentagem de falhas tolerada antes de sair com erro")
+    parser.add_argument("--dry-run", action="store_true", help="Só lista as URLs que seriam aquecidas")
+    args = parser.parse_args()
+
+    if not args.paths and not args.log:
+        parser.error("informe ao menos um arquivo de URLs ou --log")
+
+    urls = []
+    for path in args.paths:
+        urls.extend(urls_from_list(_read_lines(path)))
+    if args.log:
+        requested = Counter()
+        for path in args.log:
+            requested.update(urls_from_log(_read_lines(path)))
+        ranked = [url for url, _ in requested.most_common(args.top or None)]
+        logging.info(f"{len(requested)} URLs distintas nos logs ({sum(requested.values())} solicitações).")
+        urls.extend(ranked)
+    urls = list(dict.fromkeys(urls))
+
+    if not urls:
+        logging.warning("Nenhuma URL para aquecer.")
+        return 0
+    if args.dry_run:
+        for url in urls:
+            print(url)
+        return 0
+
+    logging.info(f"Aquecendo o cache com {len(urls)} URLs (concorrência {args.concorrencia}, "
+                 f"{args.por_host} por host, até {args.taxa or 'sem limite de'} downloads/s).")
+    extractor = BatchExtractor(max_concurrency=args.concorrencia, per_host_limit=args.por_host)
+    stats = {"extraidas": 0, "ja_em_cache": 0, "falhas": 0}
+    failures = []
+    start = last_report = time.monotonic()
+
+    for done, result in enumerate(extractor.extract(urls, use_cache=not args.force,
+                                                    max_rate=args.taxa or None), 1):
+        if result["status"] != "ok":
+            stats["falhas"] += 1
+            failures.append((result["url"], result.get("error")))
+        elif result.get("cached"):
+            stats["ja_em_cache"] += 1
+        else:
+            stats["extraidas"] += 1
+
+        now = time.monotonic()
+        if now - last_report >= PROGRESS_INTERVAL or done == len(urls):
+            last_report = now
+            rate = done / (now - start) if now > start else 0.0
+            remaining = (len(urls) - done) / rate if rate else 0.0
+            logging.info(f"Progresso: {done}/{len(urls)} ({done / len(urls):.0%}) - {stats} - "
+                         f"{rate:.1f} URLs/s, restam ~{remaining:.0f}s")
+
+    elapsed = time.monotonic() - start
+    logging.info(f"Aquecimento concluído em {elapsed:.1f}s: {stats}")
+    for url, error in failures:
+        logging.warning(f"Falha ao aquecer {url}: {error}")
+
+    failure_pct = 100 * stats["falhas"] / len(urls)
+    if failure_pct > args.max_falhas:
+        logging.error(f"{failure_pct:.1f}% das URLs falharam (tolerância: {args.max_falhas}%).")
+        return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())